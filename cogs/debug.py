@@ -0,0 +1,67 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+import asyncio
+import io
+import logging
+from datetime import datetime, timezone
+
+from utils.profiling import profile_event_loop
+
+class Debug(commands.Cog):
+    debug = app_commands.Group(name="debug", description="Owner-only diagnostics")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.logger = logging.getLogger(__name__)
+        self._profile_lock = asyncio.Lock()
+
+    @debug.command(name="profile", description="Profile the live bot for a few seconds (owner only)")
+    @app_commands.describe(
+        seconds="How long to profile (1-120)",
+        sampling="Use the low-overhead sampling profiler instead of cProfile",
+        memory="Also compare tracemalloc snapshots from the start and end"
+    )
+    async def profile(
+        self,
+        interaction: discord.Interaction,
+        seconds: app_commands.Range[int, 1, 120] = 10,
+        sampling: bool = False,
+        memory: bool = False
+    ):
+        """Profile the event loop and send the report as an attachment"""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message(
+                "Hah! Poking around in my insides? Only my owner gets to do that! 😤",
+                ephemeral=True
+            )
+            return
+
+        if self._profile_lock.locked():
+            await interaction.response.send_message(
+                "I'm already being profiled! One at a time, geez~ 🙄",
+                ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        async with self._profile_lock:
+            try:
+                report, headlines = await profile_event_loop(seconds, sampling=sampling, memory=memory)
+            except Exception as e:
+                self.logger.error(f"Error profiling: {e}")
+                await interaction.followup.send(f"Ugh, profiling broke: `{e}` 😒", ephemeral=True)
+                return
+
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        mode = "sampling" if sampling else "cprofile"
+        report_file = discord.File(io.BytesIO(report.encode('utf-8')), filename=f"profile-{mode}-{stamp}.txt")
+        summary = "\n".join(f"• `{line}`" for line in headlines) or "Nothing interesting happened~"
+        await interaction.followup.send(
+            f"Here's what I was busy with for {seconds}s. Don't read too much into it! 😳\n{summary}",
+            file=report_file,
+            ephemeral=True
+        )
+
+async def setup(bot):
+    await bot.add_cog(Debug(bot))
@@ -2,16 +2,25 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import random
-import re
 import asyncio
-from typing import List
+import time
+
+from typing import Optional
+
+from utils.dice import (
+    DiceError,
+    DiceExpression,
+    Distribution,
+    RollResult,
+    TermResult,
+    dice_distribution,
+    parse_dice,
+    roll_expression
+)
 
 class FunCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Pre-compile regex for better performance
-        self.dice_pattern = re.compile(r'^(\d+)d(\d+)$', re.IGNORECASE)
-        
         # Constants for better maintainability
         self.COIN_STICKERS = [
             "https://media.discordapp.net/stickers/1377651154565206047.gif?size=256&name=misakacoin",
@@ -22,22 +31,15 @@ class FunCommands(commands.Cog):
         # Animation timing
         self.ANIMATION_DELAY = 3
 
-        # Tika's personality responses for games
-        self.coin_comments = [
-            "Hmph! Let's see if luck favors the brilliant~",
-            "Obviously I'll predict this correctly. I'm good at everything! 💅",
-            "Even coin flips bow to my superior intellect!",
-            "This is child's play, but I'll humor you~",
-            "Watch and learn how it's done! ✨"
-        ]
-        
-        self.dice_comments = [
-            "Rolling dice? How... quaint. But I'll show you how it's done! 🎲",
-            "Let me demonstrate my superior luck! Watch this!",
-            "Dice rolling is an art form, and I'm the master! 😏",
-            "Even random chance respects my abilities~",
-            "Prepare to witness perfection in action! ✨"
-        ]
+        # Stats counter bumped for each rock paper scissors outcome
+        self.RPS_COUNTERS = {"win": "rps_wins", "lose": "rps_losses", "tie": "rps_ties"}
+
+        # Embed limits for dice results
+        self.MAX_ROLL_FIELDS = 10
+        self.MAX_FIELD_LENGTH = 1024
+
+        # Tika's personality responses live in the shared template registry
+        self.templates = bot.templates
 
     @app_commands.command(name="coinflip", description="Let Tika flip a coin for you!")
     async def coinflip(self, interaction: discord.Interaction):
@@ -45,7 +47,7 @@ class FunCommands(commands.Cog):
         chosen_sticker = random.choice(self.COIN_STICKERS)
         
         # Tika's pre-flip comment
-        comment = random.choice(self.coin_comments)
+        comment = self.templates.pick("coin.comment", interaction.guild_id)
         
         # Create animation embed
         animation_embed = discord.Embed(
@@ -56,193 +58,211 @@ class FunCommands(commands.Cog):
         animation_embed.set_image(url=chosen_sticker)
         
         await interaction.response.send_message(embed=animation_embed)
-        await asyncio.sleep(self.ANIMATION_DELAY)
         
         # Generate result
         result = random.choice(["Heads", "Tails"])
+        self.bot.stats.record(interaction.user.id, interaction.guild_id, affinity=1, coinflips=1)
         color = 0x00FF00 if result == "Heads" else 0xFF0000
         
-        # Tika's reaction to the result
-        reactions = {
-            "Heads": [
-                "Ha! Of course it's heads! I knew it all along~ 😏",
-                "Heads it is! My prediction skills are unmatched! ✨",
-                "See? Even coins know I'm always right! 💅",
-                "Heads! Just as I calculated... probably. 😊"
-            ],
-            "Tails": [
-                "Tails! Well, that was... unexpected. But I totally saw it coming! 😤",
-                "Hmph! Tails? The coin clearly has questionable taste. 🙄",
-                "Tails it is! Even I can't control everything... unfortunately. 😏",
-                "Tails! Not bad, coin. Not bad at all~ ✨"
-            ]
-        }
-        
-        # Create result embed
+        # Create result embed with Tika's reaction
         result_embed = discord.Embed(
             title=f"🪙 Coin Flip Result: {result}!",
-            description=random.choice(reactions[result]),
+            description=self.templates.pick(f"coin.{result.lower()}", interaction.guild_id),
             color=color
         )
         result_embed.set_image(url=chosen_sticker)
         
-        await interaction.edit_original_response(embed=result_embed)
+        # Reveal the result once the animation has played
+        self.bot.scheduler.schedule_edit(interaction, self.ANIMATION_DELAY, embed=result_embed)
 
     @app_commands.command(name="roll", description="Let Tika roll dice for you!")
-    @app_commands.describe(dice="Dice notation (e.g., 1d6, 2d20, 3d8)")
-    async def roll_dice(self, interaction: discord.Interaction, dice: str):
+    @app_commands.describe(
+        dice="Dice expression (e.g., 1d20+5, 4d6kh3, 2d6!, 3d8-1d4)",
+        stats="Also show the exact odds of your total"
+    )
+    async def roll_dice(self, interaction: discord.Interaction, dice: str, stats: bool = False):
         """Roll dice with Tika's personality"""
         
         # Validate and parse dice notation
         validation_result = self._validate_dice_input(dice)
         if not validation_result["valid"]:
             # Tika's sassy error messages
-            error_messages = [
-                f"Ugh, {validation_result['error']} Do I have to explain everything? 🙄",
-                f"Seriously? {validation_result['error']} Pay attention next time! 😤",
-                f"*sigh* {validation_result['error']} Here I thought you were smarter than this~"
-            ]
-            
             await interaction.response.send_message(
-                random.choice(error_messages),
+                self.templates.pick("dice.error", interaction.guild_id, error=validation_result["error"]),
                 ephemeral=True
             )
             return
         
-        num_dice, die_sides = validation_result["num_dice"], validation_result["die_sides"]
+        expression = validation_result["expression"]
         
         # Show animation with Tika's comment
-        comment = random.choice(self.dice_comments)
+        comment = self.templates.pick("dice.comment", interaction.guild_id)
         animation_embed = discord.Embed(
-            title=f"🎲 Rolling {dice.upper()}...",
+            title=f"🎲 Rolling {expression.text.upper()}...",
             description=comment,
             color=0xFFFF00
         )
         animation_embed.set_image(url=self.DICE_STICKER)
         
+        started_at = time.monotonic()
         await interaction.response.send_message(embed=animation_embed)
-        await asyncio.sleep(self.ANIMATION_DELAY)
+        
+        # Work out the odds off the event loop while the animation plays
+        distribution = await self._get_distribution(expression)
         
         # Generate rolls
-        rolls = [random.randint(1, die_sides) for _ in range(num_dice)]
+        result = roll_expression(expression)
+        self.bot.stats.record(interaction.user.id, interaction.guild_id, affinity=1, rolls=1, dice_rolled=expression.total_dice)
         
         # Create result embed with Tika's commentary
-        result_embed = self._create_dice_result_embed(dice, rolls, num_dice, die_sides)
-        await interaction.edit_original_response(embed=result_embed)
+        result_embed = self._create_dice_result_embed(result, distribution, stats, interaction.guild_id)
+        remaining_delay = self.ANIMATION_DELAY - (time.monotonic() - started_at)
+        self.bot.scheduler.schedule_edit(interaction, remaining_delay, embed=result_embed)
 
     def _validate_dice_input(self, dice: str) -> dict:
-        """Validate dice input and return parsed values"""
-        match = self.dice_pattern.match(dice.strip())
-        
-        if not match:
-            return {
-                "valid": False,
-                "error": "Invalid dice format! Use format like `1d6`, `2d20`, etc."
-            }
-        
-        num_dice = int(match.group(1))
-        die_sides = int(match.group(2))
-        
-        if not (1 <= num_dice <= 100):
-            return {
-                "valid": False,
-                "error": "Number of dice must be between 1 and 100!"
-            }
-        
-        if not (2 <= die_sides <= 1000):
+        """Validate dice input and return the parsed expression"""
+        try:
+            expression = parse_dice(dice)
+        except DiceError as e:
             return {
                 "valid": False,
-                "error": "Die sides must be between 2 and 1000!"
+                "error": str(e)
             }
         
         return {
             "valid": True,
-            "num_dice": num_dice,
-            "die_sides": die_sides
+            "expression": expression
         }
 
-    def _create_dice_result_embed(self, dice: str, rolls: List[int], num_dice: int, die_sides: int) -> discord.Embed:
+    async def _get_distribution(self, expression: DiceExpression) -> Optional[Distribution]:
+        """Exact odds for an expression, or None if it's too unwieldy"""
+        try:
+            return await asyncio.to_thread(dice_distribution, expression)
+        except DiceError:
+            return None
+
+    def _create_dice_result_embed(
+        self,
+        result: RollResult,
+        distribution: Optional[Distribution] = None,
+        show_stats: bool = False,
+        guild_id: Optional[int] = None
+    ) -> discord.Embed:
         """Create the dice result embed with Tika's commentary"""
+        expression = result.expression
+        total = result.total
         
         # Tika's reaction based on rolls
-        total = sum(rolls) if num_dice > 1 else rolls[0]
-        max_possible = num_dice * die_sides
-        
-        if num_dice == 1:
-            if rolls[0] == die_sides:  # Max roll
-                comments = [
-                    "Perfect! Maximum roll! Obviously my luck is incredible~ ✨",
-                    "Ha! See that? That's what happens when I'm involved! 😏",
-                    "Maximum roll! I told you I was good at everything! 💅"
-                ]
-            elif rolls[0] == 1:  # Min roll
-                comments = [
-                    "What?! A one?! This dice is clearly defective! 😤",
-                    "Hmph! Even the greatest minds face setbacks... occasionally. 🙄",
-                    "A one? Well... everyone has off days. Even me, apparently. 😳"
-                ]
+        if expression.is_single_die:
+            die_sides = expression.terms[0].sides
+            if total == die_sides:  # Max roll
+                comment = self.templates.pick("dice.max", guild_id)
+            elif total == 1:  # Min roll
+                comment = self.templates.pick("dice.min", guild_id)
             else:
-                comments = [
-                    f"Not bad! A solid {rolls[0]}! 😊",
-                    f"{rolls[0]}? I've seen worse, I suppose~ 😏",
-                    f"A {rolls[0]}! Perfectly adequate! ✨"
-                ]
+                comment = self.templates.pick("dice.single", guild_id, roll=total)
         else:
-            percentage = (total / max_possible) * 100
+            if distribution:
+                # How lucky the total was, not just how close it got to the max
+                percentage = distribution.percentile(total)
+            else:
+                min_possible, max_possible = expression.bounds()
+                spread = max_possible - min_possible
+                percentage = ((total - min_possible) / spread) * 100 if spread else 100
             if percentage >= 90:
-                comments = [
-                    "Incredible! Look at those numbers! My brilliance shines through everything! ✨",
-                    "Outstanding rolls! Obviously my superior aura influenced the dice! 😏",
-                    "Amazing! These dice clearly recognize talent when they see it! 💅"
-                ]
+                comment = self.templates.pick("dice.great", guild_id)
             elif percentage >= 70:
-                comments = [
-                    "Very nice! Those are some respectable numbers! 😊",
-                    "Good rolls! You're learning from the best~ ✨",
-                    "Solid performance! I'm... actually impressed! 😏"
-                ]
+                comment = self.templates.pick("dice.good", guild_id)
             elif percentage >= 40:
-                comments = [
-                    "Eh, average. Could be better, could be worse~ 🙄",
-                    "Not terrible! There's room for improvement though. 😤",
-                    "Decent enough, I suppose. Try harder next time! 💪"
-                ]
+                comment = self.templates.pick("dice.average", guild_id)
             else:
-                comments = [
-                    "Oof... those are some rough rolls. Even I can't fix everything! 😅",
-                    "Well that's... unfortunate. The dice clearly weren't cooperating! 😬",
-                    "Don't worry! Even the best of us have bad luck sometimes... 😊"
-                ]
+                comment = self.templates.pick("dice.poor", guild_id)
         
         result_embed = discord.Embed(
-            title=f"🎲 {dice.upper()} Results",
-            description=random.choice(comments),
+            title=f"🎲 {expression.text.upper()} Results",
+            description=comment,
             color=0x3498DB
         )
         
-        if num_dice == 1:
+        if expression.is_single_die:
             result_embed.add_field(
                 name="Result",
-                value=f"**{rolls[0]}**",
+                value=f"**{total}**",
                 inline=False
             )
         else:
-            # Use more efficient string joining
-            rolls_str = ", ".join(str(roll) for roll in rolls)
-            result_embed.add_field(
-                name="Individual Rolls",
-                value=rolls_str,
-                inline=False
-            )
+            for term_result in result.terms[:self.MAX_ROLL_FIELDS]:
+                result_embed.add_field(
+                    name=f"{'-' if term_result.term.sign < 0 else ''}{term_result.term}",
+                    value=self._format_term_result(term_result),
+                    inline=False
+                )
+            if expression.modifier:
+                result_embed.add_field(
+                    name="Modifier",
+                    value=f"{expression.modifier:+d}",
+                    inline=False
+                )
             result_embed.add_field(
                 name="Total",
-                value=f"**{sum(rolls)}**",
+                value=f"**{total:,}**",
                 inline=False
             )
         
+        if show_stats:
+            self._add_stats_fields(result_embed, total, distribution)
+        
         result_embed.set_image(url=self.DICE_STICKER)
         return result_embed
 
+    def _add_stats_fields(self, embed: discord.Embed, total: int, distribution: Optional[Distribution]):
+        """Add the probability breakdown for /roll stats"""
+        if distribution is None:
+            embed.add_field(
+                name="📊 Odds",
+                value="Those dice are way too messy for exact odds. Even I have to draw the line somewhere! 😤",
+                inline=False
+            )
+            return
+        
+        embed.add_field(name="📊 Mean", value=f"{distribution.mean:,.2f}", inline=True)
+        embed.add_field(name="📐 Variance", value=f"{distribution.variance:,.2f}", inline=True)
+        embed.add_field(name="🍀 Percentile", value=f"{distribution.percentile(total):.1f}%", inline=True)
+        embed.add_field(
+            name="🎯 Chance of exactly this",
+            value=f"{distribution.probability(total) * 100:.4g}%",
+            inline=True
+        )
+        embed.add_field(
+            name="📏 Middle 90%",
+            value=f"{distribution.quantile(0.05):,} – {distribution.quantile(0.95):,}",
+            inline=True
+        )
+        if not distribution.exact:
+            embed.set_footer(text="That many dice is basically a bell curve, so these odds are approximate~")
+
+    def _format_term_result(self, term_result: TermResult) -> str:
+        """List a small term's rolls, or summarize a big one"""
+        term = term_result.term
+        if term_result.rolls is None:
+            return (
+                f"{term.count:,} dice · min {term_result.minimum} · max {term_result.maximum} · "
+                f"avg {term_result.mean:.2f} · subtotal **{abs(term_result.subtotal):,}**"
+            )
+        
+        # Strike through dropped dice and flag the ones that exploded
+        parts = []
+        for index, roll in enumerate(term_result.rolls):
+            text = f"{roll}!" if term.explode and roll >= term.sides else str(roll)
+            if term_result.kept is not None and index not in term_result.kept:
+                text = f"~~{text}~~"
+            parts.append(text)
+        
+        rolls_str = ", ".join(parts)
+        if len(rolls_str) > self.MAX_FIELD_LENGTH:
+            rolls_str = rolls_str[:self.MAX_FIELD_LENGTH - 4].rsplit(", ", 1)[0] + ", …"
+        return rolls_str
+
     @app_commands.command(name="rps", description="Play Rock Paper Scissors with Tika!")
     @app_commands.describe(choice="Your choice: rock, paper, or scissors")
     @app_commands.choices(choice=[
@@ -262,29 +282,16 @@ class FunCommands(commands.Cog):
         if choice == tika_choice:
             result = "tie"
             color = 0xFFFF00
-            comments = [
-                "A tie?! Great minds think alike, I suppose~ 😏",
-                "Hmph! You copied my strategy! That's... actually smart. 😊",
-                "A draw! We're more alike than I thought... 😳"
-            ]
         elif (choice == "rock" and tika_choice == "scissors") or \
              (choice == "paper" and tika_choice == "rock") or \
              (choice == "scissors" and tika_choice == "paper"):
             result = "win"
             color = 0x00FF00
-            comments = [
-                "What?! How did you... That was just luck! 😤",
-                "Impossible! I must have let you win... yeah, that's it! 😳",
-                "Fine, fine! You win this round! Don't let it go to your head! 🙄"
-            ]
         else:
             result = "lose"
             color = 0xFF0000
-            comments = [
-                "Ha! Victory is mine! Did you really think you could beat me? 😏",
-                "Too easy! My strategic brilliance shines once again! ✨",
-                "Better luck next time! Maybe study my techniques~ 💅"
-            ]
+        
+        self.bot.stats.record(interaction.user.id, interaction.guild_id, affinity=1, **{self.RPS_COUNTERS[result]: 1})
         
         embed = discord.Embed(
             title="🎮 Rock Paper Scissors!",
@@ -311,11 +318,81 @@ class FunCommands(commands.Cog):
         
         embed.add_field(
             name="💬 Tika says:",
-            value=random.choice(comments),
+            value=self.templates.pick(f"rps.{result}", interaction.guild_id),
             inline=False
         )
         
         await interaction.response.send_message(embed=embed)
 
+    @app_commands.command(name="stats", description="See someone's game stats with Tika")
+    @app_commands.describe(user="Whose stats to show (defaults to you)")
+    async def stats(self, interaction: discord.Interaction, user: discord.Member = None):
+        """Show a user's counters and leaderboard ranks"""
+        target = user or interaction.user
+        stats = self.bot.stats.get(target.id)
+        
+        if stats is None:
+            await interaction.response.send_message(
+                f"{target.display_name} hasn't played with me at all yet! How rude~ 😤",
+                ephemeral=True
+            )
+            return
+        
+        embed = discord.Embed(
+            title=f"📊 {target.display_name}'s Stats",
+            color=0x3498DB
+        )
+        embed.add_field(
+            name="🎮 Rock Paper Scissors",
+            value=f"{stats.rps_wins} won · {stats.rps_losses} lost · {stats.rps_ties} tied",
+            inline=False
+        )
+        embed.add_field(name="🎲 Rolls", value=f"{stats.rolls:,} ({stats.dice_rolled:,} dice)", inline=True)
+        embed.add_field(name="🪙 Coin Flips", value=f"{stats.coinflips:,}", inline=True)
+        embed.add_field(name="💗 Compliments", value=f"{stats.compliments:,}", inline=True)
+        embed.add_field(name="👏 Praised", value=f"{stats.praises:,} times", inline=True)
+        
+        rank = self.bot.stats.rank(interaction.guild_id, "affinity", target.id)
+        embed.add_field(
+            name="💝 Affinity",
+            value=f"{stats.affinity:,}" + (f" (#{rank})" if rank else ""),
+            inline=True
+        )
+        embed.set_footer(text="Ranks refresh every minute. Not that I'm counting or anything~")
+        
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="leaderboard", description="See who Tika plays with the most")
+    @app_commands.describe(metric="What to rank by")
+    @app_commands.choices(metric=[
+        app_commands.Choice(name="Affinity", value="affinity"),
+        app_commands.Choice(name="RPS Wins", value="rps_wins"),
+        app_commands.Choice(name="Rolls", value="rolls"),
+        app_commands.Choice(name="Dice Rolled", value="dice_rolled"),
+        app_commands.Choice(name="Coin Flips", value="coinflips")
+    ])
+    async def leaderboard(self, interaction: discord.Interaction, metric: str = "affinity"):
+        """Show the top users from the latest stats snapshot"""
+        entries = self.bot.stats.leaderboard(interaction.guild_id, metric)
+        
+        if not entries:
+            await interaction.response.send_message("Nobody's on the board yet! Come on, play with me already~ 😤")
+            return
+        
+        medals = ["🥇", "🥈", "🥉"]
+        lines = [
+            f"{medals[position] if position < len(medals) else f'**{position + 1}.**'} <@{user_id}> — {value:,}"
+            for position, (user_id, value) in enumerate(entries)
+        ]
+        
+        embed = discord.Embed(
+            title=f"🏆 Leaderboard: {metric.replace('_', ' ').title()}",
+            description="\n".join(lines),
+            color=0xFFD700
+        )
+        embed.set_footer(text="Updated every minute. Try to keep up~ ✨")
+        
+        await interaction.response.send_message(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
 async def setup(bot):
     await bot.add_cog(FunCommands(bot))
\ No newline at end of file
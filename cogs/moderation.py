@@ -2,36 +2,108 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import io
 import json
 import os
-from typing import List, Optional, Dict, Set
+from typing import List, Literal, Optional, Dict, Set, Tuple
 from datetime import datetime, timedelta
+from collections import OrderedDict, deque
 import logging
 import re
-from pathlib import Path
+import sys
+import time
+
+from utils.blocklist import BlockedWordStore
+from utils.bulkio import blocked_words_csv, parse_blocked_words, parse_triggers, triggers_csv
+from utils.expiry import ExpiryScheduler, parse_duration
+from utils.hitcounts import HitStats
+from utils.matchpool import MatchPool
+from utils.modlog import ModLog
+from utils.pagination import PageCache, PageView
+from utils.ratelimit import BucketedRateCounter, SlidingWindowCounter
+from utils.saferegex import SafeRegexError, pattern_cost
+from utils.triggers import GuildTriggers, TriggerRecord, TriggerStore, trigger_key
+from utils.verdicts import MISS, VerdictCache
+from utils.workers import MessageEvent
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.MAX_RESIDENT_TRIGGER_WORDS = 50_000  # Trigger memory budget across guilds
+        self.OFFLOAD_MATCH_THRESHOLD = 2000  # Words in one matcher before it runs in the pool
+        self.OFFLOAD_MATCH_PROCESSES = True  # Threads would still hold the GIL while matching
+        self.MAX_GUILD_REGEX_STATES = 2000  # Automaton states for all of a guild's regex triggers
+        self.VERDICT_CACHE_SIZE = 20_000  # Remembered (matcher, content) verdicts
+        self.EDIT_HASH_CACHE_SIZE = 10_000  # Recent messages whose scanned content hash is kept
+        self.LIST_PAGE_CACHE_SIZE = 2000  # Rendered /nga-list and /listblockedwords pages
+        self.TRIGGERS_PER_PAGE = 10
+        self.BLOCKED_WORDS_PER_PAGE = 30
+        self.MAX_IMPORT_BYTES = 2 * 1024 * 1024
+        self.MAX_IMPORT_ROWS = 20_000  # Words or triggers in one import file
+        self.MAX_IMPORT_ERRORS_SHOWN = 10
+        self.STATS_TOP_TRIGGERS = 10
+        self.STATS_TOP_BLOCKED_WORDS = 5
+        self.MAX_ENTRY_DURATION = 365 * 86400  # Longest TTL for a blocked word or trigger
+        self.WARMUP_MAX_AGE = 3600  # Seconds before hot guilds and purge points aren't worth restoring
         self.clear_start_points = {}  # Store start points per channel
         self.data_dir = 'data'
         self.blocked_words_file = os.path.join(self.data_dir, 'blocked_words.json')
-        self.blocked_words: Dict[str, Set[str]] = {}
+        self.blocked_words = BlockedWordStore()  # Keyed by (guild ID, user ID)
         self._file_lock = asyncio.Lock()
-        self._users_with_blocks: Set[str] = set()
         self.logger = logging.getLogger(__name__)
-        self.nga_data_file = Path('data/nga_replies.json')
-        self.triggers = self.load_triggers()
+        # Triggers are loaded per guild on first use and evicted when idle
+        self.trigger_store = TriggerStore(max_resident_words=self.MAX_RESIDENT_TRIGGER_WORDS)
+        # Huge trigger sets and blocklists are matched off the event loop
+        self.match_pool = MatchPool(threshold=self.OFFLOAD_MATCH_THRESHOLD, use_processes=self.OFFLOAD_MATCH_PROCESSES)
+        # Copy-paste waves hit the same verdicts over and over
+        self.verdicts = VerdictCache(self.VERDICT_CACHE_SIZE)
+        # Pages are keyed by the data's version, so any change makes them stale
+        self.list_pages = PageCache(self.LIST_PAGE_CACHE_SIZE)
+        # Which triggers and blocked words fire, in fixed memory per guild
+        self.hits = HitStats()
+        # Timed blocks and triggers; one task sleeps until the next deadline
+        self.expiries = ExpiryScheduler(self._expire_entries)
+        # Optional per-guild log channel, posted to in merged batches
+        self.modlog = ModLog(bot.get_channel)
 
         # Constants
         self.BULK_DELETE_LIMIT = 100
         self.MESSAGE_AGE_LIMIT = 14  # Days for bulk delete
         self.CONFIRMATION_DELAY = 3  # Seconds
 
+        # Flood detection
+        self.FLOOD_USER_LIMIT = 8  # Messages per user in one channel within the user window
+        self.FLOOD_CHANNEL_LIMIT = 40  # Messages per channel within the channel window
+        self.FLOOD_SLOWMODE = 10  # Seconds of slowmode while a channel is being raided
+        self.FLOOD_SLOWMODE_DURATION = 300  # Seconds before slowmode is lifted again
+        self.FLOOD_DELETE_DELAY = 1  # Seconds to gather flood deletions into one bulk delete
+        self.FLOOD_RECENT_MESSAGES = 50  # Recent message IDs remembered per channel
+        self.FLOOD_MAX_CHANNELS = 2000  # Channels whose recent messages are remembered
+        self.user_flood_counter = BucketedRateCounter(buckets=5, bucket_seconds=1)
+        self.channel_flood_counter = BucketedRateCounter(buckets=10, bucket_seconds=1, max_keys=self.FLOOD_MAX_CHANNELS)
+        self._flood_warnings = SlidingWindowCounter(limit=1, window=30)
+        self._recent_messages: "OrderedDict[int, deque]" = OrderedDict()
+        self._pending_flood_deletes: Dict[int, Set[int]] = {}
+        self._slowed_channels: Dict[int, Tuple[int, float]] = {}  # Channel ID -> (previous delay, restore at)
+        self._background_tasks: Set[asyncio.Task] = set()  # The loop only keeps weak references to tasks
+        
+        # Message ID -> hash of the content last moderated, to skip no-op edits
+        self._scanned_hashes: "OrderedDict[int, int]" = OrderedDict()
+
         # Ensure data directory exists and load data
         self._ensure_data_directory()
         self._load_blocked_words()
 
+    async def cog_load(self):
+        self.hits.start()
+        self.expiries.start()
+
+    async def cog_unload(self):
+        self.match_pool.close()
+        await self.hits.stop()
+        await self.expiries.stop()
+        await self.modlog.stop()
+
     def _ensure_data_directory(self):
         """Ensure the data directory exists"""
         os.makedirs(self.data_dir, exist_ok=True)
@@ -44,24 +116,17 @@ class Moderation(commands.Cog):
         try:
             with open(self.blocked_words_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                # Convert lists to sets for O(1) lookup performance
-                self.blocked_words = {
-                    user_id: set(words) for user_id, words in data.items()
-                }
-                self._users_with_blocks = set(self.blocked_words.keys())
-        except (json.JSONDecodeError, FileNotFoundError) as e:
+            # Intern words and share one compiled matcher per distinct word set
+            self.blocked_words.load(data)
+        except (json.JSONDecodeError, FileNotFoundError, ValueError, AttributeError) as e:
             self.logger.error(f"Error loading blocked words: {e}")
-            self.blocked_words = {}
-            self._users_with_blocks = set()
+            self.blocked_words = BlockedWordStore()
 
     async def _save_blocked_words(self):
         """Save blocked words to JSON file asynchronously with file locking"""
         async with self._file_lock:
             try:
-                # Convert sets back to lists for JSON serialization
-                data_to_save = {
-                    user_id: list(words) for user_id, words in self.blocked_words.items()
-                }
+                data_to_save = self.blocked_words.to_json()
                 
                 # Write to temporary file first, then rename for atomic operation
                 temp_file = self.blocked_words_file + '.tmp'
@@ -71,29 +136,12 @@ class Moderation(commands.Cog):
                 # Atomic rename
                 os.replace(temp_file, self.blocked_words_file)
                 
+                if self.bot.workers is not None:
+                    self.bot.workers.reload_blocked_words()
+                
             except Exception as e:
                 self.logger.error(f"Error saving blocked words: {e}")
 
-    def load_triggers(self):
-        try:
-            if self.nga_data_file.exists():
-                with open(self.nga_data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except Exception as e:
-            self.logger.error(f"Error loading triggers: {e}")
-            return {}
-
-    def save_triggers(self):
-        """Save trigger data to JSON file"""
-        try:
-            # Ensure data directory exists
-            self.nga_data_file.parent.mkdir(exist_ok=True)
-            with open(self.nga_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.triggers, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            self.logger.error(f"Error saving triggers: {e}")
-
     def is_url(self, text):
         """Check if text is a URL"""
         url_pattern = re.compile(
@@ -111,12 +159,13 @@ class Moderation(commands.Cog):
             await self._send_temp_message(ctx, "Hmph! You think you can just order me around? You need proper permissions first, dummy! 💢", 5)
             return
 
-        if action == "start":
-            await self._handle_start_point(ctx)
-        elif action == "end":
-            await self._handle_end_point(ctx)
-        else:
-            await self._handle_single_clear(ctx)
+        with self.bot.tracer.trace("purge", action=action or "single", guild=ctx.guild.id if ctx.guild else None):
+            if action == "start":
+                await self._handle_start_point(ctx)
+            elif action == "end":
+                await self._handle_end_point(ctx)
+            else:
+                await self._handle_single_clear(ctx)
 
     def _has_permission(self, user: discord.Member) -> bool:
         """Check if user has manage messages permission"""
@@ -188,6 +237,7 @@ class Moderation(commands.Cog):
                 return
 
             deleted_count = await self._delete_messages_efficiently(ctx.channel, messages_to_delete)
+            self.modlog.record(ctx.guild.id, "🧹", f"{ctx.author.mention} cleared {deleted_count} message(s) in {ctx.channel.mention}")
             
             # Clean up start point
             del self.clear_start_points[ctx.channel.id]
@@ -235,6 +285,7 @@ class Moderation(commands.Cog):
                 return
             
             deleted_count = await self._delete_messages_efficiently(ctx.channel, messages_to_delete)
+            self.modlog.record(ctx.guild.id, "🧹", f"{ctx.author.mention} cleared {deleted_count} message(s) in {ctx.channel.mention}")
             await self._send_temp_message(
                 ctx, 
                 f"All done! Cleared {deleted_count} messages. I'm quite efficient, aren't I? 😏",
@@ -276,6 +327,9 @@ class Moderation(commands.Cog):
         if not messages:
             return 0
         
+        # Purges need the REST budget more than flavor reactions do
+        self.bot.reaction_budget.yield_to_moderation(channel.guild.id, 30)
+        
         deleted_count = 0
         from datetime import timezone
         cutoff_time = datetime.now(timezone.utc) - timedelta(days=self.MESSAGE_AGE_LIMIT)
@@ -284,11 +338,14 @@ class Moderation(commands.Cog):
         recent_messages = [msg for msg in messages if msg.created_at > cutoff_time]
         old_messages = [msg for msg in messages if msg.created_at <= cutoff_time]
         
+        tracer = self.bot.tracer
         # Bulk delete recent messages in chunks
-        deleted_count += await self._bulk_delete_messages(channel, recent_messages)
+        with tracer.span("delete.bulk", messages=len(recent_messages)):
+            deleted_count += await self._bulk_delete_messages(channel, recent_messages)
         
         # Delete old messages individually
-        deleted_count += await self._delete_old_messages(old_messages)
+        with tracer.span("delete.old", messages=len(old_messages)):
+            deleted_count += await self._delete_old_messages(old_messages)
         
         return deleted_count
 
@@ -341,46 +398,203 @@ class Moderation(commands.Cog):
         
         return deleted_count
 
+    # Flood and raid detection
+    async def check_flood(self, message: discord.Message) -> bool:
+        """Catch users and channels sending messages too fast; True if the message was flagged"""
+        if message.author.bot or not message.guild:
+            return False
+        
+        channel_id = message.channel.id
+        recent = self._remember_message(channel_id, message.id, message.author.id)
+        
+        if self.channel_flood_counter.hit(channel_id) >= self.FLOOD_CHANNEL_LIMIT:
+            await self._slow_down_channel(message.channel)
+        
+        if self.user_flood_counter.hit((channel_id, message.author.id)) < self.FLOOD_USER_LIMIT:
+            return False
+        
+        if isinstance(message.author, discord.Member) and self._has_permission(message.author):
+            return False  # Moderators are allowed to be chatty
+        
+        # Sweep up everything the flooder sent recently, not just this message
+        flood_ids = [message_id for message_id, author_id in recent if author_id == message.author.id]
+        self._recent_messages[channel_id] = deque(
+            (entry for entry in recent if entry[1] != message.author.id),
+            maxlen=self.FLOOD_RECENT_MESSAGES
+        )
+        self._queue_flood_deletes(message.channel, flood_ids)
+        
+        warning_key = (channel_id, message.author.id)
+        if self._flood_warnings.allows(warning_key):
+            self._flood_warnings.record(warning_key)
+            try:
+                await message.channel.send(
+                    self.bot.templates.pick("flood.warning", message.guild.id, mention=message.author.mention),
+                    delete_after=5
+                )
+            except discord.HTTPException:
+                pass
+        return True
+
+    def _remember_message(self, channel_id: int, message_id: int, author_id: int) -> deque:
+        """Keep a short, bounded history of message IDs per channel for flood cleanup"""
+        recent = self._recent_messages.get(channel_id)
+        if recent is None:
+            recent = deque(maxlen=self.FLOOD_RECENT_MESSAGES)
+            self._recent_messages[channel_id] = recent
+            if len(self._recent_messages) > self.FLOOD_MAX_CHANNELS:
+                self._recent_messages.popitem(last=False)
+        else:
+            self._recent_messages.move_to_end(channel_id)
+        recent.append((message_id, author_id))
+        return recent
+
+    def _spawn(self, coro):
+        """Run a fire-and-forget task, holding it until it finishes"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _queue_flood_deletes(self, channel: discord.TextChannel, message_ids: List[int]):
+        """Queue messages for deletion, flushing each channel's queue as one bulk delete"""
+        pending = self._pending_flood_deletes.get(channel.id)
+        if pending is None:
+            pending = self._pending_flood_deletes[channel.id] = set()
+            self._spawn(self._flush_flood_deletes(channel))
+        pending.update(message_ids)
+
+    async def _flush_flood_deletes(self, channel: discord.TextChannel):
+        await asyncio.sleep(self.FLOOD_DELETE_DELAY)
+        message_ids = self._pending_flood_deletes.pop(channel.id, set())
+        messages = [channel.get_partial_message(message_id) for message_id in sorted(message_ids)]
+        try:
+            deleted_count = await self._delete_messages_efficiently(channel, messages)
+            self.logger.info(f"Flood cleanup deleted {deleted_count} messages in #{channel}")
+            self.modlog.record(channel.guild.id, "🌊", f"Deleted {deleted_count} flood message(s) in {channel.mention}")
+        except Exception as e:
+            self.logger.error(f"Error deleting flood messages: {e}")
+
+    async def _slow_down_channel(self, channel: discord.TextChannel):
+        """Turn on slowmode for a raided channel and lift it again later"""
+        if channel.id in self._slowed_channels or not isinstance(channel, discord.TextChannel):
+            return
+        
+        previous_delay = channel.slowmode_delay
+        if previous_delay >= self.FLOOD_SLOWMODE:
+            return
+        
+        self._slowed_channels[channel.id] = (previous_delay, time.time() + self.FLOOD_SLOWMODE_DURATION)
+        try:
+            await channel.edit(slowmode_delay=self.FLOOD_SLOWMODE, reason="Message flood detected")
+            self.modlog.record(channel.guild.id, "🐢", f"Turned on {self.FLOOD_SLOWMODE}s slowmode in {channel.mention} for a message flood")
+            await channel.send(self.bot.templates.pick("flood.slowmode", channel.guild.id), delete_after=30)
+        except discord.HTTPException as e:
+            self._slowed_channels.pop(channel.id, None)
+            self.logger.warning(f"Couldn't enable slowmode in #{channel}: {e}")
+            return
+        
+        self._spawn(self._restore_slowmode(channel.id, previous_delay, self.FLOOD_SLOWMODE_DURATION))
+
+    async def _restore_slowmode(self, channel_id: int, delay: int, wait: float):
+        await asyncio.sleep(wait)
+        try:
+            channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
+            await channel.edit(slowmode_delay=delay, reason="Message flood is over")
+        except discord.HTTPException as e:
+            self.logger.warning(f"Couldn't restore slowmode in channel {channel_id}: {e}")
+        finally:
+            self._slowed_channels.pop(channel_id, None)
+
+    def snapshot_warmup(self) -> dict:
+        """State to carry over a restart: hot trigger guilds, purge start points and pending slowmodes"""
+        return {
+            "trigger_guilds": self.trigger_store.resident_guilds(),
+            "clear_start_points": self.clear_start_points,
+            "slowed_channels": self._slowed_channels
+        }
+
+    def restore_warmup(self, snapshot: dict, age: float):
+        if age <= self.WARMUP_MAX_AGE:
+            # Load the guilds that were hot, oldest first so the LRU order survives
+            for guild_id in snapshot.get("trigger_guilds", []):
+                self.trigger_store.get(guild_id)
+            for channel_id, message_id in snapshot.get("clear_start_points", {}).items():
+                self.clear_start_points.setdefault(int(channel_id), message_id)
+        # Slowmode turned on before the restart still has to be lifted, however long we were down
+        now = time.time()
+        for channel_id, (delay, restore_at) in snapshot.get("slowed_channels", {}).items():
+            channel_id = int(channel_id)
+            self._slowed_channels[channel_id] = (delay, restore_at)
+            self._spawn(self._restore_slowmode(channel_id, delay, max(0.0, restore_at - now)))
+
     # Word blocking functionality with slash commands
     async def check_blocked_words(self, message: discord.Message) -> bool:
         """Optimized blocked word checking with early returns"""
         if message.author.bot:
             return False
         
-        user_id = str(message.author.id)
+        user_id = message.author.id
         
         # Fast path: check if user has any blocked words
-        if user_id not in self._users_with_blocks:
+        if not message.guild or not self.blocked_words.has_blocks(user_id):
             return False
         
-        blocked_words_for_user = self.blocked_words.get(user_id)
-        if not blocked_words_for_user:
+        if await self._contains_blocked_word(message.guild.id, user_id, message.content):
+            self._count_blocked_hit(message.guild.id, user_id, message.content)
+            return await self._handle_blocked_message(message)
+        return False
+
+    def _count_blocked_hit(self, guild_id: int, user_id: int, content: str):
+        """Credit the blocked word that matched; matchers too big to search on the loop again are skipped"""
+        content = content.lower()
+        for matcher in self.blocked_words.matchers_for(guild_id, user_id):
+            if self.match_pool.should_offload(matcher.size):
+                continue
+            word = matcher.find(content)
+            if word is not None:
+                self.hits.hit("blocked", guild_id, word)
+                return
+
+    async def _contains_blocked_word(self, guild_id: int, user_id: int, content: str) -> bool:
+        """Whether content has a word blocked for the user in the guild"""
+        matchers = self.blocked_words.matchers_for(guild_id, user_id)
+        if not matchers:
             return False
         
-        message_content = message.content.lower()
-        
-        # Use any() for early termination
-        if any(word in message_content for word in blocked_words_for_user):
-            return await self._handle_blocked_message(message)
+        # Repeated content is answered from the verdict cache without normalizing it again
+        content_hash = hash(content)
+        message_content = None
+        
+        for matcher in matchers:
+            key = ("blocked", guild_id, matcher.version, content_hash)
+            blocked = self.verdicts.get(key)
+            if blocked is MISS:
+                if message_content is None:
+                    message_content = content.lower()
+                if self.match_pool.should_offload(matcher.size):
+                    blocked = await self.match_pool.search_blocked(matcher, message_content)
+                else:
+                    blocked = matcher.search(message_content)
+                self.verdicts.put(key, blocked)
+            if blocked:
+                return True
         
         return False
 
-    async def _handle_blocked_message(self, message: discord.Message) -> bool:
-        """Handle a message containing blocked words"""
+    async def _handle_blocked_message(self, message: discord.Message, author_id: Optional[int] = None) -> bool:
+        """Handle a message containing blocked words; partial messages need the author ID"""
+        author_id = author_id or message.author.id
+        if message.guild:
+            self.bot.reaction_budget.yield_to_moderation(message.guild.id)
+        
         try:
             await message.delete()
             
             # Tika's sassy response to blocked words
-            responses = [
-                f"Nice try, {message.author.mention}! But I'm not letting that slip by~ 🙄",
-                f"Uh-uh! {message.author.mention}, you know better than that! 😤",
-                f"{message.author.mention}, really? I expected better from you... 💢",
-                f"Nope! {message.author.mention}, that word is off-limits! 😏"
-            ]
-            
-            import random
+            guild_id = message.guild.id if message.guild else None
+            self.modlog.record(guild_id, "🚫", f"Deleted a message from <@{author_id}> in <#{message.channel.id}> for a blocked word")
             warning_msg = await message.channel.send(
-                random.choice(responses),
+                self.bot.templates.pick("blocked.warning", guild_id, mention=f"<@{author_id}>"),
                 delete_after=5
             )
             return True
@@ -390,19 +604,21 @@ class Moderation(commands.Cog):
             return True
         except discord.Forbidden:
             # No permission to delete
-            self.logger.warning(f"No permission to delete message from {message.author}")
+            self.logger.warning(f"No permission to delete message from user {author_id}")
             return False
 
     @app_commands.command(name="blockword", description="Add a blocked word for a specific user")
     @app_commands.describe(
         user="The user to block the word for",
-        word="The word to block"
+        word="The word to block",
+        duration="How long the block lasts, like 30m, 24h or 7d (forever if empty)"
     )
     async def block_word(
         self, 
         interaction: discord.Interaction, 
         user: discord.Member, 
-        word: str
+        word: str,
+        duration: Optional[str] = None
     ):
         """Add a word to the blocked list for a specific user"""
         
@@ -422,27 +638,23 @@ class Moderation(commands.Cog):
             )
             return
         
-        user_id = str(user.id)
-        
-        # Initialize user's blocked words set if needed
-        if user_id not in self.blocked_words:
-            self.blocked_words[user_id] = set()
-            self._users_with_blocks.add(user_id)
+        expires_at = await self._parse_expiry(interaction, duration)
+        if expires_at is False:
+            return
         
-        # Check if word is already blocked
-        if normalized_word in self.blocked_words[user_id]:
+        # Add the word, checking if it's already blocked
+        if not self.blocked_words.add(interaction.guild.id, user.id, normalized_word):
             await interaction.response.send_message(
                 f"Hello?! The word '{normalized_word}' is already blocked for {user.display_name}! Pay attention! 😒",
                 ephemeral=True
             )
             return
         
-        # Add the word
-        self.blocked_words[user_id].add(normalized_word)
+        self._set_expiry(("blocked", interaction.guild.id, user.id, normalized_word), expires_at)
         await self._save_blocked_words()
         
         await interaction.response.send_message(
-            f"Fine! I've blocked the word '{normalized_word}' for {user.display_name}. They better watch their language now! 😏",
+            f"Fine! I've blocked the word '{normalized_word}' for {user.display_name}{self._until_text(expires_at)}. They better watch their language now! 😏",
             ephemeral=True
         )
 
@@ -467,32 +679,25 @@ class Moderation(commands.Cog):
             return
         
         normalized_word = self._validate_and_normalize_word(word)
-        user_id = str(user.id)
+        guild_id = interaction.guild.id
         
         # Check if user has blocked words
-        if user_id not in self.blocked_words or not self.blocked_words[user_id]:
+        if not self.blocked_words.matchers_for(guild_id, user.id):
             await interaction.response.send_message(
                 f"Uh, {user.display_name} doesn't even have any blocked words! Are you sure you got the right person? 🤨",
                 ephemeral=True
             )
             return
         
-        # Check if word is blocked
-        if normalized_word not in self.blocked_words[user_id]:
+        # Remove the word, checking if it's blocked
+        if not self.blocked_words.remove(guild_id, user.id, normalized_word):
             await interaction.response.send_message(
                 f"The word '{normalized_word}' isn't even blocked for {user.display_name}! Double-check next time! 😤",
                 ephemeral=True
             )
             return
         
-        # Remove the word
-        self.blocked_words[user_id].discard(normalized_word)
-        
-        # Clean up empty sets
-        if not self.blocked_words[user_id]:
-            del self.blocked_words[user_id]
-            self._users_with_blocks.discard(user_id)
-        
+        self.expiries.cancel(("blocked", guild_id, user.id, normalized_word))
         await self._save_blocked_words()
         
         await interaction.response.send_message(
@@ -510,37 +715,38 @@ class Moderation(commands.Cog):
         if not message.guild:
             return
         
-        guild_id = str(message.guild.id)
-        
-        # Check if guild has any triggers
-        if guild_id not in self.triggers or not self.triggers[guild_id]:
-            return
-        
-        message_content = message.content.lower().strip()
-        
-        # Early return if message is empty
-        if not message_content:
+        # Check if guild has any triggers (loads them on the guild's first message)
+        guild_triggers = self.trigger_store.get(message.guild.id)
+        if guild_triggers is None:
             return
         
-        # Check each trigger
-        for main_word, data in self.triggers[guild_id].items():
-            # Use word boundaries for better matching
-            pattern = r'\b' + re.escape(main_word) + r'\b'
-            if re.search(pattern, message_content):
-                await self.send_nga_reply(message, data)
+        key = ("nga", message.guild.id, guild_triggers.version, hash(message.content))
+        data = self.verdicts.get(key)
+        if data is MISS:
+            tracer = self.bot.tracer
+            with tracer.span("nga.normalize"):
+                message_content = message.content.lower().strip()
+            
+            # Early return if message is empty
+            if not message_content:
                 return
             
-            # Check alternatives with word boundaries
-            for alternative in data["alternatives"]:
-                alt_pattern = r'\b' + re.escape(alternative) + r'\b'
-                if re.search(alt_pattern, message_content):
-                    await self.send_nga_reply(message, data)
-                    return
+            # One compiled pass over every trigger and alternative
+            with tracer.span("nga.match", triggers=guild_triggers.size):
+                if self.match_pool.should_offload(guild_triggers.size):
+                    data = await self.match_pool.match_triggers(guild_triggers, message_content)
+                else:
+                    data = guild_triggers.match(message_content)
+            self.verdicts.put(key, data)
+        if data is not None:
+            self.hits.hit("nga", message.guild.id, data.main_word)
+            with self.bot.tracer.span("nga.reply"):
+                await self.send_nga_reply(message, data)
 
-    async def send_nga_reply(self, message, trigger_data):
+    async def send_nga_reply(self, message, record: TriggerRecord):
         """Send the reply for a triggered word"""
         try:
-            reply = trigger_data["reply"]
+            reply = record.reply
             
             # Check if reply is a URL (image/gif)
             if self.is_url(reply):
@@ -574,35 +780,43 @@ class Moderation(commands.Cog):
             )
             return
         
-        user_id = str(user.id)
-        
-        # Check if user has blocked words
-        if user_id not in self.blocked_words or not self.blocked_words[user_id]:
-            await interaction.response.send_message(
-                f"{user.display_name} is clean! No blocked words at all. How refreshing~ 😊",
-                ephemeral=True
-            )
-            return
-        
-        blocked_words_list = sorted(self.blocked_words[user_id])  # Sort for consistent display
-        
-        # Handle large lists by truncating if necessary
-        max_display = 50
-        if len(blocked_words_list) > max_display:
-            displayed_words = blocked_words_list[:max_display]
-            words_text = ", ".join(f"`{word}`" for word in displayed_words)
-            words_text += f"\n... and {len(blocked_words_list) - max_display} more words! Wow, they really went overboard, huh?"
-        else:
-            words_text = ", ".join(f"`{word}`" for word in blocked_words_list)
-        
-        embed = discord.Embed(
-            title=f"🚫 {user.display_name}'s Blocked Words",
-            description=f"Here's what they can't say:\n{words_text}",
-            color=0xFF0000
+        guild_id = interaction.guild.id
+        view = PageView(lambda page: self._render_blocked_words_page(guild_id, user, page), interaction.user.id)
+        await view.start(
+            interaction,
+            f"{user.display_name} is clean! No blocked words at all. How refreshing~ 😊",
+            ephemeral=True
+        )
+
+    def _render_blocked_words_page(self, guild_id: int, user: discord.Member, page: int) -> Tuple[Optional[discord.Embed], int]:
+        """One page of a user's blocked words, rendered once per blocklist version"""
+        # A user's words only change by moving them onto a different matcher
+        version = tuple(matcher.version for matcher in self.blocked_words.matchers_for(guild_id, user.id))
+        if not version:
+            return None, 0
+        
+        words = self.list_pages.get_or_render(
+            ("blocked", guild_id, user.id, version),
+            lambda: sorted(self.blocked_words.words(guild_id, user.id))  # Sort for consistent display
         )
-        embed.set_footer(text=f"Total: {len(blocked_words_list)} word(s) - I'm keeping track! 📝")
+        page_count = -(-len(words) // self.BLOCKED_WORDS_PER_PAGE)
+        page = max(0, min(page, page_count - 1))
+        
+        def render():
+            start = page * self.BLOCKED_WORDS_PER_PAGE
+            words_text = ", ".join(f"`{word}`" for word in words[start:start + self.BLOCKED_WORDS_PER_PAGE])
+            embed = discord.Embed(
+                title=f"🚫 {user.display_name}'s Blocked Words",
+                description=f"Here's what they can't say:\n{words_text}",
+                color=0xFF0000
+            )
+            footer = f"Total: {len(words)} word(s) - I'm keeping track! 📝"
+            if page_count > 1:
+                footer += f" | Page {page + 1}/{page_count}"
+            embed.set_footer(text=footer)
+            return embed
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return self.list_pages.get_or_render(("blocked", guild_id, user.id, version, page), render), page_count
 
     @app_commands.command(name="clearallblockedwords", description="Clear all blocked words for a specific user")
     @app_commands.describe(user="The user to clear all blocked words for")
@@ -620,19 +834,18 @@ class Moderation(commands.Cog):
             )
             return
         
-        user_id = str(user.id)
+        guild_id = interaction.guild.id
+        for word in self.blocked_words.words(guild_id, user.id):
+            self.expiries.cancel(("blocked", guild_id, user.id, word))
+        word_count = self.blocked_words.clear(guild_id, user.id)
         
-        if user_id not in self.blocked_words or not self.blocked_words[user_id]:
+        if not word_count:
             await interaction.response.send_message(
                 f"{user.display_name} doesn't even have blocked words to clear! You're wasting my time~ 😒",
                 ephemeral=True
             )
             return
         
-        word_count = len(self.blocked_words[user_id])
-        del self.blocked_words[user_id]
-        self._users_with_blocks.discard(user_id)
-        
         await self._save_blocked_words()
         
         await interaction.response.send_message(
@@ -640,12 +853,136 @@ class Moderation(commands.Cog):
             ephemeral=True
         )
 
+    @app_commands.command(name="blockword-import", description="Block many words at once from a JSON or CSV file")
+    @app_commands.describe(
+        file="JSON ({user_id: [words]} or a list of words) or CSV (user_id,word or just word)",
+        user="Who the words are for when the file doesn't say",
+        duration="How long the new blocks last, like 24h or 7d (forever if empty)"
+    )
+    async def import_blocked_words(
+        self,
+        interaction: discord.Interaction,
+        file: discord.Attachment,
+        user: Optional[discord.Member] = None,
+        duration: Optional[str] = None
+    ):
+        """Import blocked words in one go: validated together, then one rebuild and one save"""
+        
+        if not self._check_admin_permission(interaction.user):
+            await interaction.response.send_message(
+                "Importing a whole blocklist? Not without administrator permissions, you're not! 😤",
+                ephemeral=True
+            )
+            return
+        
+        expires_at = await self._parse_expiry(interaction, duration)
+        if expires_at is False:
+            return
+        
+        data = await self._read_import_file(interaction, file)
+        if data is None:
+            return
+        
+        words, errors = parse_blocked_words(
+            data,
+            file.filename,
+            user.id if user else None,
+            self._validate_and_normalize_word,
+            self.MAX_IMPORT_ROWS
+        )
+        if errors:
+            await self._send_import_errors(interaction, errors)
+            return
+        
+        guild_id = interaction.guild.id
+        added = 0
+        for user_id, user_words in words.items():
+            new_words = self.blocked_words.add_many(guild_id, user_id, user_words)
+            for word in new_words:
+                self._set_expiry(("blocked", guild_id, user_id, word), expires_at)
+            added += len(new_words)
+        if added:
+            await self._save_blocked_words()
+        
+        await interaction.followup.send(
+            f"Done! I blocked {added} new word(s) for {len(words)} user(s) in one go{self._until_text(expires_at)}. "
+            f"The other {sum(map(len, words.values())) - added} were already blocked~ 😌",
+            ephemeral=True
+        )
+
+    @app_commands.command(name="blockword-export", description="Export this server's blocked words as a file")
+    @app_commands.describe(format="File format")
+    async def export_blocked_words(self, interaction: discord.Interaction, format: Literal["json", "csv"] = "json"):
+        """Export every user's blocked words in this server"""
+        
+        if not self._check_admin_permission(interaction.user):
+            await interaction.response.send_message(
+                "Hmph! That list is for administrators only! 😠",
+                ephemeral=True
+            )
+            return
+        
+        words = self.blocked_words.guild_words(interaction.guild.id)
+        if not words:
+            await interaction.response.send_message(
+                "There's nothing to export! Everyone here is squeaky clean~ 😊",
+                ephemeral=True
+            )
+            return
+        
+        if format == "csv":
+            content = blocked_words_csv(words)
+        else:
+            content = json.dumps({str(user_id): user_words for user_id, user_words in words.items()}, indent=2, ensure_ascii=False)
+        export = discord.File(io.BytesIO(content.encode('utf-8')), filename=f"blocked-words-{interaction.guild.id}.{format}")
+        await interaction.response.send_message(
+            f"Here's everything I'm keeping an eye on for {len(words)} user(s). Don't lose it! 📝",
+            file=export,
+            ephemeral=True
+        )
+
+    @app_commands.command(name="modlog", description="Set the channel where I log deletions, purges and trigger changes")
+    @app_commands.describe(channel="Where to log (leave empty to stop logging)")
+    async def set_modlog(self, interaction: discord.Interaction, channel: Optional[discord.TextChannel] = None):
+        """Set or clear this server's moderation log channel"""
+        if not self._check_admin_permission(interaction.user):
+            await interaction.response.send_message(
+                "Hmph! Only administrators get to decide where I write things down! 😤",
+                ephemeral=True
+            )
+            return
+        
+        guild_id = interaction.guild.id
+        if channel is None:
+            self.modlog.set_channel(guild_id, None)
+            await interaction.response.send_message(
+                "Fine, I'll stop keeping a log. Don't come crying to me when you want to know what happened! 😒",
+                ephemeral=True
+            )
+            return
+        
+        permissions = channel.permissions_for(interaction.guild.me)
+        if not (permissions.send_messages and permissions.embed_links):
+            await interaction.response.send_message(
+                f"How am I supposed to log anything in {channel.mention}? I need to send messages and embed links there! 🙄",
+                ephemeral=True
+            )
+            return
+        
+        self.modlog.set_channel(guild_id, channel.id)
+        await interaction.response.send_message(
+            f"Got it! I'll keep a record of everything in {channel.mention}. Batched, of course, I'm not spamming~ 📝",
+            ephemeral=True
+        )
+
     @app_commands.command(name="nga", description="Set up a trigger word with a custom reply")
     @app_commands.describe(
         text="The trigger word/phrase",
-        reply="The reply (text, image URL, or GIF URL)"
+        reply="The reply (text, image URL, or GIF URL)",
+        regex="Treat the trigger as a pattern (no lookaround or backreferences)",
+        duration="How long the trigger lasts, like 30m, 24h or 7d (forever if empty)"
     )
-    async def nga_setup(self, interaction: discord.Interaction, text: str, reply: str):
+    async def nga_setup(self, interaction: discord.Interaction, text: str, reply: str, regex: bool = False, duration: Optional[str] = None):
         """Set up a new trigger word with reply"""
         # Check if user has manage messages permission
         if not interaction.user.guild_permissions.manage_messages:
@@ -655,26 +992,44 @@ class Moderation(commands.Cog):
             )
             return
         
-        guild_id = str(interaction.guild.id)
-        trigger_key = text.lower().strip()
+        expires_at = await self._parse_expiry(interaction, duration)
+        if expires_at is False:
+            return
+        
+        guild_id = interaction.guild.id
+        key = trigger_key(text, regex)
         
         # Initialize guild data if not exists
-        if guild_id not in self.triggers:
-            self.triggers[guild_id] = {}
+        guild_triggers = self.trigger_store.ensure(guild_id)
+        
+        if regex:
+            text = text.strip()
+            error = self._check_regex_budget(guild_triggers, key, text)
+            if error:
+                await interaction.response.send_message(
+                    f"Ugh, I'm not running that pattern on every message! {error} 😤",
+                    ephemeral=True
+                )
+                return
         
         # Create or update trigger
-        self.triggers[guild_id][trigger_key] = {
-            "main_word": text,
-            "alternatives": [],
-            "reply": reply,
-            "created_by": interaction.user.id,
-            "created_at": interaction.created_at.isoformat()
-        }
+        guild_triggers.triggers[sys.intern(key)] = TriggerRecord(
+            text,
+            reply,
+            created_by=interaction.user.id,
+            created_at=interaction.created_at.timestamp(),
+            regex=regex
+        )
         
-        self.save_triggers()
+        self._set_expiry(("nga", guild_id, key), expires_at)
+        self._triggers_changed(guild_id)
+        self.modlog.record(
+            guild_id, "🎯",
+            f"{interaction.user.mention} set the {'pattern' if regex else 'trigger'} `{text}`{self._until_text(expires_at)}"
+        )
         
         await interaction.response.send_message(
-            f"Fine, fine! I set up the trigger `{text}` for you. Now when someone says that, I'll respond with your little message. You better appreciate my hard work! ✨\n"
+            f"Fine, fine! I set up the trigger `{text}` for you{self._until_text(expires_at)}. Now when someone says that, I'll respond with your little message. You better appreciate my hard work! ✨\n"
             f"**Reply preview:** {reply[:100]}{'...' if len(reply) > 100 else ''}"
         )
 
@@ -701,12 +1056,13 @@ class Moderation(commands.Cog):
             )
             return
         
-        guild_id = str(interaction.guild.id)
-        main_key = main_trigger.lower().strip()
+        guild_id = interaction.guild.id
+        guild_triggers = self.trigger_store.get(guild_id)
+        main_key = self._find_trigger_key(guild_triggers, main_trigger)
         alt_key = alternative.lower().strip()
         
         # Check if main trigger exists
-        if guild_id not in self.triggers or main_key not in self.triggers[guild_id]:
+        if guild_triggers is None or main_key not in guild_triggers.triggers:
             await interaction.response.send_message(
                 f"Hello?! The main trigger `{main_trigger}` doesn't even exist! Use `/nga` to create it first, genius! 😒", 
                 ephemeral=True
@@ -714,7 +1070,8 @@ class Moderation(commands.Cog):
             return
         
         # Check if alternative already exists
-        if alt_key in self.triggers[guild_id][main_key]["alternatives"]:
+        record = guild_triggers.triggers[main_key]
+        if alt_key in record.alternatives:
             await interaction.response.send_message(
                 f"Ugh! The alternative `{alternative}` already exists for `{main_trigger}`! Pay attention next time! 💢", 
                 ephemeral=True
@@ -722,10 +1079,11 @@ class Moderation(commands.Cog):
             return
         
         # Add alternative
-        self.triggers[guild_id][main_key]["alternatives"].append(alt_key)
-        self.save_triggers()
+        record.add_alternative(alt_key)
+        self._triggers_changed(guild_id)
+        self.modlog.record(guild_id, "➕", f"{interaction.user.mention} added `{alt_key}` to the trigger `{record.main_word}`")
         
-        all_alts = self.triggers[guild_id][main_key]["alternatives"]
+        all_alts = record.alternatives
         alt_text = f"\n**All alternatives:** {', '.join([f'`{alt}`' for alt in all_alts[:10]])}{'...' if len(all_alts) > 10 else ''}" if all_alts else ""
         
         await interaction.response.send_message(
@@ -735,32 +1093,48 @@ class Moderation(commands.Cog):
     @app_commands.command(name="nga-list", description="List all triggers and their alternatives")
     async def nga_list(self, interaction: discord.Interaction):
         """List all triggers for this server"""
-        guild_id = str(interaction.guild.id)
-        
-        if guild_id not in self.triggers or not self.triggers[guild_id]:
-            await interaction.response.send_message("Hmm... This server doesn't have any triggers set up yet! How boring~ 😴")
-            return
-        
-        embed = discord.Embed(
-            title="📋 Server Triggers - Tika's Collection",
-            color=0x3498db,
-            description="Here are all the triggers I'm watching for! I'm quite thorough, you know~ 😏"
-        )
-        
-        for main_word, data in self.triggers[guild_id].items():
-            alternatives_text = ""
-            if data["alternatives"]:
-                alternatives_text = f"\n**Alternatives:** {', '.join([f'`{alt}`' for alt in data['alternatives'][:5]])}{'...' if len(data['alternatives']) > 5 else ''}"
-            
-            reply_preview = data["reply"][:50] + "..." if len(data["reply"]) > 50 else data["reply"]
-            
-            embed.add_field(
-                name=f"🎯 {data['main_word']}",
-                value=f"**Reply:** {reply_preview}{alternatives_text}",
-                inline=False
+        guild_id = interaction.guild.id
+        view = PageView(lambda page: self._render_trigger_page(guild_id, page), interaction.user.id)
+        await view.start(interaction, "Hmm... This server doesn't have any triggers set up yet! How boring~ 😴")
+
+    def _render_trigger_page(self, guild_id: int, page: int) -> Tuple[Optional[discord.Embed], int]:
+        """One page of a guild's triggers, rendered once per trigger set version"""
+        guild_triggers = self.trigger_store.get(guild_id)
+        if guild_triggers is None or not guild_triggers.records:
+            return None, 0
+        
+        records = guild_triggers.records
+        page_count = -(-len(records) // self.TRIGGERS_PER_PAGE)
+        page = max(0, min(page, page_count - 1))
+        
+        def render():
+            embed = discord.Embed(
+                title="📋 Server Triggers - Tika's Collection",
+                color=0x3498db,
+                description="Here are all the triggers I'm watching for! I'm quite thorough, you know~ 😏"
             )
-        
-        await interaction.response.send_message(embed=embed)
+            
+            start = page * self.TRIGGERS_PER_PAGE
+            for record in records[start:start + self.TRIGGERS_PER_PAGE]:
+                alternatives_text = ""
+                if record.alternatives:
+                    alternatives_text = f"\n**Alternatives:** {', '.join([f'`{alt}`' for alt in record.alternatives[:5]])}{'...' if len(record.alternatives) > 5 else ''}"
+                
+                expires_at = self.expiries.deadline(("nga", guild_id, trigger_key(record.main_word, record.regex)))
+                expiry_text = f"\n**Expires:** <t:{int(expires_at)}:R>" if expires_at else ""
+                
+                reply_preview = record.reply[:50] + "..." if len(record.reply) > 50 else record.reply
+                
+                embed.add_field(
+                    name=f"🎯 {record.main_word}{' (regex)' if record.regex else ''}",
+                    value=f"**Reply:** {reply_preview}{alternatives_text}{expiry_text}",
+                    inline=False
+                )
+            if page_count > 1:
+                embed.set_footer(text=f"Page {page + 1}/{page_count} - {len(records)} triggers")
+            return embed
+        
+        return self.list_pages.get_or_render(("nga", guild_id, guild_triggers.version, page), render), page_count
 
     @app_commands.command(name="nga-remove", description="Remove a trigger")
     @app_commands.describe(trigger="The main trigger word to remove")
@@ -774,10 +1148,11 @@ class Moderation(commands.Cog):
             )
             return
         
-        guild_id = str(interaction.guild.id)
-        trigger_key = trigger.lower().strip()
+        guild_id = interaction.guild.id
+        guild_triggers = self.trigger_store.get(guild_id)
+        key = self._find_trigger_key(guild_triggers, trigger)
         
-        if guild_id not in self.triggers or trigger_key not in self.triggers[guild_id]:
+        if guild_triggers is None or key not in guild_triggers.triggers:
             await interaction.response.send_message(
                 f"Uh, the trigger `{trigger}` doesn't even exist! Are you sure you got the name right? 🤨", 
                 ephemeral=True
@@ -785,13 +1160,289 @@ class Moderation(commands.Cog):
             return
         
         # Remove trigger
-        del self.triggers[guild_id][trigger_key]
-        self.save_triggers()
+        del guild_triggers.triggers[key]
+        self.expiries.cancel(("nga", guild_id, key))
+        self._triggers_changed(guild_id)
+        self.modlog.record(guild_id, "🗑️", f"{interaction.user.mention} removed the trigger `{trigger}`")
         
         await interaction.response.send_message(
             f"Fine! I removed the trigger `{trigger}` and all its alternatives. Gone forever! Hope you don't regret it~ 😏"
         )
 
+    @app_commands.command(name="nga-import", description="Add many triggers or alternatives at once from a JSON or CSV file")
+    @app_commands.describe(
+        file="JSON from /nga-export, or CSV with trigger,reply,alternatives,regex columns",
+        replace="Drop every existing trigger first",
+        duration="How long the imported triggers last, like 24h or 7d (forever if empty)"
+    )
+    async def nga_import(self, interaction: discord.Interaction, file: discord.Attachment, replace: bool = False, duration: Optional[str] = None):
+        """Import triggers in one transaction: validated together, then one rebuild and one save"""
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message(
+                "A whole file of triggers?! Get 'Manage Messages' permission first! 💢",
+                ephemeral=True
+            )
+            return
+        
+        expires_at = await self._parse_expiry(interaction, duration)
+        if expires_at is False:
+            return
+        
+        data = await self._read_import_file(interaction, file, ephemeral=False)
+        if data is None:
+            return
+        
+        imports, errors = parse_triggers(data, file.filename, self.MAX_IMPORT_ROWS)
+        guild_id = interaction.guild.id
+        current = self.trigger_store.get(guild_id)
+        staged: Dict[str, TriggerRecord] = {} if replace or current is None else dict(current.triggers)
+        created_at = interaction.created_at.timestamp()
+        added = alternatives_added = 0
+        imported_keys = set()
+        created_keys = set()
+        
+        for item in imports:
+            existing = staged.get(item.key)
+            imported_keys.add(item.key)
+            if item.reply is None:
+                if existing is None:
+                    errors.append(f"{item.where}: `{item.main_word}` has no reply and isn't an existing trigger")
+                    continue
+                # A copy, so nothing changes if a later row fails
+                new_alternatives = tuple(alt for alt in item.alternatives if alt not in existing.alternatives)
+                staged[item.key] = TriggerRecord(
+                    existing.main_word,
+                    existing.reply,
+                    existing.alternatives + new_alternatives,
+                    existing.created_by,
+                    existing.created_at,
+                    existing.regex
+                )
+                alternatives_added += len(new_alternatives)
+            else:
+                staged[sys.intern(item.key)] = TriggerRecord(
+                    item.main_word,
+                    item.reply,
+                    item.alternatives,
+                    created_by=interaction.user.id,
+                    created_at=created_at,
+                    regex=item.regex
+                )
+                created_keys.add(item.key)
+                added += 1
+        
+        regex_cost = 0
+        for key, record in staged.items():
+            if record.regex:
+                try:
+                    regex_cost += pattern_cost(record.main_word)
+                except SafeRegexError as e:
+                    # Old hand-edited patterns are skipped by the matcher, like on load
+                    if key in imported_keys:
+                        errors.append(f"`{record.main_word}`: {e}")
+        if regex_cost > self.MAX_GUILD_REGEX_STATES:
+            errors.append(f"The patterns are too complex together ({regex_cost} states, limit {self.MAX_GUILD_REGEX_STATES})")
+        
+        if errors:
+            await self._send_import_errors(interaction, errors, ephemeral=False)
+            return
+        
+        if current is not None:
+            for key in current.triggers.keys() - staged.keys():
+                self.expiries.cancel(("nga", guild_id, key))
+        # Rows that only add alternatives keep the trigger's expiry
+        for key in created_keys:
+            self._set_expiry(("nga", guild_id, key), expires_at)
+        if staged or current is not None:
+            self.trigger_store.ensure(guild_id).triggers = staged
+            self._triggers_changed(guild_id)
+        self.modlog.record(
+            guild_id, "📥",
+            f"{interaction.user.mention} imported {added} trigger(s) and {alternatives_added} alternative(s)"
+            f"{' replacing the old ones' if replace else ''}{self._until_text(expires_at)}"
+        )
+        
+        await interaction.followup.send(
+            f"Phew, all done! I set up {added} trigger(s){self._until_text(expires_at)} and added {alternatives_added} alternative(s) in one go. "
+            f"This server now has {len(staged)} trigger(s). You owe me one~ ✨"
+        )
+
+    @app_commands.command(name="nga-export", description="Export this server's triggers as a file")
+    @app_commands.describe(format="File format")
+    async def nga_export(self, interaction: discord.Interaction, format: Literal["json", "csv"] = "json"):
+        """Export every trigger in this server"""
+        guild_triggers = self.trigger_store.get(interaction.guild.id)
+        
+        if guild_triggers is None or not guild_triggers.records:
+            await interaction.response.send_message(
+                "Hmm... There are no triggers here to export! How boring~ 😴",
+                ephemeral=True
+            )
+            return
+        
+        if format == "csv":
+            content = triggers_csv(guild_triggers.records)
+        else:
+            content = json.dumps(guild_triggers.to_json(), indent=2, ensure_ascii=False)
+        export = discord.File(io.BytesIO(content.encode('utf-8')), filename=f"triggers-{interaction.guild.id}.{format}")
+        await interaction.response.send_message(
+            f"Here are all {len(guild_triggers.records)} of my triggers. Treat them with care! 📋",
+            file=export,
+            ephemeral=True
+        )
+
+    @app_commands.command(name="nga-stats", description="See which triggers and blocked words actually fire")
+    async def nga_stats(self, interaction: discord.Interaction):
+        """Top triggers, hit rates and triggers that never fired"""
+        if not interaction.user.guild_permissions.manage_messages:
+            await interaction.response.send_message(
+                "My records are private! You need 'Manage Messages' permission to peek~ 😤",
+                ephemeral=True
+            )
+            return
+        
+        guild_id = interaction.guild.id
+        guild_triggers = self.trigger_store.get(guild_id)
+        records = guild_triggers.records if guild_triggers is not None else []
+        triggers = self.hits.get("nga", guild_id)
+        blocked = self.hits.get("blocked", guild_id)
+        if not records and blocked is None:
+            await interaction.response.send_message(
+                "Stats for what? There's nothing set up here yet! 😴",
+                ephemeral=True
+            )
+            return
+        
+        # Removed entries shouldn't keep holding top slots
+        self.hits.prune("nga", guild_id, (record.main_word for record in records))
+        self.hits.prune("blocked", guild_id, {
+            word for words in self.blocked_words.guild_words(guild_id).values() for word in words
+        })
+        
+        embed = discord.Embed(
+            title="📊 Trigger Stats - Tika's Notebook",
+            color=0x3498db,
+            description="Here's what actually gets said around here. I notice everything, you know~ 😏"
+        )
+        
+        counters = [counter for counter in (triggers, blocked) if counter is not None]
+        since = min((counter.since for counter in counters), default=time.time())
+        days = max((time.time() - since) / 86400, 1 / 24)
+        
+        if triggers is not None and triggers.top:
+            lines = [
+                f"`{word}` - {count} hit(s), {count / days:.1f}/day, {count / max(triggers.total, 1):.0%}"
+                for word, count in triggers.most_common(self.STATS_TOP_TRIGGERS)
+            ]
+            embed.add_field(name=f"🎯 Top triggers ({triggers.total} hits)", value=self._join_field(lines, "\n"), inline=False)
+        
+        never = [record.main_word for record in records if triggers is None or not triggers.count(record.main_word)]
+        if never:
+            embed.add_field(
+                name=f"💤 Never fired ({len(never)} of {len(records)})",
+                value=self._join_field([f"`{word}`" for word in never], ", "),
+                inline=False
+            )
+        
+        if blocked is not None and blocked.top:
+            lines = [f"`{word}` - {count} time(s)" for word, count in blocked.most_common(self.STATS_TOP_BLOCKED_WORDS)]
+            embed.add_field(name=f"🚫 Most blocked words ({blocked.total} deletions)", value=self._join_field(lines, "\n"), inline=False)
+        
+        embed.set_footer(
+            text=f"Counting since {datetime.fromtimestamp(since).strftime('%Y-%m-%d')}. "
+                 f"Counts outside the top {self.hits.top_k} are estimates and may run a little high."
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @staticmethod
+    def _join_field(items: List[str], separator: str, limit: int = 1024) -> str:
+        """Join items into an embed field value, cutting off with a count of what's left"""
+        text = ""
+        for index, item in enumerate(items):
+            candidate = text + separator + item if text else item
+            rest = f"{separator}...and {len(items) - index} more"
+            if len(candidate) + len(rest) > limit:
+                return text + rest
+            text = candidate
+        return text
+
+    async def _read_import_file(self, interaction: discord.Interaction, file: discord.Attachment, ephemeral: bool = True) -> Optional[bytes]:
+        """Defer and download an import attachment; None (after telling the user) if it's unusable"""
+        if file.size > self.MAX_IMPORT_BYTES:
+            await interaction.response.send_message(
+                f"That file is way too big! Keep it under {self.MAX_IMPORT_BYTES // (1024 * 1024)} MB, please~ 😩",
+                ephemeral=True
+            )
+            return None
+        
+        await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+        try:
+            return await file.read()
+        except discord.HTTPException as e:
+            self.logger.error(f"Error downloading import file: {e}")
+            await interaction.followup.send("Ugh, I couldn't even download that file! Try again~ 😒", ephemeral=ephemeral)
+            return None
+
+    async def _send_import_errors(self, interaction: discord.Interaction, errors: List[str], ephemeral: bool = True):
+        shown = "\n".join(f"• {error}" for error in errors[:self.MAX_IMPORT_ERRORS_SHOWN])
+        more = f"\n...and {len(errors) - self.MAX_IMPORT_ERRORS_SHOWN} more" if len(errors) > self.MAX_IMPORT_ERRORS_SHOWN else ""
+        await interaction.followup.send(
+            f"Nope! I didn't import anything, that file has problems. Fix these first! 💢\n{shown}{more}"[:2000],
+            ephemeral=ephemeral
+        )
+
+    async def _parse_expiry(self, interaction: discord.Interaction, duration: Optional[str]):
+        """Epoch deadline for a duration option, None for no expiry, or False after rejecting it"""
+        if not duration:
+            return None
+        try:
+            seconds = parse_duration(duration, self.MAX_ENTRY_DURATION)
+        except ValueError as e:
+            await interaction.response.send_message(f"Huh? {e}! Try again~ 🙄", ephemeral=True)
+            return False
+        return time.time() + seconds
+
+    def _set_expiry(self, key: tuple, expires_at: Optional[float]):
+        """Schedule an entry's expiry, or make it permanent again"""
+        if expires_at is None:
+            self.expiries.cancel(key)
+        else:
+            self.expiries.schedule(key, expires_at)
+
+    @staticmethod
+    def _until_text(expires_at: Optional[float]) -> str:
+        return f" until <t:{int(expires_at)}:f>" if expires_at else ""
+
+    async def _expire_entries(self, keys: List[tuple]):
+        """Drop expired blocks and triggers with one rebuild and one save per guild or user"""
+        blocked: Dict[Tuple[int, int], List[str]] = {}
+        triggers: Dict[int, List[str]] = {}
+        for key in keys:
+            if key[0] == "blocked":
+                blocked.setdefault((key[1], key[2]), []).append(key[3])
+            elif key[0] == "nga":
+                triggers.setdefault(key[1], []).append(key[2])
+        
+        removed = sum(
+            self.blocked_words.remove_many(guild_id, user_id, words)
+            for (guild_id, user_id), words in blocked.items()
+        )
+        if removed:
+            await self._save_blocked_words()
+        
+        expired_triggers = 0
+        for guild_id, trigger_keys in triggers.items():
+            guild_triggers = self.trigger_store.get(guild_id)
+            if guild_triggers is None:
+                continue
+            gone = [key for key in trigger_keys if guild_triggers.triggers.pop(key, None) is not None]
+            if gone:
+                expired_triggers += len(gone)
+                self._triggers_changed(guild_id)
+                self.modlog.record(guild_id, "⏳", f"Trigger(s) expired: {', '.join(f'`{key}`' for key in gone[:20])}{'...' if len(gone) > 20 else ''}")
+        
+        self.logger.info(f"Expired {removed} blocked word(s) and {expired_triggers} trigger(s)")
+
     def _check_admin_permission(self, user: discord.Member) -> bool:
         """Check if user has administrator permission"""
         return user.guild_permissions.administrator
@@ -812,9 +1463,115 @@ class Moderation(commands.Cog):
 
     @commands.Cog.listener()
     async def on_message(self, message):
-        """Listen for blocked words in messages"""
-        await self.check_blocked_words(message)
-        await self.check_nga_triggers(message)
+        """Listen for floods and blocked words in messages"""
+        tracer = self.bot.tracer
+        with tracer.trace("message", guild=message.guild.id if message.guild else None):
+            with tracer.span("flood"):
+                if await self.check_flood(message):
+                    return
+            self._remember_scan(message)
+            
+            # With worker processes the matching happens there; see on_message_verdict
+            if not message.author.bot and self._submit_to_workers(message):
+                return
+            with tracer.span("blocked_words"):
+                await self.check_blocked_words(message)
+            with tracer.span("nga"):
+                await self.check_nga_triggers(message)
+
+    def _remember_scan(self, message: discord.Message):
+        """Note the content we moderated so edits that don't change it are skipped"""
+        if message.guild is None or message.author.bot:
+            return
+        self._scanned_hashes[message.id] = hash(message.content)
+        if len(self._scanned_hashes) > self.EDIT_HASH_CACHE_SIZE:
+            self._scanned_hashes.popitem(last=False)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        """Rescan edited messages for blocked words, straight from the raw payload"""
+        data = payload.data
+        content = data.get("content")
+        author = data.get("author")
+        # Embed unfurls and pins arrive as edits without new content
+        if payload.guild_id is None or content is None or author is None or author.get("bot"):
+            return
+        
+        content_hash = hash(content)
+        if self._scanned_hashes.get(payload.message_id) == content_hash:
+            return
+        self._scanned_hashes[payload.message_id] = content_hash
+        self._scanned_hashes.move_to_end(payload.message_id)
+        if len(self._scanned_hashes) > self.EDIT_HASH_CACHE_SIZE:
+            self._scanned_hashes.popitem(last=False)
+        
+        author_id = int(author["id"])
+        if not self.blocked_words.has_blocks(author_id):
+            return
+        if not await self._contains_blocked_word(payload.guild_id, author_id, content):
+            return
+        self._count_blocked_hit(payload.guild_id, author_id, content)
+        
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel is None:
+            return
+        await self._handle_blocked_message(channel.get_partial_message(payload.message_id), author_id)
+
+    def _submit_to_workers(self, message: discord.Message) -> bool:
+        """Hand the message to a worker process; False if it must be checked here"""
+        workers = self.bot.workers
+        if workers is None:
+            return False
+        event = MessageEvent(
+            message.id,
+            message.channel.id,
+            message.guild.id if message.guild else None,
+            message.author.id,
+            message.content.lower()
+        )
+        return workers.submit(message, event)
+
+    @commands.Cog.listener()
+    async def on_message_verdict(self, message, verdict):
+        """Act on what a worker process found in a message"""
+        if verdict.blocked:
+            self._count_blocked_hit(message.guild.id, message.author.id, message.content)
+            await self._handle_blocked_message(message)
+        if verdict.trigger is not None:
+            self.hits.hit("nga", message.guild.id, verdict.trigger.main_word)
+            await self.send_nga_reply(message, verdict.trigger)
+
+    def _find_trigger_key(self, guild_triggers: Optional[GuildTriggers], text: str) -> str:
+        """Key of the trigger a user named; patterns are stored with their case"""
+        exact = text.strip()
+        record = guild_triggers.triggers.get(exact) if guild_triggers is not None else None
+        if record is not None and record.regex:
+            return exact
+        return trigger_key(text, regex=False)
+
+    def _check_regex_budget(self, guild_triggers: GuildTriggers, key: str, pattern: str) -> Optional[str]:
+        """Why a regex trigger can't be added, or None if it fits the guild's budget"""
+        try:
+            cost = pattern_cost(pattern)
+        except SafeRegexError as e:
+            return str(e)
+        
+        # A trigger being replaced gives its budget back
+        replaced = guild_triggers.triggers.get(key)
+        if replaced and replaced.regex:
+            try:
+                cost -= pattern_cost(replaced.main_word)
+            except SafeRegexError:
+                pass
+        if guild_triggers.regex_cost + cost > self.MAX_GUILD_REGEX_STATES:
+            return f"This server's patterns are already too complex (limit {self.MAX_GUILD_REGEX_STATES} states)."
+        return None
+
+    def _triggers_changed(self, guild_id: int):
+        """Save a guild's triggers and let its worker pick up the change"""
+        self.trigger_store.save(guild_id)
+        if self.bot.workers is not None:
+            self.bot.workers.reload_triggers(guild_id)
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
\ No newline at end of file
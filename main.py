@@ -1,10 +1,21 @@
 import discord
 from discord.ext import commands
+from discord import app_commands
 import asyncio
 import logging
 import os
+import signal
+import time
 from pathlib import Path
 
+from utils.ratelimit import CommandCooldowns, ReactionBudget
+from utils.scheduler import TimerWheel
+from utils.session import GatewaySession, WarmupSnapshot
+from utils.stats import StatsStore
+from utils.templates import TemplateRegistry
+from utils.tracing import Tracer
+from utils.workers import WorkerPool
+
 # what am I doing
 # Setup logging
 logging.basicConfig(
@@ -16,6 +27,34 @@ logging.basicConfig(
     ]
 )
 
+class TikaTree(app_commands.CommandTree):
+    """Command tree that rate limits every app command before it runs"""
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.type is not discord.InteractionType.application_command:
+            return True
+        
+        command = interaction.command
+        name = command.qualified_name if command else interaction.data.get('name', '')
+        interaction.extras['started_at'] = time.perf_counter()
+        blocked = self.client.cooldowns.check(name, interaction.user.id, interaction.guild_id)
+        if blocked:
+            rate, per, retry_after = blocked
+            raise app_commands.CommandOnCooldown(app_commands.Cooldown(rate, per), retry_after)
+        return True
+    
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        """Handle app command errors with Tika's personality"""
+        self.client.record_command(interaction, error=type(error).__name__)
+        if isinstance(error, app_commands.CommandOnCooldown):
+            await interaction.response.send_message(
+                f"Slow down there! You can use this again in {error.retry_after:.1f} seconds. Patience is a virtue, you know~",
+                ephemeral=True
+            )
+            return
+        
+        await super().on_error(interaction, error)
+
 class TikaBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
@@ -27,18 +66,53 @@ class TikaBot(commands.Bot):
             command_prefix='!',
             intents=intents,
             help_command=None,
-            case_insensitive=True
+            case_insensitive=True,
+            tree_cls=TikaTree,
+            # Nothing needs the full member list, so skip the chunking storm on every login
+            chunk_guilds_at_startup=False
         )
         
         # Create data directory
         Path('data').mkdir(exist_ok=True)
+        
+        # Shared scheduler for delayed animation edits and follow-ups
+        self.scheduler = TimerWheel()
+        
+        # Response text shared by every cog, hot-reloaded from data/templates.json
+        self.templates = TemplateRegistry()
+        
+        # Flavor reactions get a small REST budget that yields to moderation
+        self.reaction_budget = ReactionBudget()
+        
+        # Per-user game stats and affinity, flushed to disk in batches
+        self.stats = StatsStore()
+        
+        # Token-bucket limits for app commands, from data/command_limits.json
+        self.cooldowns = CommandCooldowns()
+        
+        # Optional worker processes for message matching (TIKA_WORKERS=N); None runs it inline
+        self.worker_count = int(os.getenv('TIKA_WORKERS', '0'))
+        self.workers = None
+        
+        # Sampled span tracing (TIKA_TRACE_SAMPLE=0.01 traces 1% of events) to logs/spans.jsonl
+        self.tracer = Tracer(sample_rate=float(os.getenv('TIKA_TRACE_SAMPLE', '0')))
+        
+        # Quick restarts RESUME the previous gateway session and restore cog state
+        self.gateway_session = GatewaySession()
+        self.warmup = WarmupSnapshot()
+        self._resumed_guild_ids = None
+        self._deploying = False  # Set by SIGTERM; only then is the session left resumable
     
     async def setup_hook(self):
         """Load all cogs when bot starts"""
+        self.scheduler.start()
+        self.stats.start()
+        
         cogs = [
             'cogs.personality',
             'cogs.fun_commands', 
-            'cogs.moderation'
+            'cogs.moderation',
+            'cogs.debug'
         ]
         
         for cog in cogs:
@@ -47,6 +121,73 @@ class TikaBot(commands.Bot):
                 print(f"✅ Loaded {cog}")
             except Exception as e:
                 print(f"❌ Failed to load {cog}: {e}")
+        
+        self.warmup.restore(self.cogs)
+        
+        saved = self.gateway_session.take()
+        if saved is not None:
+            self.gateway_session.resume_on_next_connect(self, saved)
+            self._resumed_guild_ids = saved["guild_ids"]
+        
+        # Deploys stop us with SIGTERM; shut down cleanly so the session can be resumed
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._on_sigterm)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not available on Windows
+        
+        if self.worker_count > 0:
+            workers = WorkerPool(self.worker_count, self._on_verdict)
+            workers.start()
+            self.workers = workers
+            print(f"⚙️ Matching messages in {self.worker_count} worker processes")
+    
+    def _on_sigterm(self):
+        self._deploying = True
+        self._close_task = asyncio.create_task(self.close())
+    
+    def _on_verdict(self, message, verdict):
+        """Hand a worker's verdict to the cogs as an on_message_verdict event"""
+        self.dispatch('message_verdict', message, verdict)
+    
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        self.record_command(interaction)
+    
+    def record_command(self, interaction: discord.Interaction, **attrs):
+        """Trace how long an app command took from the cooldown check to completion"""
+        started_at = interaction.extras.get('started_at')
+        if started_at is None or not self.tracer.enabled:
+            return
+        name = interaction.command.qualified_name if interaction.command else 'unknown'
+        self.tracer.record(
+            f"command:{name}",
+            time.perf_counter() - started_at,
+            guild=interaction.guild_id,
+            **attrs
+        )
+    
+    async def on_resumed(self):
+        # A resume right after a restart skips READY, so the guild cache is still empty
+        if self._resumed_guild_ids is None:
+            return
+        guild_ids, self._resumed_guild_ids = self._resumed_guild_ids, None
+        added = await self.gateway_session.hydrate(self, guild_ids)
+        print(f'🔁 Resumed the previous session and reloaded {added} servers')
+    
+    async def close(self):
+        if not self.is_closed():
+            self.warmup.save(self.cogs)
+            ws = self.ws
+            # Any other close (Ctrl+C, a crash handler, a token reset) ends the session for real
+            if self._deploying and ws is not None and ws.open and ws.session_id:
+                self.gateway_session.save(ws.session_id, ws.sequence, str(ws.gateway), (guild.id for guild in self.guilds))
+                self.gateway_session.keep_resumable(ws)
+        if self.workers is not None:
+            await self.workers.stop()
+            self.workers = None
+        await self.scheduler.stop()
+        await self.stats.stop()
+        self.tracer.close()
+        await super().close()
     
     async def on_ready(self):
         print(f'🎀 {self.user} is now online and ready to be sassy!')
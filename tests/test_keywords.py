@@ -0,0 +1,18 @@
+from utils.keywords import KeywordMatcher
+
+
+def test_overlapping_keywords_resolve_every_category():
+    matcher = KeywordMatcher({
+        "tika": ["tika is", "tika's"],
+        "name": ["tika"],
+        "study": ["test"],
+        "tester": ["tester"],
+    })
+    found = matcher.match("tika is a tester")
+    assert matcher.names(found) == ("tika", "name", "study", "tester")
+
+
+def test_keyword_shared_between_categories_sets_both_bits():
+    matcher = KeywordMatcher({"study": ["exam"], "stress": ["exam", "deadline"]})
+    assert matcher.names(matcher.match("exam tomorrow")) == ("study", "stress")
+    assert matcher.match("nothing to see here") == 0
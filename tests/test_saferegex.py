@@ -0,0 +1,16 @@
+import pytest
+
+from utils.saferegex import MAX_PATTERN_STATES, SafeRegexError, pattern_cost
+
+
+def test_nested_repeats_are_rejected_before_expansion():
+    for depth in range(2, 6):
+        pattern = '(' * depth + 'a{50}' + '){50}' * (depth - 1) + ')'
+        with pytest.raises(SafeRegexError, match="too complex"):
+            pattern_cost(pattern)
+
+
+def test_pattern_cost_matches_the_state_limit():
+    assert pattern_cost('(a{20}){20}') == MAX_PATTERN_STATES
+    with pytest.raises(SafeRegexError):
+        pattern_cost('(a{20}){20}b')
@@ -0,0 +1,40 @@
+from utils.bulkio import parse_triggers
+from utils.triggers import GuildTriggers, TriggerRecord, trigger_key
+
+
+def _guild(*triggers):
+    return GuildTriggers({
+        main_word: TriggerRecord(main_word, reply, regex=regex)
+        for main_word, reply, regex in triggers
+    })
+
+
+def test_prefix_overlapping_literals_resolve_to_first_defined():
+    guild = _guild(("hello", "R0", False), ("hello world", "R1", False))
+    assert guild.automaton is None
+    assert guild.match("hello world").reply == "R0"
+    assert guild.match("well hello there").reply == "R0"
+
+
+def test_prefix_overlapping_literals_resolve_the_same_with_a_regex_trigger():
+    guild = _guild(("hello", "R0", False), ("hello world", "R1", False), ("zz+", "R2", True))
+    assert guild.automaton is not None
+    assert guild.match("hello world").reply == "R0"
+
+
+def test_longer_word_defined_first_still_wins():
+    for regex_trigger in ((), (("zz+", "R2", True),)):
+        guild = _guild(("hello world", "R0", False), ("hello", "R1", False), *regex_trigger)
+        assert guild.match("hello world").reply == "R0"
+        assert guild.match("hello worlds").reply == "R1"
+        assert guild.match("helloworld") is None
+
+
+def test_patterns_keep_their_case_in_keys():
+    assert trigger_key("  \\d+x ", regex=True) == "\\d+x"
+    assert trigger_key("  \\D+x ", regex=True) == "\\D+x"
+    assert trigger_key(" Hello ", regex=False) == "hello"
+
+    imports, errors = parse_triggers(b"trigger,reply,regex\n\\d+x,R1,true\n\\D+x,R2,true\n", "t.csv", 10)
+    assert not errors
+    assert [item.key for item in imports] == ["\\d+x", "\\D+x"]
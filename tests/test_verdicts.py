@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from cogs.moderation import Moderation
+from utils.tracing import Tracer
+from utils.triggers import TriggerRecord, trigger_key
+
+GUILD_ID = 1
+USER_ID = 2
+
+
+def _moderation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bot = SimpleNamespace(get_channel=lambda channel_id: None, tracer=Tracer(), workers=None)
+    return Moderation(bot)
+
+
+def _message(content):
+    author = SimpleNamespace(id=USER_ID, bot=False)
+    return SimpleNamespace(content=content, author=author, guild=SimpleNamespace(id=GUILD_ID))
+
+
+def test_blocked_word_and_trigger_verdicts_stay_apart(tmp_path, monkeypatch):
+    moderation = _moderation(tmp_path, monkeypatch)
+    moderation.blocked_words.add(GUILD_ID, USER_ID, "badword")
+    guild_triggers = moderation.trigger_store.ensure(GUILD_ID)
+    guild_triggers.triggers[trigger_key("hello", False)] = TriggerRecord("hello", "hi!")
+    moderation.trigger_store.save(GUILD_ID)
+
+    # Both counters can land on the same number for the same guild
+    matcher, = moderation.blocked_words.matchers_for(GUILD_ID, USER_ID)
+    matcher.version = guild_triggers.version
+
+    replies = []
+
+    async def send_nga_reply(message, record):
+        replies.append(record.reply)
+
+    monkeypatch.setattr(moderation, "send_nga_reply", send_nga_reply)
+
+    async def scenario():
+        await moderation.check_nga_triggers(_message("hello there"))
+        assert not await moderation._contains_blocked_word(GUILD_ID, USER_ID, "hello there")
+        assert await moderation._contains_blocked_word(GUILD_ID, USER_ID, "a badword here")
+        await moderation.check_nga_triggers(_message("a badword here"))
+
+    asyncio.run(scenario())
+    assert replies == ["hi!"]
@@ -0,0 +1,99 @@
+"""Summarize span files written by utils.tracing
+
+Usage: python tools/analyze_spans.py [logs/spans.jsonl] [--top N]
+
+Prints per-span latency percentiles, how much of each root event's time
+its child spans account for, and the slowest traces with their breakdown.
+Rotated files (spans.jsonl.1, .2, ...) next to the given path are included.
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+
+def load_spans(path: Path) -> List[dict]:
+    files = sorted(path.parent.glob(path.name + '.*'), reverse=True) + [path]
+    spans = []
+    for file in files:
+        if not file.exists():
+            continue
+        with open(file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Partial line from a crash mid-write
+    return spans
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(spans: List[dict], top: int):
+    durations: Dict[str, List[float]] = defaultdict(list)
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    for span in spans:
+        if "ms" in span:
+            durations[span["name"]].append(span["ms"])
+            traces[span["trace"]].append(span)
+
+    print(f"{'span':<28}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        print(
+            f"{name:<28}{len(values):>8}{percentile(values, 0.5):>10.2f}"
+            f"{percentile(values, 0.95):>10.2f}{percentile(values, 0.99):>10.2f}{max(values):>10.2f}"
+        )
+
+    # Share of each root's time spent in its direct children
+    shares: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    totals: Dict[str, float] = defaultdict(float)
+    roots = []
+    for trace in traces.values():
+        root = next((span for span in trace if span.get("parent") is None), None)
+        if root is None:
+            continue
+        roots.append((root, trace))
+        totals[root["name"]] += root["ms"]
+        for span in trace:
+            if span.get("parent") == root["span"]:
+                shares[root["name"]][span["name"]] += span["ms"]
+
+    print("\nWhere root events spend their time")
+    for root_name, children in shares.items():
+        total = totals[root_name] or 1
+        accounted = sum(children.values())
+        parts = ", ".join(
+            f"{name} {ms / total:.0%}" for name, ms in sorted(children.items(), key=lambda item: -item[1])
+        )
+        print(f"  {root_name}: {parts}, other {max(0.0, 1 - accounted / total):.0%}")
+
+    print(f"\nSlowest {top} traces")
+    for root, trace in sorted(roots, key=lambda pair: -pair[0]["ms"])[:top]:
+        attrs = {key: value for key, value in root.items() if key not in ("trace", "span", "parent", "name", "ts", "ms")}
+        print(f"  {root['ms']:9.2f} ms  {root['name']} {attrs if attrs else ''}")
+        for span in sorted(trace, key=lambda span: span["span"]):
+            if span is not root:
+                print(f"      {span['ms']:9.2f} ms  {span['name']}{' !' + span['error'] if 'error' in span else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize Tika span traces")
+    parser.add_argument("path", nargs="?", default="logs/spans.jsonl")
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest traces to show")
+    args = parser.parse_args(argv)
+
+    spans = load_spans(Path(args.path))
+    if not spans:
+        print(f"No spans found at {args.path}", file=sys.stderr)
+        return 1
+    summarize(spans, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import itertools
+import re
+import sys
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Blocks saved before they were scoped per guild apply in every guild
+GLOBAL_SCOPE = 0
+
+# Every matcher ever built gets a fresh version, so cached verdicts never outlive it
+_matcher_versions = itertools.count(1)
+
+
+class WordTable:
+    """Interns every blocked word once and hands out small integer IDs"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.words: List[Optional[str]] = []
+        self._refs: List[int] = []
+        self._free: List[int] = []
+
+    def acquire(self, word: str) -> int:
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word = sys.intern(word)
+            if self._free:
+                word_id = self._free.pop()
+                self.words[word_id] = word
+                self._refs[word_id] = 0
+            else:
+                word_id = len(self.words)
+                self.words.append(word)
+                self._refs.append(0)
+            self.ids[word] = word_id
+        self._refs[word_id] += 1
+        return word_id
+
+    def release(self, word_id: int):
+        self._refs[word_id] -= 1
+        if not self._refs[word_id]:
+            del self.ids[self.words[word_id]]
+            self.words[word_id] = None
+            self._free.append(word_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class BlockMatcher:
+    """Compiled matcher for one distinct set of blocked words, shared by every user with that set"""
+    __slots__ = ('word_ids', 'pattern', 'refs', 'version')
+
+    def __init__(self, word_ids: FrozenSet[int], words: Iterable[str]):
+        self.word_ids = word_ids
+        # Longest first; plain substring matching like the old `word in content`
+        self.pattern = re.compile('|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)))
+        self.refs = 0
+        self.version = next(_matcher_versions)
+
+    @property
+    def size(self) -> int:
+        return len(self.word_ids)
+
+    def search(self, content: str) -> bool:
+        return self.pattern.search(content) is not None
+
+    def find(self, content: str) -> Optional[str]:
+        """The blocked word found in content, if any"""
+        match = self.pattern.search(content)
+        return match.group(0) if match else None
+
+
+class BlockedWordStore:
+    """Blocked words keyed by (guild ID, user ID) with deduplicated, reference-counted matchers"""
+
+    def __init__(self):
+        self.table = WordTable()
+        self.entries: Dict[Tuple[int, int], BlockMatcher] = {}
+        self._matchers: Dict[FrozenSet[int], BlockMatcher] = {}
+        self._user_scopes: Dict[int, int] = {}  # User ID -> number of scopes with blocks
+
+    def has_blocks(self, user_id: int) -> bool:
+        """Fast path: whether the user has blocked words anywhere"""
+        return user_id in self._user_scopes
+
+    def matchers_for(self, guild_id: int, user_id: int) -> List[BlockMatcher]:
+        """Matchers that apply to a user's messages in a guild"""
+        matchers = []
+        for scope in (guild_id, GLOBAL_SCOPE):
+            matcher = self.entries.get((scope, user_id))
+            if matcher is not None:
+                matchers.append(matcher)
+        return matchers
+
+    def words(self, guild_id: int, user_id: int) -> Set[str]:
+        """Every word blocked for a user in a guild, including global ones"""
+        words = self.table.words
+        return {
+            words[word_id]
+            for matcher in self.matchers_for(guild_id, user_id)
+            for word_id in matcher.word_ids
+        }
+
+    def add(self, guild_id: int, user_id: int, word: str) -> bool:
+        """Block a word; False if it was already blocked for that user there"""
+        if word in self.words(guild_id, user_id):
+            return False
+
+        current = self.entries.get((guild_id, user_id))
+        word_ids = current.word_ids if current else frozenset()
+        self._assign(guild_id, user_id, word_ids | {self.table.acquire(word)})
+        return True
+
+    def add_many(self, guild_id: int, user_id: int, words: Iterable[str]) -> Set[str]:
+        """Block several words with one matcher rebuild; returns the ones that were new"""
+        new_words = set(words) - self.words(guild_id, user_id)
+        if not new_words:
+            return new_words
+
+        current = self.entries.get((guild_id, user_id))
+        word_ids = current.word_ids if current else frozenset()
+        self._assign(guild_id, user_id, word_ids | {self.table.acquire(word) for word in new_words})
+        return new_words
+
+    def guild_words(self, guild_id: int) -> Dict[int, List[str]]:
+        """Every user's blocked words in a guild, including global ones, sorted"""
+        user_ids = {user_id for (scope, user_id) in self.entries if scope in (guild_id, GLOBAL_SCOPE)}
+        return {user_id: sorted(self.words(guild_id, user_id)) for user_id in sorted(user_ids)}
+
+    def remove(self, guild_id: int, user_id: int, word: str) -> bool:
+        """Unblock a word from the guild scope and the legacy global scope"""
+        word_id = self.table.ids.get(word)
+        if word_id is None:
+            return False
+
+        removed = False
+        for scope in (guild_id, GLOBAL_SCOPE):
+            current = self.entries.get((scope, user_id))
+            if current is not None and word_id in current.word_ids:
+                self._assign(scope, user_id, current.word_ids - {word_id})
+                self.table.release(word_id)
+                removed = True
+        return removed
+
+    def remove_many(self, guild_id: int, user_id: int, words: Iterable[str]) -> int:
+        """Unblock several words with one matcher rebuild per scope; returns how many were removed"""
+        word_ids = {self.table.ids[word] for word in words if word in self.table.ids}
+        removed = 0
+        for scope in (guild_id, GLOBAL_SCOPE):
+            current = self.entries.get((scope, user_id))
+            if current is None:
+                continue
+            gone = current.word_ids & word_ids
+            if not gone:
+                continue
+            self._assign(scope, user_id, current.word_ids - gone)
+            for word_id in gone:
+                self.table.release(word_id)
+            removed += len(gone)
+        return removed
+
+    def clear(self, guild_id: int, user_id: int) -> int:
+        """Drop every word blocked for a user in a guild (and their legacy global ones)"""
+        count = 0
+        for scope in (guild_id, GLOBAL_SCOPE):
+            current = self.entries.get((scope, user_id))
+            if current is None:
+                continue
+            count += len(current.word_ids)
+            for word_id in current.word_ids:
+                self.table.release(word_id)
+            self._assign(scope, user_id, frozenset())
+        return count
+
+    def _assign(self, guild_id: int, user_id: int, word_ids: FrozenSet[int]):
+        """Point (guild, user) at the shared matcher for word_ids, freeing the old one if unused"""
+        key = (guild_id, user_id)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            old.refs -= 1
+            if not old.refs:
+                del self._matchers[old.word_ids]
+            self._user_scopes[user_id] -= 1
+            if not self._user_scopes[user_id]:
+                del self._user_scopes[user_id]
+
+        if not word_ids:
+            return
+
+        matcher = self._matchers.get(word_ids)
+        if matcher is None:
+            matcher = BlockMatcher(word_ids, (self.table.words[word_id] for word_id in word_ids))
+            self._matchers[word_ids] = matcher
+        matcher.refs += 1
+        self.entries[key] = matcher
+        self._user_scopes[user_id] = self._user_scopes.get(user_id, 0) + 1
+
+    def load(self, data: dict):
+        """Load saved JSON, accepting the old unscoped {user: [words]} format as global blocks"""
+        self.__init__()
+        if "guilds" not in data:
+            data = {"guilds": {str(GLOBAL_SCOPE): data}}
+
+        for guild_id, users in data["guilds"].items():
+            for user_id, words in users.items():
+                word_ids = frozenset(self.table.acquire(word) for word in set(words))
+                if word_ids:
+                    self._assign(int(guild_id), int(user_id), word_ids)
+
+    def to_json(self) -> dict:
+        guilds: Dict[str, Dict[str, List[str]]] = {}
+        words = self.table.words
+        for (guild_id, user_id), matcher in self.entries.items():
+            guilds.setdefault(str(guild_id), {})[str(user_id)] = sorted(words[word_id] for word_id in matcher.word_ids)
+        return {"guilds": guilds}
@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from utils.triggers import TriggerRecord, trigger_key
+
+
+class TriggerImport(NamedTuple):
+    """One trigger from an import file; reply is None when it only adds alternatives"""
+    where: str  # Row or key, for error messages
+    key: str
+    main_word: str
+    reply: Optional[str]
+    alternatives: Tuple[str, ...]
+    regex: bool
+
+
+def _decode(data: bytes) -> str:
+    # Excel likes to prepend a BOM to CSV exports
+    return data.decode('utf-8-sig')
+
+
+def _is_json(text: str, filename: str) -> bool:
+    if filename.lower().endswith('.json'):
+        return True
+    if filename.lower().endswith('.csv'):
+        return False
+    return text.lstrip()[:1] in ('{', '[')
+
+
+def _csv_rows(text: str) -> List[Tuple[int, List[str]]]:
+    """Non-blank CSV rows with their 1-based row numbers"""
+    rows = []
+    for number, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        cells = [cell.strip() for cell in row]
+        if any(cells):
+            rows.append((number, cells))
+    return rows
+
+
+def _truthy(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 'regex')
+    return bool(value)
+
+
+def parse_blocked_words(
+    data: bytes,
+    filename: str,
+    default_user: Optional[int],
+    normalize: Callable[[str], str],
+    max_rows: int
+) -> Tuple[Dict[int, List[str]], List[str]]:
+    """Blocked words per user ID from a JSON or CSV file, plus every problem found
+
+    JSON is {"user_id": ["word", ...]} as written by the export, or a plain
+    list of words for default_user. CSV rows are `user_id,word`, or just
+    `word` for default_user; a header row is skipped.
+    """
+    errors: List[str] = []
+    words: Dict[int, List[str]] = {}
+    try:
+        text = _decode(data)
+    except UnicodeDecodeError:
+        return {}, ["The file isn't UTF-8 text"]
+
+    entries: List[Tuple[str, Optional[str], object]] = []  # (where, user ID, word)
+    if _is_json(text, filename):
+        try:
+            loaded = json.loads(text)
+        except json.JSONDecodeError as e:
+            return {}, [f"Invalid JSON: {e}"]
+        if isinstance(loaded, list):
+            entries = [(f"item {index}", None, word) for index, word in enumerate(loaded, start=1)]
+        elif isinstance(loaded, dict):
+            for user_id, user_words in loaded.items():
+                if not isinstance(user_words, list):
+                    errors.append(f"user {user_id}: expected a list of words")
+                    continue
+                entries += [(f"user {user_id}", user_id, word) for word in user_words]
+        else:
+            return {}, ["JSON must be a list of words or an object of user ID -> words"]
+    else:
+        for number, cells in _csv_rows(text):
+            if number == 1 and cells[0].lower() in ('user_id', 'user', 'word'):
+                continue
+            if len(cells) == 1:
+                entries.append((f"row {number}", None, cells[0]))
+            else:
+                entries.append((f"row {number}", cells[0], cells[1]))
+
+    if len(entries) > max_rows:
+        return {}, [f"Too many words ({len(entries)}); the limit is {max_rows} per import"]
+
+    for where, user_id, word in entries:
+        if user_id is None:
+            if default_user is None:
+                errors.append(f"{where}: no user ID, and no user was given to the command")
+                continue
+            target = default_user
+        else:
+            try:
+                target = int(user_id)
+            except ValueError:
+                errors.append(f"{where}: `{user_id}` isn't a user ID")
+                continue
+        normalized = normalize(word) if isinstance(word, str) else ""
+        if not normalized:
+            errors.append(f"{where}: invalid word")
+            continue
+        words.setdefault(target, []).append(normalized)
+    return words, errors
+
+
+def _trigger_import(where: str, main_word, reply, alternatives, regex) -> Tuple[Optional[TriggerImport], Optional[str]]:
+    if not isinstance(main_word, str) or not main_word.strip():
+        return None, f"{where}: missing trigger"
+    if reply is not None and (not isinstance(reply, str) or not reply.strip()):
+        reply = None
+    if isinstance(alternatives, str):
+        alternatives = alternatives.split('|')
+    if not isinstance(alternatives, (list, tuple)) or not all(isinstance(alt, str) for alt in alternatives):
+        return None, f"{where}: alternatives must be a list of strings"
+
+    regex = _truthy(regex)
+    main_word = main_word.strip()
+    key = trigger_key(main_word, regex)
+    seen = {key}
+    cleaned = []
+    for alternative in alternatives:
+        alternative = alternative.lower().strip()
+        if alternative and alternative not in seen:
+            seen.add(alternative)
+            cleaned.append(alternative)
+    return TriggerImport(where, key, main_word, reply, tuple(cleaned), regex), None
+
+
+def parse_triggers(data: bytes, filename: str, max_rows: int) -> Tuple[List[TriggerImport], List[str]]:
+    """Triggers from a JSON or CSV file, plus every problem found
+
+    JSON is the /nga-export format ({key: {"main_word", "reply", ...}}) or a
+    list of such objects. CSV needs a header with `trigger` and `reply`
+    columns and may have `alternatives` (separated by |) and `regex`.
+    A trigger without a reply only adds alternatives to an existing one.
+    """
+    errors: List[str] = []
+    imports: List[TriggerImport] = []
+    try:
+        text = _decode(data)
+    except UnicodeDecodeError:
+        return [], ["The file isn't UTF-8 text"]
+
+    raw: List[Tuple[str, object, object, object, object]] = []
+    if _is_json(text, filename):
+        try:
+            loaded = json.loads(text)
+        except json.JSONDecodeError as e:
+            return [], [f"Invalid JSON: {e}"]
+        if isinstance(loaded, dict):
+            items = [(f"`{key}`", value if isinstance(value, dict) else None, key) for key, value in loaded.items()]
+        elif isinstance(loaded, list):
+            items = [(f"item {index}", value if isinstance(value, dict) else None, None) for index, value in enumerate(loaded, start=1)]
+        else:
+            return [], ["JSON must be an object of triggers or a list of them"]
+        for where, value, key in items:
+            if value is None:
+                errors.append(f"{where}: expected an object")
+                continue
+            raw.append((where, value.get("main_word", key), value.get("reply"), value.get("alternatives", ()), value.get("regex")))
+    else:
+        rows = _csv_rows(text)
+        if not rows:
+            return [], ["The file is empty"]
+        header = [cell.lower() for cell in rows[0][1]]
+        if "trigger" not in header:
+            return [], ["CSV needs a header row with at least a `trigger` column"]
+        columns = {name: header.index(name) for name in ("trigger", "reply", "alternatives", "regex") if name in header}
+
+        def cell(cells: List[str], name: str) -> Optional[str]:
+            index = columns.get(name)
+            return cells[index] if index is not None and index < len(cells) else None
+
+        for number, cells in rows[1:]:
+            raw.append((f"row {number}", cell(cells, "trigger"), cell(cells, "reply"), cell(cells, "alternatives") or (), cell(cells, "regex")))
+
+    if len(raw) > max_rows:
+        return [], [f"Too many triggers ({len(raw)}); the limit is {max_rows} per import"]
+
+    for where, main_word, reply, alternatives, regex in raw:
+        item, error = _trigger_import(where, main_word, reply, alternatives, regex)
+        if error:
+            errors.append(error)
+        else:
+            imports.append(item)
+    return imports, errors
+
+
+def blocked_words_csv(words: Dict[int, List[str]]) -> str:
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(("user_id", "word"))
+    for user_id, user_words in words.items():
+        for word in user_words:
+            writer.writerow((user_id, word))
+    return stream.getvalue()
+
+
+def triggers_csv(records: List[TriggerRecord]) -> str:
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(("trigger", "reply", "alternatives", "regex"))
+    for record in records:
+        writer.writerow((record.main_word, record.reply, "|".join(record.alternatives), "true" if record.regex else ""))
+    return stream.getvalue()
@@ -0,0 +1,462 @@
+import math
+import random
+import re
+from functools import lru_cache
+from statistics import NormalDist
+from typing import NamedTuple, Optional, Tuple, FrozenSet
+
+import numpy as np
+
+# Expression limits
+MAX_EXPRESSION_LENGTH = 256  # Also keeps digit runs far below int()'s size limit
+MAX_TERMS = 10
+MAX_TOTAL_DICE = 1_000_000
+MIN_SIDES = 2
+MAX_SIDES = 1000
+MAX_MODIFIER = 1_000_000
+MAX_EXPLOSIONS = 100  # Per die, so a lucky streak can't loop forever
+
+# Terms with more dice than this are sampled in batches and summarized
+LIST_LIMIT = 100
+BATCH_SIZE = 100_000
+
+# One signed term: "+4d6kh3", "-1d4!", "+2"
+TERM_PATTERN = re.compile(r'([+-]?)(?:(\d*)d(\d+)(?:(kh|kl|k)(\d+))?(!)?|(\d+))')
+
+_np_rng = np.random.default_rng()
+
+
+class DiceError(ValueError):
+    """Raised when a dice expression can't be parsed or breaks the limits"""
+
+
+class DiceTerm(NamedTuple):
+    sign: int
+    count: int
+    sides: int
+    keep_mode: Optional[str] = None  # 'h' or 'l'
+    keep: int = 0
+    explode: bool = False
+
+    @property
+    def dice_kept(self) -> int:
+        return self.keep if self.keep_mode else self.count
+
+    def __str__(self) -> str:
+        text = f"{self.count}d{self.sides}"
+        if self.keep_mode:
+            text += f"k{self.keep_mode}{self.keep}"
+        if self.explode:
+            text += "!"
+        return text
+
+
+class DiceExpression(NamedTuple):
+    text: str
+    terms: Tuple[DiceTerm, ...]
+    modifier: int
+
+    @property
+    def total_dice(self) -> int:
+        return sum(term.count for term in self.terms)
+
+    @property
+    def is_single_die(self) -> bool:
+        """True for plain `1dN` rolls with nothing else attached"""
+        return (
+            len(self.terms) == 1
+            and self.modifier == 0
+            and self.terms[0] == DiceTerm(1, 1, self.terms[0].sides)
+        )
+
+    def bounds(self) -> Tuple[int, int]:
+        """Lowest and highest possible totals (explosions count as a plain max roll)"""
+        low = high = self.modifier
+        for term in self.terms:
+            term_low, term_high = term.dice_kept, term.dice_kept * term.sides
+            if term.sign > 0:
+                low += term_low
+                high += term_high
+            else:
+                low -= term_high
+                high -= term_low
+        return low, high
+
+
+class TermResult(NamedTuple):
+    term: DiceTerm
+    subtotal: int  # Signed contribution to the total
+    rolls: Optional[Tuple[int, ...]]  # None when the term was summarized
+    kept: Optional[FrozenSet[int]]  # Indexes into rolls, None when every die counts
+    minimum: int
+    maximum: int
+    mean: float
+
+
+class RollResult(NamedTuple):
+    expression: DiceExpression
+    total: int
+    terms: Tuple[TermResult, ...]
+
+
+def parse_dice(text: str) -> DiceExpression:
+    """Parse a dice expression like `4d6kh3 + 1d8! - 2`, cached by text"""
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise DiceError(f"That expression is way too long! Keep it under {MAX_EXPRESSION_LENGTH} characters.")
+    return _parse_normalized(re.sub(r'\s*([+-])\s*', r'\1', text.strip().lower()))
+
+
+@lru_cache(maxsize=512)
+def _parse_normalized(text: str) -> DiceExpression:
+    if not text:
+        raise DiceError("You didn't give me any dice!")
+
+    terms = []
+    modifier = 0
+    pos = 0
+    while pos < len(text):
+        match = TERM_PATTERN.match(text, pos)
+        if not match or match.end() == pos or (pos and not match.group(1)):
+            raise DiceError(f"I can't make sense of `{text[pos:] or text}`! Use something like `2d20`, `4d6kh3+2` or `3d6!`.")
+        pos = match.end()
+
+        sign = -1 if match.group(1) == '-' else 1
+        if match.group(7) is not None:
+            modifier += sign * int(match.group(7))
+            continue
+
+        count = int(match.group(2) or 1)
+        sides = int(match.group(3))
+        if count < 1:
+            raise DiceError("You need to roll at least one die!")
+        if not (MIN_SIDES <= sides <= MAX_SIDES):
+            raise DiceError(f"Die sides must be between {MIN_SIDES} and {MAX_SIDES}!")
+
+        keep_mode = None
+        keep = 0
+        if match.group(4):
+            keep_mode = 'l' if match.group(4) == 'kl' else 'h'
+            keep = int(match.group(5))
+            if not (1 <= keep <= count):
+                raise DiceError(f"You can only keep between 1 and {count} dice from `{match.group(0).lstrip('+-')}`!")
+
+        terms.append(DiceTerm(sign, count, sides, keep_mode, keep, bool(match.group(6))))
+
+    if not terms:
+        raise DiceError("There aren't any dice in that! Use something like `1d20+5`.")
+    if len(terms) > MAX_TERMS:
+        raise DiceError(f"That's too many dice terms! Keep it to {MAX_TERMS} or fewer.")
+    if sum(term.count for term in terms) > MAX_TOTAL_DICE:
+        raise DiceError(f"That's more than {MAX_TOTAL_DICE:,} dice! Even I have limits.")
+    if abs(modifier) > MAX_MODIFIER:
+        raise DiceError(f"Modifiers must stay within ±{MAX_MODIFIER:,}!")
+
+    canonical = ""
+    for index, term in enumerate(terms):
+        if index or term.sign < 0:
+            canonical += '+' if term.sign > 0 else '-'
+        canonical += str(term)
+    if modifier:
+        canonical += f"{modifier:+d}"
+
+    return DiceExpression(canonical, tuple(terms), modifier)
+
+
+def roll_expression(expression: DiceExpression, rng: Optional[random.Random] = None) -> RollResult:
+    """Roll every term of a parsed expression"""
+    rng = rng or random
+    results = tuple(
+        _roll_small(term, rng) if term.count <= LIST_LIMIT else _roll_large(term)
+        for term in expression.terms
+    )
+    total = expression.modifier + sum(result.subtotal for result in results)
+    return RollResult(expression, total, results)
+
+
+def _roll_small(term: DiceTerm, rng) -> TermResult:
+    """Roll a handful of dice individually so they can be listed"""
+    rolls = rng.choices(range(1, term.sides + 1), k=term.count)
+    if term.explode:
+        rolls = [_explode(roll, term.sides, rng) for roll in rolls]
+
+    kept = None
+    kept_rolls = rolls
+    if term.keep_mode:
+        order = sorted(range(term.count), key=rolls.__getitem__, reverse=term.keep_mode == 'h')
+        kept = frozenset(order[:term.keep])
+        kept_rolls = [rolls[i] for i in kept]
+
+    return TermResult(
+        term,
+        term.sign * sum(kept_rolls),
+        tuple(rolls),
+        kept,
+        min(rolls),
+        max(rolls),
+        sum(rolls) / term.count
+    )
+
+
+def _explode(roll: int, sides: int, rng) -> int:
+    value = roll
+    explosions = 0
+    while roll == sides and explosions < MAX_EXPLOSIONS:
+        roll = rng.randint(1, sides)
+        value += roll
+        explosions += 1
+    return value
+
+
+def _roll_large(term: DiceTerm) -> TermResult:
+    """Sample a big pile of dice in vectorized batches and keep only aggregates"""
+    remaining = term.count
+    rolled_sum = 0
+    low = term.sides * (MAX_EXPLOSIONS + 1)
+    high = 0
+    pool = np.empty(0, dtype=np.int64)  # Running keep-highest/lowest candidates
+
+    while remaining:
+        size = min(remaining, BATCH_SIZE)
+        batch = _np_rng.integers(1, term.sides + 1, size=size, dtype=np.int64)
+        if term.explode:
+            _explode_batch(batch, term.sides)
+
+        rolled_sum += int(batch.sum())
+        low = min(low, int(batch.min()))
+        high = max(high, int(batch.max()))
+
+        if term.keep_mode:
+            pool = np.concatenate((pool, batch))
+            if pool.size > term.keep:
+                if term.keep_mode == 'h':
+                    pool = np.partition(pool, pool.size - term.keep)[-term.keep:]
+                else:
+                    pool = np.partition(pool, term.keep - 1)[:term.keep]
+
+        remaining -= size
+
+    subtotal = int(pool.sum()) if term.keep_mode else rolled_sum
+    return TermResult(term, term.sign * subtotal, None, None, low, high, rolled_sum / term.count)
+
+
+def _explode_batch(batch: np.ndarray, sides: int):
+    """Re-roll and add every max result in place until nothing explodes"""
+    exploding = np.flatnonzero(batch == sides)
+    explosions = 0
+    while exploding.size and explosions < MAX_EXPLOSIONS:
+        extra = _np_rng.integers(1, sides + 1, size=exploding.size, dtype=np.int64)
+        batch[exploding] += extra
+        exploding = exploding[extra == sides]
+        explosions += 1
+
+
+# Exact distributions are only built up to this many possible totals;
+# anything wider uses a normal curve with the exact mean and variance
+MAX_EXACT_SUPPORT = 1 << 20
+# Faces × kept dice² × kept-sum range budget for the keep-highest/lowest pass
+MAX_KEEP_WORK = 1_500_000_000
+# Explosion chains less likely than this are cut off
+TAIL_EPSILON = 1e-15
+# Probabilities this far below the peak are FFT round-off, not signal
+PMF_NOISE_FLOOR = 1e-13
+
+
+class Distribution(NamedTuple):
+    offset: int  # Total represented by cdf[0]
+    cdf: Optional[np.ndarray]  # None when approximated by a normal curve
+    mean: float
+    variance: float
+
+    @property
+    def exact(self) -> bool:
+        return self.cdf is not None
+
+    @property
+    def std_dev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def _at_or_below(self, total: int) -> float:
+        index = total - self.offset
+        if index < 0:
+            return 0.0
+        if index >= len(self.cdf):
+            return 1.0
+        return float(self.cdf[index])
+
+    def probability(self, total: int) -> float:
+        """Chance of rolling exactly this total"""
+        if not self.exact:
+            return self._normal_cdf(total + 0.5) - self._normal_cdf(total - 0.5)
+        return self._at_or_below(total) - self._at_or_below(total - 1)
+
+    def percentile(self, total: int) -> float:
+        """Share of rolls this total beats, counting ties as half"""
+        if not self.exact:
+            return 100 * self._normal_cdf(total)
+        below = self._at_or_below(total - 1)
+        return 100 * (below + (self._at_or_below(total) - below) / 2)
+
+    def quantile(self, fraction: float) -> int:
+        """Smallest total whose cumulative probability reaches the fraction"""
+        if not self.exact:
+            return round(self.mean + self.std_dev * NormalDist().inv_cdf(min(max(fraction, 1e-12), 1 - 1e-12)))
+        index = int(np.searchsorted(self.cdf, fraction))
+        return self.offset + min(index, len(self.cdf) - 1)
+
+    def _normal_cdf(self, x: float) -> float:
+        if not self.variance:
+            return 1.0 if x >= self.mean else 0.0
+        return 0.5 * (1 + math.erf((x - self.mean) / (self.std_dev * math.sqrt(2))))
+
+
+def dice_distribution(expression: DiceExpression) -> Distribution:
+    """Exact distribution of an expression's total, memoized by expression"""
+    return _distribution_for(expression.text)
+
+
+@lru_cache(maxsize=32)
+def _distribution_for(text: str) -> Distribution:
+    expression = _parse_normalized(text)
+
+    # Work out each term's moments first so wide expressions can skip the PMFs
+    term_pmfs = []
+    mean = float(expression.modifier)
+    variance = 0.0
+    support = 1
+    for term in expression.terms:
+        die_offset, die_pmf = _die_pmf(term)
+        if term.keep_mode and term.keep < term.count:
+            if len(die_pmf) * term.keep ** 2 * (term.keep * (len(die_pmf) - 1) + 1) > MAX_KEEP_WORK:
+                raise DiceError(f"`{term}` keeps too many dice with too many faces for me to work out exactly!")
+            term_offset, term_pmf = _keep_pmf(term, die_offset, die_pmf)
+            term_mean, term_variance = _moments(term_offset, term_pmf)
+        else:
+            die_mean, die_variance = _moments(die_offset, die_pmf)
+            term_offset, term_pmf = term.count * die_offset, None
+            term_mean, term_variance = term.count * die_mean, term.count * die_variance
+            support += term.count * (len(die_pmf) - 1)
+
+        mean += term.sign * term_mean
+        variance += term_variance
+        term_pmfs.append((term, die_pmf, term_offset, term_pmf))
+        if term_pmf is not None:
+            support += len(term_pmf) - 1
+
+    if support > MAX_EXACT_SUPPORT:
+        return Distribution(0, None, mean, variance)
+
+    offset = expression.modifier
+    pmf = np.ones(1)
+    for term, die_pmf, term_offset, term_pmf in term_pmfs:
+        if term_pmf is None:
+            term_pmf = _power_pmf(die_pmf, term.count)
+        if term.sign < 0:
+            term_offset = -(term_offset + len(term_pmf) - 1)
+            term_pmf = term_pmf[::-1]
+        offset += term_offset
+        pmf = _convolve(pmf, term_pmf)
+
+    # FFT round-off leaves noise across the tails; drop it so the cache stays small
+    pmf[pmf < pmf.max() * PMF_NOISE_FLOOR] = 0
+    nonzero = np.flatnonzero(pmf)
+    start, end = int(nonzero[0]), int(nonzero[-1]) + 1
+    cdf = np.cumsum(pmf[start:end] / pmf.sum())
+    cdf[-1] = 1.0
+    return Distribution(offset + start, cdf, mean, variance)
+
+
+def _die_pmf(term: DiceTerm) -> Tuple[int, np.ndarray]:
+    """PMF of one die as (lowest face, probabilities)"""
+    sides = term.sides
+    if not term.explode:
+        return 1, np.full(sides, 1 / sides)
+
+    # Each max roll chains another die; stop once the chain is negligible
+    pmf = np.zeros(sides * (MAX_EXPLOSIONS + 1))
+    weight = 1 / sides
+    for depth in range(MAX_EXPLOSIONS + 1):
+        base = depth * sides
+        if depth == MAX_EXPLOSIONS or weight < TAIL_EPSILON:
+            pmf[base:base + sides] += weight
+            return 1, pmf[:base + sides]
+        pmf[base:base + sides - 1] += weight
+        weight /= sides
+    return 1, pmf
+
+
+def _keep_pmf(term: DiceTerm, die_offset: int, die_pmf: np.ndarray) -> Tuple[int, np.ndarray]:
+    """PMF of the kept dice's sum, walking faces from the kept end inward
+
+    Only dice that are still kept are tracked: row m holds the kept sum once
+    m of them have been placed. The dice left over all land on the current
+    face or further in, so how many land on it is binomial, and once keep
+    dice are placed the sum is settled. The work grows with keep², not count².
+    """
+    count, keep = term.count, term.keep
+    faces = np.arange(len(die_pmf))
+    if term.keep_mode == 'h':
+        faces = faces[::-1]
+    width = keep * (len(die_pmf) - 1) + 1
+
+    # log C(count - m, j) for j of the count - m dice left landing on one face
+    placed_counts = np.arange(keep)[:, None]
+    landing = np.arange(keep)[None, :]
+    valid = placed_counts + landing < keep
+    left = count - placed_counts
+    log_gamma = np.frompyfunc(math.lgamma, 1, 1)
+    missed = np.where(valid, left - landing, 0)
+    log_ways = (log_gamma(left + 1) - log_gamma(landing + 1) - log_gamma(missed + 1)).astype(float)
+    log_ways[~valid] = -np.inf
+
+    placed = np.zeros((keep, width))
+    placed[0, 0] = 1.0
+    kept = np.zeros(width)
+    # Chance of landing on each face given the die didn't land on an earlier one
+    tails = np.cumsum(die_pmf[faces][::-1])[::-1]
+    for face, tail in zip(faces, tails):
+        probability = die_pmf[face]
+        if not probability:
+            continue
+        share = probability / tail
+        if share < 1:
+            weights = np.exp(log_ways + landing * math.log(share) + missed * math.log1p(-share))
+        else:
+            weights = np.zeros((keep, keep))  # Every die left lands here
+
+        # Enough dice landed to fill the kept slots
+        settled = np.maximum(1.0 - weights.sum(axis=1), 0.0)
+        for placed_count in np.flatnonzero(settled):
+            shift = face * (keep - placed_count)
+            kept[shift:] += placed[placed_count, :width - shift] * settled[placed_count]
+
+        updated = np.zeros_like(placed)
+        for j in range(keep):
+            shift = face * j
+            updated[j:, shift:] += placed[:keep - j, :width - shift] * weights[:keep - j, j, None]
+        placed = updated
+
+    return keep * die_offset, kept
+
+
+def _power_pmf(die_pmf: np.ndarray, count: int) -> np.ndarray:
+    """PMF of the sum of `count` independent dice via one FFT power"""
+    if count == 1:
+        return die_pmf
+    length = count * (len(die_pmf) - 1) + 1
+    size = 1 << (length - 1).bit_length()
+    return np.fft.irfft(np.fft.rfft(die_pmf, size) ** count, size)[:length]
+
+
+def _convolve(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    if min(len(first), len(second)) < 64:
+        return np.convolve(first, second)
+    length = len(first) + len(second) - 1
+    size = 1 << (length - 1).bit_length()
+    return np.fft.irfft(np.fft.rfft(first, size) * np.fft.rfft(second, size), size)[:length]
+
+
+def _moments(offset: int, pmf: np.ndarray) -> Tuple[float, float]:
+    pmf = pmf / pmf.sum()
+    values = np.arange(offset, offset + len(pmf))
+    mean = float(values @ pmf)
+    return mean, float(((values - mean) ** 2) @ pmf)
@@ -0,0 +1,166 @@
+import asyncio
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# A key names what expires, e.g. ("blocked", guild_id, user_id, word); it must survive a JSON round trip
+ExpiryKey = Tuple
+
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+_DURATION_PART = re.compile(r'(\d+)\s*([smhdw])')
+
+
+def parse_duration(text: str, max_seconds: float) -> float:
+    """Seconds in a duration like '30m', '24h' or '1d12h'; raises ValueError if it isn't one"""
+    text = text.strip().lower()
+    parts = _DURATION_PART.findall(text)
+    if not parts or _DURATION_PART.sub('', text).strip():
+        raise ValueError(f"`{text}` isn't a duration like 30m, 24h or 7d")
+    seconds = sum(int(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+    if not 0 < seconds <= max_seconds:
+        raise ValueError(f"Durations have to be between 1s and {int(max_seconds // 86400)}d")
+    return seconds
+
+
+class ExpiryScheduler:
+    """Expires entries from one task that sleeps on a min-heap of deadlines
+
+    The task only wakes for the earliest deadline (or when an earlier one
+    is scheduled), then hands every entry due within batch_window to
+    on_expire in a single call. Rescheduled and cancelled entries are left
+    in the heap and skipped when popped; `deadlines` is the source of truth
+    and is saved to one JSON file, written at most once per wakeup.
+    """
+
+    def __init__(
+        self,
+        on_expire: Callable[[List[ExpiryKey]], Awaitable[None]],
+        path: str = 'data/expiries.json',
+        batch_window: float = 1.0
+    ):
+        self.on_expire = on_expire
+        self.path = path
+        self.batch_window = batch_window
+        self.logger = logging.getLogger(__name__)
+        self.deadlines: Dict[ExpiryKey, float] = {}
+        self._heap: List[Tuple[float, ExpiryKey]] = []
+        self._dirty = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.deadlines = {tuple(key): float(deadline) for key, deadline in data}
+        except (json.JSONDecodeError, ValueError, TypeError, OSError) as e:
+            self.logger.error(f"Error loading expiries: {e}")
+            self.deadlines = {}
+        self._heap = [(deadline, key) for key, deadline in self.deadlines.items()]
+        heapq.heapify(self._heap)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the task and save any pending changes"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._save()
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def deadline(self, key: ExpiryKey) -> Optional[float]:
+        return self.deadlines.get(key)
+
+    def schedule(self, key: ExpiryKey, deadline: float):
+        """Expire key at the epoch deadline, replacing any earlier schedule"""
+        self.deadlines[key] = deadline
+        heapq.heappush(self._heap, (deadline, key))
+        self._dirty = True
+        self._wakeup.set()
+
+    def cancel(self, key: ExpiryKey) -> bool:
+        if self.deadlines.pop(key, None) is None:
+            return False
+        self._dirty = True
+        self._wakeup.set()
+        return True
+
+    def _pop_stale(self):
+        heap = self._heap
+        while heap and self.deadlines.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        # Lots of cancellations leave the heap mostly dead entries
+        if len(heap) > 2 * len(self.deadlines) + 1024:
+            self._heap = [(deadline, key) for key, deadline in self.deadlines.items()]
+            heapq.heapify(self._heap)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if self._dirty:
+                await self._save()
+
+            self._pop_stale()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._collect_due(time.time() + self.batch_window)
+            if not due:
+                continue
+            try:
+                await self.on_expire(due)
+            except Exception as e:
+                self.logger.error(f"Error expiring {len(due)} entries: {e}")
+
+    def _collect_due(self, until: float) -> List[ExpiryKey]:
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= until:
+            deadline, key = heapq.heappop(heap)
+            if self.deadlines.get(key) == deadline:
+                del self.deadlines[key]
+                due.append(key)
+        if due:
+            self._dirty = True
+        return due
+
+    async def _save(self):
+        self._dirty = False
+        data = [[list(key), deadline] for key, deadline in self.deadlines.items()]
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            self._dirty = True  # Try again on the next wakeup
+            self.logger.error(f"Error saving expiries: {e}")
+
+    def _write(self, data: list):
+        # Write to temporary file first, then rename for atomic operation
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.path)
@@ -0,0 +1,233 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class CountMinSketch:
+    """Fixed-size approximate counter; estimates never come out lower than the true count
+
+    Uses conservative update (only the smallest cells are raised), which
+    keeps the overestimate from colliding keys much lower than plain adds.
+    """
+    __slots__ = ('width', 'depth', 'table')
+
+    def __init__(self, width: int = 1024, depth: int = 3, table: Optional[array] = None):
+        self.width = width
+        self.depth = depth
+        self.table = table if table is not None else array('I', bytes(4 * width * depth))
+
+    def _cells(self, key: str) -> List[int]:
+        # blake2b rather than hash() so the cells stay put across restarts
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4 * self.depth).digest()
+        width = self.width
+        return [row * width + int.from_bytes(digest[4 * row:4 * row + 4], 'little') % width for row in range(self.depth)]
+
+    def estimate(self, key: str) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(key))
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count a key and return its new estimate"""
+        table = self.table
+        cells = self._cells(key)
+        estimate = min(table[cell] for cell in cells) + count
+        for cell in cells:
+            if table[cell] < estimate:
+                table[cell] = estimate
+        return estimate
+
+    def raise_to(self, key: str, count: int):
+        """Make sure the key's estimate is at least count"""
+        table = self.table
+        for cell in self._cells(key):
+            if table[cell] < count:
+                table[cell] = count
+
+
+class HitCounter:
+    """Hit counts for one guild's keys in fixed memory
+
+    The top_k most hit keys are counted exactly in a dict; everything else
+    goes to a count-min sketch. A key is promoted once its estimate passes
+    the smallest top count, and the key it displaces is folded back into
+    the sketch, so counts are exact from the moment a key enters the top.
+    A key whose count is 0 has certainly never been hit.
+    """
+    __slots__ = ('top_k', 'top', 'sketch', 'total', 'since', '_floor')
+
+    def __init__(self, top_k: int = 50, sketch: Optional[CountMinSketch] = None, since: Optional[float] = None):
+        self.top_k = top_k
+        self.top: Dict[str, int] = {}
+        self.sketch = sketch or CountMinSketch()
+        self.total = 0
+        self.since = since or time.time()
+        self._floor = 0  # Smallest top count as last seen; only ever stale on the low side
+
+    def hit(self, key: str):
+        self.total += 1
+        top = self.top
+        count = top.get(key)
+        if count is not None:
+            top[key] = count + 1
+            return
+
+        estimate = self.sketch.add(key)
+        if len(top) < self.top_k:
+            top[key] = estimate
+            if len(top) == self.top_k:
+                self._floor = min(top.values())
+            return
+        if estimate <= self._floor:
+            return
+
+        floor_key = min(top, key=top.__getitem__)
+        floor_count = top[floor_key]
+        if estimate > floor_count:
+            del top[floor_key]
+            self.sketch.raise_to(floor_key, floor_count)
+            top[key] = estimate
+            floor_count = min(top.values())
+        self._floor = floor_count
+
+    def count(self, key: str) -> int:
+        count = self.top.get(key)
+        return count if count is not None else self.sketch.estimate(key)
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def prune(self, keys: Iterable[str]):
+        """Drop top entries for keys that no longer exist so they stop holding a slot"""
+        keep = set(keys)
+        for key in [key for key in self.top if key not in keep]:
+            del self.top[key]
+        self._floor = 0 if len(self.top) < self.top_k else min(self.top.values())
+
+    def to_json(self) -> dict:
+        return {
+            "since": self.since,
+            "total": self.total,
+            "top": dict(self.top),
+            "width": self.sketch.width,
+            "depth": self.sketch.depth,
+            "sketch": base64.b64encode(self.sketch.table.tobytes()).decode('ascii')
+        }
+
+    @classmethod
+    def from_json(cls, data: dict, top_k: int) -> "HitCounter":
+        table = array('I')
+        table.frombytes(base64.b64decode(data["sketch"]))
+        counter = cls(top_k, CountMinSketch(data["width"], data["depth"], table), data["since"])
+        counter.total = data["total"]
+        for key, count in sorted(data["top"].items(), key=lambda item: item[1], reverse=True)[:top_k]:
+            counter.top[key] = count
+        if len(counter.top) == top_k:
+            counter._floor = min(counter.top.values())
+        return counter
+
+
+class HitStats:
+    """Per-guild HitCounters for each kind of entry ('nga', 'blocked'), flushed in batches
+
+    Memory is bounded by max_counters counters (one per guild and kind),
+    each a fixed-size sketch plus top_k entries; the least recently hit
+    are dropped first. Hits only touch memory and a background task writes
+    the file every flush_interval seconds, like StatsStore.
+    """
+
+    def __init__(
+        self,
+        path: str = 'data/trigger_hits.json',
+        flush_interval: float = 300,
+        top_k: int = 50,
+        max_counters: int = 2000
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.top_k = top_k
+        self.max_counters = max_counters
+        self.logger = logging.getLogger(__name__)
+        self.counters: "OrderedDict[Tuple[str, int], HitCounter]" = OrderedDict()
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for name, counter in data.items():
+                kind, guild_id = name.split(':')
+                self.counters[(kind, int(guild_id))] = HitCounter.from_json(counter, self.top_k)
+        except (json.JSONDecodeError, ValueError, KeyError, TypeError, OSError) as e:
+            self.logger.error(f"Error loading trigger hits: {e}")
+            self.counters.clear()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write anything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def hit(self, kind: str, guild_id: int, key: str):
+        counter_key = (kind, guild_id)
+        counter = self.counters.get(counter_key)
+        if counter is None:
+            counter = self.counters[counter_key] = HitCounter(self.top_k)
+            if len(self.counters) > self.max_counters:
+                self.counters.popitem(last=False)
+        else:
+            self.counters.move_to_end(counter_key)
+        counter.hit(key)
+        self._dirty = True
+
+    def get(self, kind: str, guild_id: int) -> Optional[HitCounter]:
+        return self.counters.get((kind, guild_id))
+
+    def prune(self, kind: str, guild_id: int, keys: Iterable[str]):
+        counter = self.counters.get((kind, guild_id))
+        if counter is not None:
+            counter.prune(keys)
+            self._dirty = True
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write every counter in one batch"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        data = {f"{kind}:{guild_id}": counter.to_json() for (kind, guild_id), counter in self.counters.items()}
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            self._dirty = True  # Try again on the next flush
+            self.logger.error(f"Error saving trigger hits: {e}")
+
+    def _write(self, data: dict):
+        # Write to temporary file first, then rename for atomic operation
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.path)
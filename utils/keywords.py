@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+
+class KeywordMatcher:
+    """Matches keyword categories against a message and returns a bitmask
+
+    Each distinct keyword is checked once with a plain substring test and
+    ORs in the bits of every category that lists it, so keywords that
+    overlap or share a prefix all count. For a few dozen keywords this
+    beats a combined regex alternation.
+    """
+
+    def __init__(self, categories: Mapping[str, Iterable[str]]):
+        self.bits: Dict[str, int] = {}
+        masks: Dict[str, int] = {}
+        for index, (name, keywords) in enumerate(categories.items()):
+            bit = 1 << index
+            self.bits[name] = bit
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    masks[keyword] = masks.get(keyword, 0) | bit
+        self._keywords: Tuple[Tuple[str, int], ...] = tuple(masks.items())
+
+    def mask_for(self, *names: str) -> int:
+        """Bitmask for one or more category names, or 0 if any of them is unknown"""
+        mask = 0
+        for name in names:
+            bit = self.bits.get(name)
+            if bit is None:
+                return 0
+            mask |= bit
+        return mask
+
+    def names(self, mask: int) -> Tuple[str, ...]:
+        """Category names whose bits are set in the mask"""
+        return tuple(name for name, bit in self.bits.items() if mask & bit)
+
+    def match(self, content: str) -> int:
+        """Bitmask of every category present in already-lowercased content"""
+        found = 0
+        for keyword, mask in self._keywords:
+            if keyword in content:
+                found |= mask
+        return found
+
+
+class KeywordRegistry:
+    """Per-guild keyword matchers built lazily from data/reaction_keywords.json"""
+
+    def __init__(self, path: str = 'data/reaction_keywords.json', reload_interval: float = 30):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.logger = logging.getLogger(__name__)
+        self.default_matcher = KeywordMatcher({})
+        self._defaults: Dict[str, list] = {}
+        self._overrides: Dict[int, Dict[str, list]] = {}
+        self._matchers: Dict[int, KeywordMatcher] = {}
+        self._mtime = 0.0
+        self._next_check = 0.0
+        self.load()
+
+    def load(self) -> bool:
+        """(Re)load keyword tables, keeping the old ones on errors"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            defaults = dict(data.get("default", {}))
+            overrides = {int(guild_id): dict(categories) for guild_id, categories in data.get("guilds", {}).items()}
+        except (OSError, json.JSONDecodeError, ValueError, AttributeError) as e:
+            self.logger.error(f"Error loading reaction keywords: {e}")
+            return False
+
+        self._defaults = defaults
+        self._overrides = overrides
+        self.default_matcher = KeywordMatcher(defaults)
+        self._matchers = {}
+        self._mtime = mtime
+        return True
+
+    def maybe_reload(self):
+        """Reload when the file changed, checking the mtime at most every reload_interval"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            if os.path.getmtime(self.path) != self._mtime:
+                self.load()
+        except OSError:
+            pass
+
+    def matcher_for(self, guild_id: Optional[int]) -> KeywordMatcher:
+        """The guild's matcher; guild categories replace the default ones by name"""
+        self.maybe_reload()
+        if guild_id is None or guild_id not in self._overrides:
+            return self.default_matcher
+
+        matcher = self._matchers.get(guild_id)
+        if matcher is None:
+            matcher = KeywordMatcher({**self._defaults, **self._overrides[guild_id]})
+            self._matchers[guild_id] = matcher
+        return matcher
@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import re
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Hashable, Optional
+
+from utils.blocklist import BlockMatcher
+from utils.triggers import GuildTriggers, TriggerRecord
+
+# Returned by a worker that hasn't built a matcher yet; the job is resent with its source
+_NEED_SOURCE = 'need-source'
+_WORKER_CACHE_SIZE = 32
+
+# Per-process matchers keyed by (kind, version); versions are never reused
+_worker_matchers: "OrderedDict[Hashable, object]" = OrderedDict()
+
+
+def _worker_matcher(key: Hashable, build):
+    matcher = _worker_matchers.get(key)
+    if matcher is not None:
+        _worker_matchers.move_to_end(key)
+        return matcher
+    if build is None:
+        return None
+    matcher = _worker_matchers[key] = build()
+    if len(_worker_matchers) > _WORKER_CACHE_SIZE:
+        _worker_matchers.popitem(last=False)
+    return matcher
+
+
+def _search_blocked(version: int, content: str, source: Optional[str] = None):
+    pattern = _worker_matcher(('blocked', version), None if source is None else lambda: re.compile(source))
+    if pattern is None:
+        return _NEED_SOURCE
+    return pattern.search(content) is not None
+
+
+def _match_triggers(version: int, content: str, triggers: Optional[Dict[str, TriggerRecord]] = None):
+    guild = _worker_matcher(('nga', version), None if triggers is None else lambda: GuildTriggers(triggers))
+    if guild is None:
+        return _NEED_SOURCE
+    return guild.match_order(content)
+
+
+class MatchPool:
+    """Runs oversized matcher jobs off the event loop
+
+    Matchers with fewer than `threshold` words stay inline, since handing
+    a job to a pool costs more than matching a small set. Process mode, the
+    default, is the one that actually frees the event loop: `re` and the
+    regex automaton both hold the GIL while they scan. Jobs only carry the
+    matcher's version; a worker that hasn't seen that version asks for the
+    source once, rebuilds the matcher and keeps it. Thread mode shares the
+    prebuilt matchers directly and only helps when matching is cheap.
+    """
+
+    def __init__(self, threshold: int = 2000, workers: int = 2, use_processes: bool = True):
+        self.threshold = threshold
+        self.workers = workers
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+
+    def should_offload(self, size: int) -> bool:
+        return size >= self.threshold
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tika-match')
+        return self._executor
+
+    async def search_blocked(self, matcher: BlockMatcher, content: str) -> bool:
+        """Whether any blocked word appears in the content, searched in the pool"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if not self.use_processes:
+            return await loop.run_in_executor(executor, matcher.search, content)
+
+        blocked = await loop.run_in_executor(executor, _search_blocked, matcher.version, content)
+        if blocked == _NEED_SOURCE:
+            blocked = await loop.run_in_executor(executor, _search_blocked, matcher.version, content, matcher.pattern.pattern)
+        return blocked
+
+    async def match_triggers(self, guild: GuildTriggers, content: str) -> Optional[TriggerRecord]:
+        """The trigger a message hits, matched in the pool"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if not self.use_processes:
+            return await loop.run_in_executor(executor, guild.match, content)
+
+        while True:
+            version = guild.version
+            order = await loop.run_in_executor(executor, _match_triggers, version, content)
+            if order == _NEED_SOURCE and guild.version == version:
+                # A copy, since the dict is pickled later on the executor's feeder thread
+                order = await loop.run_in_executor(executor, _match_triggers, version, content, dict(guild.triggers))
+            if guild.version == version:
+                return guild.records[order] if order is not None else None
+            # The guild was edited while we waited; match against the new triggers
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
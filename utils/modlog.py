@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+
+class ModLogEvent(NamedTuple):
+    at: float  # Epoch seconds
+    emoji: str
+    text: str
+
+
+class ModLog:
+    """Per-guild moderation log channels, written in batches
+
+    Events are buffered per guild and posted as one message once
+    max_events have piled up or interval seconds passed since the first,
+    whichever comes first, with at least min_gap seconds between messages
+    to the same guild. Identical events in a batch are merged into one
+    line with a count, so a raid turns into a few messages instead of one
+    per deletion. Whatever doesn't fit in one embed waits for the next
+    message. Past max_buffered, events are only counted. Event text is
+    capped at record time, so every message carries at least one event.
+    """
+
+    EMBED_DESCRIPTION_LIMIT = 4096
+    EVENT_TEXT_LIMIT = 300  # /nga replies and patterns can be thousands of characters
+    STOP_MAX_MESSAGES = 5  # Per guild on shutdown; whatever is left after that is dropped
+
+    def __init__(
+        self,
+        get_channel: Callable[[int], Optional[discord.abc.Messageable]],
+        path: str = 'data/modlog.json',
+        max_events: int = 25,
+        interval: float = 10,
+        min_gap: float = 2,
+        max_buffered: int = 5000
+    ):
+        self.get_channel = get_channel
+        self.path = path
+        self.max_events = max_events
+        self.interval = interval
+        self.min_gap = min_gap
+        self.max_buffered = max_buffered
+        self.logger = logging.getLogger(__name__)
+        self.channels: Dict[int, int] = {}  # Guild ID -> log channel ID
+        self._buffers: Dict[int, List[ModLogEvent]] = {}
+        self._dropped: Dict[int, int] = {}
+        self._full: Dict[int, asyncio.Event] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._last_sent: Dict[int, float] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.channels = {int(guild_id): int(channel_id) for guild_id, channel_id in data.items()}
+        except (json.JSONDecodeError, ValueError, TypeError, AttributeError, OSError) as e:
+            self.logger.error(f"Error loading mod-log channels: {e}")
+
+    def _save(self):
+        try:
+            # Write to temporary file first, then rename for atomic operation
+            temp_file = self.path + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({str(guild_id): channel_id for guild_id, channel_id in self.channels.items()}, f, indent=2)
+            os.replace(temp_file, self.path)
+        except OSError as e:
+            self.logger.error(f"Error saving mod-log channels: {e}")
+
+    def set_channel(self, guild_id: int, channel_id: Optional[int]):
+        """Log a guild's events to channel_id, or stop logging them with None"""
+        if channel_id is None:
+            self.channels.pop(guild_id, None)
+            self._buffers.pop(guild_id, None)
+            self._dropped.pop(guild_id, None)
+        else:
+            self.channels[guild_id] = channel_id
+        self._save()
+
+    def record(self, guild_id: Optional[int], emoji: str, text: str):
+        """Queue an event for the guild's log channel, if it has one"""
+        if guild_id not in self.channels:
+            return
+        if len(text) > self.EVENT_TEXT_LIMIT:
+            text = text[:self.EVENT_TEXT_LIMIT - 1] + "…"
+        buffer = self._buffers.setdefault(guild_id, [])
+        if len(buffer) >= self.max_buffered:
+            self._dropped[guild_id] = self._dropped.get(guild_id, 0) + 1
+        else:
+            buffer.append(ModLogEvent(time.time(), emoji, text))
+
+        self._schedule_flush(guild_id, full=len(buffer) >= self.max_events)
+
+    def _schedule_flush(self, guild_id: int, full: bool):
+        if guild_id not in self._tasks:
+            self._full[guild_id] = asyncio.Event()
+            self._tasks[guild_id] = asyncio.create_task(self._flush_later(guild_id))
+        if full:
+            self._full[guild_id].set()
+
+    async def _flush_later(self, guild_id: int):
+        try:
+            await asyncio.wait_for(self._full[guild_id].wait(), timeout=self.interval)
+        except asyncio.TimeoutError:
+            pass
+        # Raids fill batches fast; don't run into the channel's rate limit
+        wait = self._last_sent.get(guild_id, 0) + self.min_gap - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._tasks.pop(guild_id, None)
+        self._full.pop(guild_id, None)
+        await self.flush(guild_id)
+
+    async def flush(self, guild_id: int):
+        """Post everything buffered for a guild as one message"""
+        events = self._buffers.pop(guild_id, [])
+        dropped = self._dropped.pop(guild_id, 0)
+        if not events:
+            return
+        channel_id = self.channels.get(guild_id)
+        channel = self.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            self.logger.warning(f"Mod-log channel {channel_id} for guild {guild_id} is gone; dropped {len(events)} events")
+            return
+
+        embed, rest = self._render(events, dropped)
+        if rest:
+            # Older than anything recorded since, so they go first next time
+            self._buffers[guild_id] = rest + self._buffers.get(guild_id, [])
+            self._schedule_flush(guild_id, full=True)
+
+        self._last_sent[guild_id] = time.monotonic()
+        try:
+            await channel.send(embed=embed)
+        except discord.HTTPException as e:
+            self.logger.warning(f"Couldn't write to the mod-log in guild {guild_id}: {e}")
+
+    def _render(self, events: List[ModLogEvent], dropped: int) -> Tuple[discord.Embed, List[ModLogEvent]]:
+        """One embed for as many events as fit, plus the events left over"""
+        # Identical events collapse into their first occurrence with a count
+        merged: Dict[Tuple[str, str], List[ModLogEvent]] = {}
+        for event in events:
+            merged.setdefault((event.emoji, event.text), []).append(event)
+
+        description = ""
+        shown = 0
+        rest: List[ModLogEvent] = []
+        for group in merged.values():
+            first = group[0]
+            line = f"<t:{int(first.at)}:T> {first.emoji} {first.text}{f' (×{len(group)})' if len(group) > 1 else ''}\n"
+            if description and (rest or len(description) + len(line) > self.EMBED_DESCRIPTION_LIMIT):
+                rest.extend(group)
+                continue
+            if len(line) > self.EMBED_DESCRIPTION_LIMIT:
+                # record() caps text, so this is only a guard against sending an empty embed forever
+                line = line[:self.EMBED_DESCRIPTION_LIMIT - 2] + "…\n"
+            description += line
+            shown += len(group)
+
+        embed = discord.Embed(title="📝 Moderation Log", description=description, color=0x95a5a6)
+        footer = f"{shown} event(s)"
+        if rest:
+            footer += f", {len(rest)} more coming up"
+        if dropped:
+            footer += f", {dropped} dropped during a flood"
+        embed.set_footer(text=footer)
+        return embed, rest
+
+    async def stop(self):
+        """Post whatever is still buffered, without waiting out the batch timers"""
+        for guild_id in list(self._buffers):
+            for _ in range(self.STOP_MAX_MESSAGES):
+                if not self._buffers.get(guild_id) or guild_id not in self.channels:
+                    break
+                await self.flush(guild_id)
+            left = len(self._buffers.pop(guild_id, []))
+            if left:
+                self.logger.warning(f"Dropped {left} mod-log events for guild {guild_id} on shutdown")
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._full.clear()
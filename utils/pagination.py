@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import discord
+
+# Renders a page (clamped to the last one) and returns it with the current page count
+PageRenderer = Callable[[int], Tuple[Optional[discord.Embed], int]]
+
+
+class PageCache:
+    """Bounded LRU of rendered listing pages keyed by (listing, version, page)
+
+    Listings put their data's version in the key, so a change to the
+    triggers or blocklist makes every old page unreachable; they age out
+    like any other entry instead of having to be found and purged.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        value = self._entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return value
+
+        self.misses += 1
+        value = render()
+        self._entries[key] = value
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PageView(discord.ui.View):
+    """Prev/next buttons over a listing whose pages are rendered on demand
+
+    Every click asks the renderer for the page again, so an edit to the
+    listing shows up on the next click and the page count follows it.
+    """
+
+    def __init__(self, render: PageRenderer, owner_id: int, timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.render = render
+        self.owner_id = owner_id
+        self.page = 0
+        self.page_count = 1
+        self.interaction: Optional[discord.Interaction] = None
+
+    async def start(self, interaction: discord.Interaction, empty_message: str, ephemeral: bool = False):
+        """Send the first page, with buttons only if there's more than one"""
+        embed, self.page_count = self.render(0)
+        if embed is None:
+            await interaction.response.send_message(empty_message, ephemeral=ephemeral)
+            return
+        if self.page_count <= 1:
+            self.stop()
+            await interaction.response.send_message(embed=embed, ephemeral=ephemeral)
+            return
+
+        self.interaction = interaction
+        self._update_buttons()
+        await interaction.response.send_message(embed=embed, view=self, ephemeral=ephemeral)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message(
+                "Hey! Those buttons aren't yours! Run the command yourself if you want to look~ 😤",
+                ephemeral=True
+            )
+            return False
+        return True
+
+    async def on_timeout(self):
+        if self.interaction is None:
+            return
+        try:
+            await self.interaction.edit_original_response(view=None)
+        except discord.HTTPException:
+            pass
+
+    def _update_buttons(self):
+        self.first_page.disabled = self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= self.page_count - 1
+        self.position.label = f"{self.page + 1}/{self.page_count}"
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        embed, self.page_count = self.render(page)
+        if embed is None:
+            self.stop()
+            await interaction.response.edit_message(content="It's all gone now! Nothing left to show~ 🤷", embed=None, view=None)
+            return
+
+        self.page = max(0, min(page, self.page_count - 1))
+        self._update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(emoji="⏮️", style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.primary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def position(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(emoji="⏭️", style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page_count - 1)
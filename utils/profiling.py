@@ -0,0 +1,150 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Optional, Tuple
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer from a background thread
+
+    Much cheaper than cProfile for the thread being watched, since it only
+    costs a frame walk per interval instead of a hook on every call.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.own: Counter = Counter()  # Function on top of the stack
+        self.total: Counter = Counter()  # Function anywhere on the stack
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='tika-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if top:
+                    self.own[key] += 1
+                    top = False
+                if key not in seen:
+                    seen.add(key)
+                    self.total[key] += 1
+                frame = frame.f_back
+
+    def report(self, limit: int) -> str:
+        if not self.samples:
+            return "No samples taken.\n"
+        lines = [f"{self.samples} samples every {self.interval * 1000:.0f} ms\n"]
+        for title, counter in (("Self time", self.own), ("Inclusive time", self.total)):
+            lines.append(f"\n{title} (share of samples)")
+            for (filename, lineno, name), count in counter.most_common(limit):
+                lines.append(f"  {count / self.samples:7.1%}  {name}  {filename}:{lineno}")
+        return "\n".join(lines) + "\n"
+
+
+def _memory_report(first: tracemalloc.Snapshot, last: tracemalloc.Snapshot, limit: int) -> str:
+    # Our own bookkeeping would otherwise top the list
+    filters = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    )
+    first = first.filter_traces(filters)
+    last = last.filter_traces(filters)
+
+    current = sum(stat.size for stat in last.statistics('filename'))
+    lines = [f"Traced memory at the end: {current / 1024:.1f} KiB", "", "Top allocation sites"]
+    for stat in last.statistics('lineno')[:limit]:
+        lines.append(f"  {stat.size / 1024:10.1f} KiB  {stat.count:8} blocks  {stat.traceback[0]}")
+    lines += ["", "Growth since the first snapshot"]
+    for stat in last.compare_to(first, 'lineno')[:limit]:
+        if stat.size_diff:
+            lines.append(f"  {stat.size_diff / 1024:+10.1f} KiB  {stat.count_diff:+8} blocks  {stat.traceback[0]}")
+    return "\n".join(lines) + "\n"
+
+
+async def profile_event_loop(seconds: float, sampling: bool = False, memory: bool = False,
+                             limit: int = 30) -> Tuple[str, List[str]]:
+    """Profile whatever the running event loop does for a while
+
+    Returns a text report plus short headline lines. cProfile hooks the
+    event loop's thread for the duration, so expect it to slow the bot
+    down noticeably; the sampler barely does.
+    """
+    started_tracing = False
+    first = None
+    if memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            started_tracing = True
+        first = tracemalloc.take_snapshot()
+
+    sampler = profiler = None
+    if sampling:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start = time.perf_counter()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            await asyncio.to_thread(sampler.stop)
+    elapsed = time.perf_counter() - start
+
+    # Snapshot before building the report so its own allocations don't show up
+    last = None
+    if memory:
+        last = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+    sections = [f"Profiled the event loop for {elapsed:.1f} s\n"]
+    headlines = []
+    if sampler is not None:
+        sections.append(sampler.report(limit))
+        for (_, _, name), count in sampler.own.most_common(3):
+            headlines.append(f"{name} ({count / max(sampler.samples, 1):.0%} of samples)")
+    else:
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+        sections.append(stream.getvalue())
+        top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:3]
+        for (filename, lineno, name), (_, _, own_time, _, _) in top:
+            headlines.append(f"{name} ({own_time * 1000:.0f} ms own time)")
+
+    if memory:
+        sections.append(_memory_report(first, last, limit))
+
+    return "\n".join(sections), headlines
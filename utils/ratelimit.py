@@ -0,0 +1,256 @@
+import json
+import logging
+import time
+from array import array
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class SlidingWindowCounter:
+    """Sliding-window event limits for many keys with bounded memory
+
+    Each key keeps at most `limit` timestamps, and the least recently used
+    keys are evicted once `max_keys` is reached, so memory stays flat no
+    matter how many channels or guilds pass through.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 10_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events: "OrderedDict[Hashable, Deque[float]]" = OrderedDict()
+
+    def _get(self, key: Hashable, now: float) -> Deque[float]:
+        events = self._events.get(key)
+        if events is None:
+            events = deque(maxlen=self.limit)
+            self._events[key] = events
+            if len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+        else:
+            self._events.move_to_end(key)
+
+        cutoff = now - self.window
+        while events and events[0] <= cutoff:
+            events.popleft()
+        return events
+
+    def allows(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Check whether one more event fits in the key's window"""
+        now = time.monotonic() if now is None else now
+        return len(self._get(key, now)) < self.limit
+
+    def record(self, key: Hashable, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        self._get(key, now).append(now)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+class ReactionBudget:
+    """Caps flavor reactions per channel and per guild
+
+    Reactions are purely cosmetic, so they back off whenever moderation is
+    busy in a guild or Discord starts rate limiting our REST calls, leaving
+    the budget for deletions and replies that matter. At most max_keys
+    guild pauses are kept, oldest dropped first.
+    """
+
+    def __init__(
+        self,
+        channel_limit: int = 3,
+        guild_limit: int = 10,
+        window: float = 60,
+        max_keys: int = 10_000
+    ):
+        self.channels = SlidingWindowCounter(channel_limit, window, max_keys)
+        self.guilds = SlidingWindowCounter(guild_limit, window, max_keys)
+        self.max_keys = max_keys
+        self._paused_until = 0.0
+        self._guild_paused_until: "OrderedDict[int, float]" = OrderedDict()
+
+    def try_acquire(self, guild_id: int, channel_id: int) -> bool:
+        """Spend one reaction if the channel, the guild and the bot all have room"""
+        now = time.monotonic()
+        if self.is_paused(guild_id, now):
+            return False
+        if not (self.channels.allows(channel_id, now) and self.guilds.allows(guild_id, now)):
+            return False
+
+        self.channels.record(channel_id, now)
+        self.guilds.record(guild_id, now)
+        return True
+
+    def is_paused(self, guild_id: int, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if now < self._paused_until:
+            return True
+
+        until = self._guild_paused_until.get(guild_id)
+        if until is None:
+            return False
+        if now < until:
+            return True
+        del self._guild_paused_until[guild_id]
+        return False
+
+    def back_off(self, seconds: float = 30):
+        """Stop all reactions for a while, e.g. after REST calls got rate limited"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def yield_to_moderation(self, guild_id: int, seconds: float = 10):
+        """Hold reactions in a guild while moderation is spending REST calls there"""
+        until = time.monotonic() + seconds
+        if until > self._guild_paused_until.get(guild_id, 0):
+            self._guild_paused_until[guild_id] = until
+            self._guild_paused_until.move_to_end(guild_id)
+            if len(self._guild_paused_until) > self.max_keys:
+                self._guild_paused_until.popitem(last=False)
+
+
+class TokenBucketLimiter:
+    """Token buckets for many keys, two floats per key and LRU eviction of idle ones"""
+
+    def __init__(self, max_keys: int = 50_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+
+    def _refill(self, key: Hashable, rate: int, per: float, now: float) -> List[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(rate), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(float(rate), bucket[0] + (now - bucket[1]) * rate / per)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, limits: List[Tuple[Hashable, int, float]], now: Optional[float] = None) -> float:
+        """Take one token from every (key, rate, per) bucket, or none of them
+
+        Returns 0 on success, otherwise how long until all buckets have a token.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = [(self._refill(key, rate, per, now), rate, per) for key, rate, per in limits]
+
+        retry_after = max(
+            ((1 - bucket[0]) * per / rate for bucket, rate, per in buckets if bucket[0] < 1),
+            default=0.0
+        )
+        if retry_after:
+            return retry_after
+
+        for bucket, _, _ in buckets:
+            bucket[0] -= 1
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class CommandCooldowns:
+    """Per-user and per-guild token buckets for app commands, configured from JSON"""
+
+    DEFAULT_LIMITS = {"user": {"rate": 5, "per": 10}, "guild": {"rate": 30, "per": 10}}
+
+    def __init__(self, path: str = 'data/command_limits.json', max_keys: int = 50_000):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self.limiter = TokenBucketLimiter(max_keys)
+        self.defaults: Dict[str, Tuple[int, float]] = {}
+        self.commands: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        self.load()
+
+    def load(self):
+        data = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.error(f"Error loading command limits: {e}")
+
+        self.defaults = self._parse({**self.DEFAULT_LIMITS, **data.get("default", {})})
+        self.commands = {
+            name: {**self.defaults, **self._parse(limits)}
+            for name, limits in data.get("commands", {}).items()
+        }
+
+    def _parse(self, raw: dict) -> Dict[str, Tuple[int, float]]:
+        # A rate of 0 turns that scope off
+        return {scope: (int(limit["rate"]), float(limit["per"])) for scope, limit in raw.items()}
+
+    def check(self, command: str, user_id: int, guild_id: Optional[int]) -> Optional[Tuple[int, float, float]]:
+        """Spend a use of the command; returns (user rate, user per, retry_after) when blocked"""
+        limits = self.commands.get(command, self.defaults)
+        keys = []
+        user_rate, user_per = limits.get("user", (0, 0))
+        if user_rate:
+            keys.append(((command, user_id), user_rate, user_per))
+        guild_rate, guild_per = limits.get("guild", (0, 0))
+        if guild_rate and guild_id is not None:
+            keys.append(((command, 'guild', guild_id), guild_rate, guild_per))
+
+        retry_after = self.limiter.acquire(keys)
+        if not retry_after:
+            return None
+        return user_rate, user_per, retry_after
+
+
+class BucketedRateCounter:
+    """Counts events per key over a window split into a fixed ring of buckets
+
+    Each key costs one small unsigned-short array no matter how fast it
+    fires, and idle keys are evicted least-recently-used first.
+    """
+
+    def __init__(self, buckets: int = 10, bucket_seconds: float = 1.0, max_keys: int = 20_000):
+        self.buckets = buckets
+        self.bucket_seconds = bucket_seconds
+        self.max_keys = max_keys
+        self._counters: "OrderedDict[Hashable, list]" = OrderedDict()
+
+    @property
+    def window(self) -> float:
+        return self.buckets * self.bucket_seconds
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> int:
+        """Record one event and return how many the key had in the window"""
+        now = time.monotonic() if now is None else now
+        slot = int(now / self.bucket_seconds)
+
+        entry = self._counters.get(key)
+        if entry is None:
+            entry = [array('H', bytes(2 * self.buckets)), slot]
+            self._counters[key] = entry
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        else:
+            self._counters.move_to_end(key)
+            self._advance(entry, slot)
+
+        counts = entry[0]
+        index = slot % self.buckets
+        if counts[index] < 0xFFFF:
+            counts[index] += 1
+        return sum(counts)
+
+    def _advance(self, entry: list, slot: int):
+        """Zero the buckets that fell out of the window since the key's last event"""
+        counts, last_slot = entry
+        elapsed = slot - last_slot
+        if elapsed >= self.buckets:
+            for index in range(self.buckets):
+                counts[index] = 0
+        else:
+            for step in range(1, elapsed + 1):
+                counts[(last_slot + step) % self.buckets] = 0
+        entry[1] = slot
+
+    def __len__(self) -> int:
+        return len(self._counters)
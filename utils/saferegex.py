@@ -0,0 +1,470 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+# Limits checked when a pattern is created; together they cap the work per message character
+MAX_PATTERN_LENGTH = 200
+MAX_PATTERN_STATES = 400
+MAX_REPEAT = 50
+
+# Character kinds used for \b, ^ and $ (EDGE is the start or end of the message)
+WORD, OTHER, EDGE = 0, 1, 2
+
+# NFA state kinds
+_CHAR, _SPLIT, _ASSERT, _MATCH, _TRIE = range(5)
+
+
+class SafeRegexError(ValueError):
+    """Pattern uses unsupported syntax or is too expensive"""
+
+
+def _kind(char: str) -> int:
+    return WORD if char.isalnum() or char == '_' else OTHER
+
+
+class CharSet:
+    """A character class: literal chars, ranges and \\d/\\w/\\s, optionally negated"""
+    __slots__ = ('chars', 'ranges', 'classes', 'negated')
+
+    def __init__(self, chars: Iterable[str] = (), ranges: Iterable[Tuple[str, str]] = (),
+                 classes: Iterable[str] = (), negated: bool = False):
+        self.chars = frozenset(chars)
+        self.ranges = tuple(ranges)
+        self.classes = tuple(classes)
+        self.negated = negated
+
+    def __contains__(self, char: str) -> bool:
+        found = char in self.chars or any(low <= char <= high for low, high in self.ranges)
+        if not found:
+            for name in self.classes:
+                if ((name == 'd' and char.isdigit())
+                        or (name == 'w' and _kind(char) == WORD)
+                        or (name == 's' and char.isspace())
+                        or (name == 'D' and not char.isdigit())
+                        or (name == 'W' and _kind(char) != WORD)
+                        or (name == 'S' and not char.isspace())):
+                    found = True
+                    break
+        return found != self.negated
+
+
+ANY = CharSet(negated=True)
+
+
+class _Parser:
+    """Recursive-descent parser for the supported subset, producing a small AST
+
+    Supported: literals, escapes, '.', classes, \\d \\w \\s (and negations),
+    groups (plain or ?:), '|', '?', '*', '+', {n}, {n,}, {n,m} and the
+    assertions ^ $ \\b \\B. Anything else (backreferences, lookaround,
+    flags) has no linear-time automaton and is rejected.
+    """
+
+    METACHARACTERS = set('.^$*+?{}[]\\|()')
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.pos = 0
+
+    def parse(self):
+        node = self._alternation()
+        if self.pos != len(self.pattern):
+            raise SafeRegexError(f"Unbalanced ')' at position {self.pos}")
+        return node
+
+    def _peek(self) -> Optional[str]:
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def _next(self) -> str:
+        char = self._peek()
+        if char is None:
+            raise SafeRegexError("Pattern ends too early")
+        self.pos += 1
+        return char
+
+    def _alternation(self):
+        branches = [self._concatenation()]
+        while self._peek() == '|':
+            self.pos += 1
+            branches.append(self._concatenation())
+        return branches[0] if len(branches) == 1 else ('alt', branches)
+
+    def _concatenation(self):
+        items = []
+        while self._peek() not in (None, '|', ')'):
+            items.append(self._repeat())
+        return ('cat', items)
+
+    def _repeat(self):
+        node = self._atom()
+        while True:
+            char = self._peek()
+            if char == '*':
+                bounds = (0, None)
+            elif char == '+':
+                bounds = (1, None)
+            elif char == '?':
+                bounds = (0, 1)
+            elif char == '{' and self._is_counted_repeat():
+                bounds = self._counted_repeat()
+            else:
+                return node
+            if char != '{':
+                self.pos += 1
+            if node[0] == 'assert':
+                raise SafeRegexError("Can't repeat an assertion")
+            # Laziness doesn't change whether something matches
+            if self._peek() == '?':
+                self.pos += 1
+            node = ('rep', node, bounds[0], bounds[1])
+            # Nested repeats multiply; stop before anything gets expanded
+            size = _node_size(node)
+            if size > MAX_PATTERN_STATES:
+                raise SafeRegexError(f"Pattern is too complex ({size}+ states, limit {MAX_PATTERN_STATES})")
+
+    def _is_counted_repeat(self) -> bool:
+        end = self.pattern.find('}', self.pos)
+        body = self.pattern[self.pos + 1:end] if end != -1 else ''
+        return bool(body) and all(part.isdigit() or part == '' for part in body.split(',', 1)) and body[0] != ','
+
+    def _counted_repeat(self) -> Tuple[int, Optional[int]]:
+        end = self.pattern.index('}', self.pos)
+        body = self.pattern[self.pos + 1:end]
+        self.pos = end + 1
+        low, _, high = body.partition(',')
+        minimum = int(low)
+        maximum = minimum if ',' not in body else (int(high) if high else None)
+        if maximum is not None and maximum < minimum:
+            raise SafeRegexError(f"Bad repeat {{{body}}}")
+        if max(minimum, maximum or 0) > MAX_REPEAT:
+            raise SafeRegexError(f"Repeats are limited to {MAX_REPEAT}")
+        return minimum, maximum
+
+    def _atom(self):
+        char = self._next()
+        if char == '(':
+            if self._peek() == '?':
+                if self.pattern[self.pos:self.pos + 2] != '?:':
+                    raise SafeRegexError("Lookaround, named groups and inline flags aren't supported")
+                self.pos += 2
+            node = self._alternation()
+            if self._peek() != ')':
+                raise SafeRegexError("Missing ')'")
+            self.pos += 1
+            return node
+        if char == '[':
+            return ('char', self._char_class())
+        if char == '.':
+            return ('char', ANY)
+        if char == '^':
+            return ('assert', '^')
+        if char == '$':
+            return ('assert', '$')
+        if char == '\\':
+            return self._escape()
+        if char in '*+?{':
+            raise SafeRegexError(f"Nothing to repeat at position {self.pos - 1}")
+        if char in ')]}':
+            raise SafeRegexError(f"Unbalanced '{char}' at position {self.pos - 1}")
+        return ('char', CharSet(char.lower()))
+
+    def _escape(self):
+        char = self._next()
+        if char in 'bB':
+            return ('assert', char)
+        if char in 'dwsDWS':
+            return ('char', CharSet(classes=char))
+        if char.isdigit():
+            raise SafeRegexError("Backreferences aren't supported")
+        if char in self.METACHARACTERS or not char.isalnum():
+            return ('char', CharSet(char.lower()))
+        escapes = {'n': '\n', 't': '\t'}
+        if char in escapes:
+            return ('char', CharSet(escapes[char]))
+        raise SafeRegexError(f"Unsupported escape \\{char}")
+
+    def _char_class(self) -> CharSet:
+        negated = self._peek() == '^'
+        if negated:
+            self.pos += 1
+        chars, ranges, classes = set(), [], []
+        first = True
+        while True:
+            char = self._next()
+            if char == ']' and not first:
+                break
+            first = False
+            if char == '\\':
+                char = self._next()
+                if char in 'dwsDWS':
+                    classes.append(char)
+                    continue
+            if self._peek() == '-' and self.pattern[self.pos + 1:self.pos + 2] not in ('', ']'):
+                self.pos += 1
+                high = self._next()
+                if high == '\\':
+                    high = self._next()
+                low, high = char.lower(), high.lower()
+                if high < low:
+                    raise SafeRegexError(f"Bad range {low}-{high}")
+                ranges.append((low, high))
+            else:
+                chars.add(char.lower())
+        return CharSet(chars, ranges, classes, negated)
+
+
+def _node_size(node) -> int:
+    """Number of NFA states _NFA.compile() will add for node, without building them"""
+    kind = node[0]
+    if kind in ('char', 'assert'):
+        return 1
+    if kind == 'cat':
+        return sum(_node_size(item) for item in node[1])
+    if kind == 'alt':
+        return 1 + sum(_node_size(branch) for branch in node[1])
+
+    _, body, minimum, maximum = node
+    body_size = _node_size(body)
+    if maximum is None:
+        return 1 + body_size * (minimum + 1)
+    return (maximum - minimum) * (body_size + 1) + minimum * body_size
+
+
+class _NFA:
+    """Thompson NFA shared by every trigger of a guild"""
+
+    def __init__(self):
+        self.kinds: List[int] = []
+        self.args: List[object] = []  # CharSet, assertion, tag or trie edges
+        self.outs: List[List[int]] = []
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add(self, kind: int, arg=None, outs: Optional[List[int]] = None) -> int:
+        self.kinds.append(kind)
+        self.args.append(arg)
+        self.outs.append(outs if outs is not None else [])
+        return len(self.kinds) - 1
+
+    def compile(self, node, next_state: int) -> int:
+        """Add states for node that continue to next_state; returns the entry state"""
+        kind = node[0]
+        if kind == 'char':
+            return self.add(_CHAR, node[1], [next_state])
+        if kind == 'assert':
+            return self.add(_ASSERT, node[1], [next_state])
+        if kind == 'cat':
+            for item in reversed(node[1]):
+                next_state = self.compile(item, next_state)
+            return next_state
+        if kind == 'alt':
+            return self.add(_SPLIT, None, [self.compile(branch, next_state) for branch in node[1]])
+
+        _, body, minimum, maximum = node
+        if maximum is None:
+            loop = self.add(_SPLIT)
+            self.outs[loop] = [self.compile(body, loop), next_state]
+            next_state = loop
+        else:
+            for _ in range(maximum - minimum):
+                next_state = self.add(_SPLIT, None, [self.compile(body, next_state), next_state])
+        for _ in range(minimum):
+            next_state = self.compile(body, next_state)
+        return next_state
+
+    def add_literals(self, words: Dict[str, int], next_states: Dict[int, int]) -> int:
+        """Add a trie for literal words (matched between word boundaries); returns its root"""
+        root = self.add(_TRIE, {})
+        for word, tag in words.items():
+            state = root
+            for char in word:
+                edges = self.args[state]
+                child = edges.get(char)
+                if child is None:
+                    child = edges[char] = self.add(_TRIE, {})
+                state = child
+            self.outs[state].append(next_states[tag])
+        return self.add(_ASSERT, 'b', [root])
+
+
+def _parse(pattern: str):
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise SafeRegexError(f"Patterns are limited to {MAX_PATTERN_LENGTH} characters")
+    if not pattern:
+        raise SafeRegexError("Empty pattern")
+    node = _Parser(pattern).parse()
+    size = _node_size(node)
+    if size > MAX_PATTERN_STATES:
+        raise SafeRegexError(f"Pattern is too complex ({size} states, limit {MAX_PATTERN_STATES})")
+    return node
+
+
+def pattern_cost(pattern: str) -> int:
+    """Validate a pattern and return its automaton size; raises SafeRegexError"""
+    nfa = _NFA()
+    match = nfa.add(_MATCH, 0)
+    start = nfa.compile(_parse(pattern), match)
+
+    # A pattern that can match nothing at all would fire on every message
+    seen, stack = set(), [start]
+    while stack:
+        state = stack.pop()
+        if state in seen:
+            continue
+        seen.add(state)
+        if nfa.kinds[state] == _MATCH:
+            raise SafeRegexError("Pattern matches empty text, so it would fire on every message")
+        if nfa.kinds[state] in (_SPLIT, _ASSERT):
+            stack.extend(nfa.outs[state])
+    return len(nfa) - 1
+
+
+class _DFACache:
+    """Lazily built DFA states and transitions; replaced wholesale when it grows too big"""
+    __slots__ = ('sets', 'set_ids', 'transitions', 'finals')
+
+    def __init__(self, start: FrozenSet[int]):
+        self.sets: List[FrozenSet[int]] = [start]
+        self.set_ids: Dict[FrozenSet[int], int] = {start: 0}
+        self.transitions: Dict[Tuple[int, int, str], Tuple[Optional[int], int]] = {}
+        self.finals: Dict[Tuple[int, int], Optional[int]] = {}
+
+
+class TriggerAutomaton:
+    """Literal words and safe patterns compiled into one lazily built DFA
+
+    Matching walks the message once, one character at a time. DFA states
+    are sets of NFA states built on demand and cached, so the work per
+    character is a dict lookup once warm and at most the size of the NFA
+    when cold; there is no backtracking. Literal words share a trie and
+    keep the \\b...\\b semantics of plain triggers. Safe to share between
+    threads: cache misses are filled under a lock, and a match keeps using
+    the cache it started with even if another thread replaces it.
+    """
+
+    def __init__(self, literals: Dict[str, int], patterns: Sequence[Tuple[str, int]], max_cache: int = 20_000):
+        nfa = _NFA()
+        tags = set(literals.values()) | {tag for _, tag in patterns}
+        matches = {tag: nfa.add(_MATCH, tag) for tag in tags}
+
+        starts = []
+        if literals:
+            boundaries = {tag: nfa.add(_ASSERT, 'b', [state]) for tag, state in matches.items()}
+            starts.append(nfa.add_literals(literals, boundaries))
+        for pattern, tag in patterns:
+            starts.append(nfa.compile(_parse(pattern), matches[tag]))
+
+        self.nfa = nfa
+        self.max_cache = max_cache
+        self._start = self._closure(starts)
+        self._lock = threading.Lock()
+        self._cache = _DFACache(self._start)
+
+    def __len__(self) -> int:
+        return len(self.nfa)
+
+    def _closure(self, states: Iterable[int]) -> FrozenSet[int]:
+        """Follow splits, stopping at states that consume, assert or match"""
+        kinds, outs = self.nfa.kinds, self.nfa.outs
+        result, stack = set(), list(states)
+        while stack:
+            state = stack.pop()
+            if state in result:
+                continue
+            result.add(state)
+            if kinds[state] == _SPLIT:
+                stack.extend(outs[state])
+        return frozenset(state for state in result if kinds[state] != _SPLIT)
+
+    def _resolve(self, states: FrozenSet[int], prev: int, following: int) -> Tuple[List[int], Optional[int]]:
+        """Pass the assertions that hold between prev and following; returns consuming states and best tag"""
+        nfa = self.nfa
+        kinds, args, outs = nfa.kinds, nfa.args, nfa.outs
+        consuming, best = [], None
+        seen, stack = set(), list(states)
+        while stack:
+            state = stack.pop()
+            if state in seen:
+                continue
+            seen.add(state)
+            kind = kinds[state]
+            if kind == _CHAR:
+                consuming.append(state)
+            elif kind == _TRIE:
+                consuming.append(state)
+                # A trie node that ends a word also continues to its closing \b
+                stack.extend(outs[state])
+            elif kind == _MATCH:
+                if best is None or args[state] < best:
+                    best = args[state]
+            elif kind == _SPLIT:
+                stack.extend(outs[state])
+            else:
+                assertion = args[state]
+                if assertion == 'b':
+                    holds = (prev == WORD) != (following == WORD)
+                elif assertion == 'B':
+                    holds = (prev == WORD) == (following == WORD)
+                elif assertion == '^':
+                    holds = prev == EDGE
+                else:
+                    holds = following == EDGE
+                if holds:
+                    stack.extend(outs[state])
+        return consuming, best
+
+    def _step(self, cache: _DFACache, set_id: int, prev: int, char: str) -> Tuple[Optional[int], int]:
+        """Build one transition; the caller holds the lock"""
+        consuming, best = self._resolve(cache.sets[set_id], prev, _kind(char))
+        kinds, args, outs = self.nfa.kinds, self.nfa.args, self.nfa.outs
+        following = []
+        for state in consuming:
+            if kinds[state] == _TRIE:
+                child = args[state].get(char)
+                if child is not None:
+                    following.append(child)
+            elif char in args[state]:
+                following.extend(outs[state])
+
+        # The start states are always live, which makes the search unanchored
+        next_set = self._closure(following) | self._start
+        next_id = cache.set_ids.get(next_set)
+        if next_id is None:
+            next_id = len(cache.sets)
+            cache.sets.append(next_set)
+            cache.set_ids[next_set] = next_id
+        return best, next_id
+
+    def match(self, content: str) -> Optional[int]:
+        """Smallest tag that matches anywhere in already-lowercased content"""
+        cache = self._cache
+        if len(cache.transitions) > self.max_cache:
+            with self._lock:
+                if self._cache is cache:
+                    self._cache = _DFACache(self._start)
+                cache = self._cache
+        transitions = cache.transitions
+
+        best = None
+        set_id, prev = 0, EDGE
+        for char in content:
+            key = (set_id, prev, char)
+            step = transitions.get(key)
+            if step is None:
+                with self._lock:
+                    step = transitions.get(key)
+                    if step is None:
+                        step = transitions[key] = self._step(cache, set_id, prev, char)
+            tag, set_id = step
+            if tag is not None and (best is None or tag < best):
+                best = tag
+                if best == 0:
+                    return best
+            prev = WORD if char.isalnum() or char == '_' else OTHER
+
+        final = cache.finals.get((set_id, prev), ...)
+        if final is ...:
+            final = cache.finals[(set_id, prev)] = self._resolve(cache.sets[set_id], prev, EDGE)[1]
+        if final is not None and (best is None or final < best):
+            best = final
+        return best
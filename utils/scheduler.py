@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional, Set
+
+import discord
+
+# Interaction tokens stop working 15 minutes after the interaction was created
+INTERACTION_TOKEN_LIFETIME = 15 * 60
+
+
+class PendingEdit:
+    """One delayed edit or follow-up waiting in a wheel slot"""
+    __slots__ = ('interaction', 'kwargs', 'followup', 'rounds', 'expires_at', 'cancelled')
+
+    def __init__(self, interaction: discord.Interaction, kwargs: dict, followup: bool, rounds: int):
+        self.interaction = interaction
+        self.kwargs = kwargs
+        self.followup = followup
+        self.rounds = rounds
+        self.expires_at = interaction.created_at.timestamp() + INTERACTION_TOKEN_LIFETIME
+        self.cancelled = False
+
+
+class TimerWheel:
+    """Hashed timer wheel that fires delayed interaction edits in per-tick batches
+
+    Commands hand over a finished message and a delay instead of parking a
+    coroutine in asyncio.sleep, so a burst of animations costs one small
+    record each and a single background task.
+    """
+
+    def __init__(self, tick: float = 0.25, slot_count: int = 64):
+        self.tick = tick
+        self.slot_count = slot_count
+        self.slots: List[List[PendingEdit]] = [[] for _ in range(slot_count)]
+        self.pending = 0
+        self.logger = logging.getLogger(__name__)
+        self._cursor = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()  # The loop only keeps weak references to tasks
+
+    def start(self):
+        """Start the tick loop on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop ticking and drop whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.slots = [[] for _ in range(self.slot_count)]
+        self.pending = 0
+
+    def schedule_edit(self, interaction: discord.Interaction, delay: float, **kwargs) -> PendingEdit:
+        """Edit the original response after the delay"""
+        return self._schedule(interaction, delay, kwargs, followup=False)
+
+    def schedule_followup(self, interaction: discord.Interaction, delay: float, **kwargs) -> PendingEdit:
+        """Send a follow-up message after the delay"""
+        return self._schedule(interaction, delay, kwargs, followup=True)
+
+    def cancel(self, record: PendingEdit):
+        """Cancel a pending edit; the slot drops it on its next pass"""
+        record.cancelled = True
+
+    def _schedule(self, interaction, delay: float, kwargs: dict, followup: bool) -> PendingEdit:
+        ticks = max(1, round(delay / self.tick))
+        # Offsets run 1..slot_count; the cursor's own slot was already passed this round
+        rounds, offset = divmod(ticks - 1, self.slot_count)
+        offset += 1
+        record = PendingEdit(interaction, kwargs, followup, rounds)
+        self.slots[(self._cursor + offset) % self.slot_count].append(record)
+        self.pending += 1
+        self._wakeup.set()
+        return record
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if not self.pending:
+                # Nothing queued: sleep until something is scheduled
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                next_tick = loop.time()
+
+            next_tick += self.tick
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            self._cursor = (self._cursor + 1) % self.slot_count
+
+            due = self._collect_due(self._cursor)
+            if due:
+                batch = asyncio.create_task(self._fire_batch(due))
+                self._batches.add(batch)
+                batch.add_done_callback(self._batches.discard)
+
+    def _collect_due(self, index: int) -> List[PendingEdit]:
+        """Split a slot into records firing now and records waiting another round"""
+        slot = self.slots[index]
+        if not slot:
+            return []
+
+        now = time.time()
+        due = []
+        waiting = []
+        for record in slot:
+            if record.cancelled or record.expires_at <= now:
+                continue
+            if record.rounds:
+                record.rounds -= 1
+                waiting.append(record)
+            else:
+                due.append(record)
+
+        self.pending -= len(slot) - len(waiting)
+        self.slots[index] = waiting
+        return due
+
+    async def _fire_batch(self, records: List[PendingEdit]):
+        results = await asyncio.gather(
+            *(self._fire(record) for record in records),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, discord.NotFound):
+                continue  # Message or token is gone, nothing to edit
+            if isinstance(result, Exception):
+                self.logger.error(f"Error firing scheduled edit: {result}")
+
+    def _fire(self, record: PendingEdit):
+        if record.followup:
+            return record.interaction.followup.send(**record.kwargs)
+        return record.interaction.edit_original_response(**record.kwargs)
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import time
+from typing import Iterable, List, Optional
+
+import discord
+import yarl
+from discord.gateway import DiscordWebSocket
+
+
+class GatewaySession:
+    """Persists the gateway session so a quick restart can RESUME instead of IDENTIFY
+
+    discord.py only resumes within one process, so the saved session is
+    handed to the next process's first connection through a one-shot hook
+    on DiscordWebSocket.from_client. If Discord refuses the resume, the
+    library falls back to a normal IDENTIFY on its own.
+
+    A resumed process never receives READY or the GUILD_CREATE burst, so
+    its guild cache starts empty. hydrate() refills it over REST for the
+    guilds saved with the session, which is why sessions from bots in
+    more than max_guilds guilds aren't resumed at all. Only the guild, its
+    channels and roles, and the bot's own member come back; other members
+    are fetched on demand like with chunk_guilds_at_startup=False.
+    """
+
+    def __init__(self, path: str = 'data/gateway_session.json', resume_window: float = 60, max_guilds: int = 200):
+        self.path = path
+        self.resume_window = resume_window
+        self.max_guilds = max_guilds
+        self.logger = logging.getLogger(__name__)
+
+    def save(self, session_id: str, sequence: Optional[int], resume_url: str, guild_ids: Iterable[int]):
+        guild_ids = list(guild_ids)
+        if len(guild_ids) > self.max_guilds:
+            return
+        data = {
+            "session_id": session_id,
+            "sequence": sequence,
+            "resume_url": resume_url,
+            "guild_ids": guild_ids,
+            "saved_at": time.time()
+        }
+        try:
+            # Write to temporary file first, then rename for atomic operation
+            temp_file = self.path + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.path)
+        except OSError as e:
+            self.logger.error(f"Error saving gateway session: {e}")
+
+    def take(self) -> Optional[dict]:
+        """The saved session if it's still inside the resume window; it's only ever used once"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.remove(self.path)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.error(f"Error loading gateway session: {e}")
+            return None
+
+        age = time.time() - data.get("saved_at", 0)
+        if age > self.resume_window or not data.get("session_id"):
+            return None
+        return data
+
+    def resume_on_next_connect(self, client: discord.Client, saved: dict):
+        """Make the client's first gateway connection RESUME the saved session"""
+        original = DiscordWebSocket.__dict__['from_client']
+        logger = self.logger
+
+        async def from_client(cls, connecting_client, **params):
+            DiscordWebSocket.from_client = original  # One shot
+            if connecting_client is client and params.get('initial'):
+                logger.info(f"Resuming gateway session {saved['session_id']} at sequence {saved['sequence']}")
+                params.update(
+                    session=saved["session_id"],
+                    sequence=saved["sequence"],
+                    gateway=yarl.URL(saved["resume_url"]),
+                    resume=True
+                )
+            return await original.__func__(cls, connecting_client, **params)
+
+        DiscordWebSocket.from_client = classmethod(from_client)
+
+    @staticmethod
+    def keep_resumable(ws: DiscordWebSocket):
+        """Make the coming Client.close() leave the session resumable
+
+        Client.close() closes the socket with code 1000, which tells Discord
+        to drop the session; any other code keeps it alive for a while.
+        """
+        close = ws.close
+
+        async def close_resumable(code: int = 4000):
+            await close(code=4000)
+
+        ws.close = close_resumable
+
+    async def hydrate(self, client: discord.Client, guild_ids: List[int]) -> int:
+        """Fill the empty guild cache of a resumed process over REST"""
+        state = client._connection
+        added = 0
+        for guild_id in guild_ids:
+            if client.get_guild(guild_id) is not None:
+                continue
+            try:
+                data = await client.http.get_guild(guild_id)
+                data['channels'] = await client.http.get_all_guild_channels(guild_id)
+                # Guild.me is looked up in the member cache, and permission checks need it
+                me = await client.http.get_member(guild_id, client.user.id)
+            except discord.HTTPException as e:
+                self.logger.warning(f"Couldn't hydrate guild {guild_id}: {e}")
+                continue
+            guild = state._add_guild_from_data(data)
+            guild._add_member(discord.Member(data=me, guild=guild, state=state))
+            added += 1
+        return added
+
+
+class WarmupSnapshot:
+    """Cog state worth carrying across a restart, saved as one JSON file on shutdown
+
+    Cogs opt in with snapshot_warmup() -> dict and restore_warmup(dict, age),
+    where age is how many seconds ago the snapshot was taken. Every snapshot
+    is handed over however old it is, since some state (like slowmode that
+    still has to be lifted) must be restored anyway; cogs skip the caches
+    they consider stale. The file is only ever restored once.
+    """
+
+    def __init__(self, path: str = 'data/warmup.json'):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+
+    def save(self, cogs: dict):
+        data = {"saved_at": time.time(), "cogs": {}}
+        for name, cog in cogs.items():
+            snapshot = getattr(cog, 'snapshot_warmup', None)
+            if snapshot is None:
+                continue
+            try:
+                data["cogs"][name] = snapshot()
+            except Exception as e:
+                self.logger.error(f"Error snapshotting {name}: {e}")
+        try:
+            temp_file = self.path + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.path)
+        except OSError as e:
+            self.logger.error(f"Error saving warmup snapshot: {e}")
+
+    def restore(self, cogs: dict):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.remove(self.path)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.error(f"Error loading warmup snapshot: {e}")
+            return
+
+        age = time.time() - data.get("saved_at", 0)
+        for name, snapshot in data.get("cogs", {}).items():
+            cog = cogs.get(name)
+            if cog is None or not hasattr(cog, 'restore_warmup'):
+                continue
+            try:
+                cog.restore_warmup(snapshot, age)
+            except Exception as e:
+                self.logger.error(f"Error restoring {name} warmup: {e}")
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class UserStats:
+    """Counters for one user; slotted since there's one per active member"""
+    FIELDS = (
+        'rps_wins', 'rps_losses', 'rps_ties', 'rolls', 'dice_rolled',
+        'coinflips', 'compliments', 'praises', 'affinity'
+    )
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field, 0))
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS if getattr(self, field)}
+
+
+class StatsStore:
+    """In-memory per-user game stats, flushed to disk in periodic batches
+
+    Commands only bump counters in memory. A background task writes the
+    whole table every flush_interval seconds when something changed, and
+    rebuilds the sorted leaderboard snapshots at the same time so reads
+    never sort anything. Leaderboards are per guild and only list users who
+    played in that guild, so names never leak between servers.
+    """
+
+    LEADERBOARD_METRICS = ('affinity', 'rps_wins', 'rolls', 'dice_rolled', 'coinflips')
+
+    def __init__(self, path: str = 'data/user_stats.json', flush_interval: float = 60, leaderboard_size: int = 10):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.leaderboard_size = leaderboard_size
+        self.logger = logging.getLogger(__name__)
+        self.users: Dict[int, UserStats] = {}
+        self.guild_members: Dict[int, Set[int]] = {}  # Guild ID -> users who played there
+        self.leaderboards: Dict[Tuple[int, str], List[Tuple[int, int]]] = {}  # (guild, metric) -> top entries
+        self.ranks: Dict[Tuple[int, str], Dict[int, int]] = {}
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+        self._rebuild_snapshots()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if "users" not in data:
+                data = {"users": data}  # Written before leaderboards were per guild
+            self.users = {int(user_id): UserStats(**values) for user_id, values in data["users"].items()}
+            self.guild_members = {
+                int(guild_id): {int(user_id) for user_id in user_ids}
+                for guild_id, user_ids in data.get("guilds", {}).items()
+            }
+        except (json.JSONDecodeError, ValueError, TypeError, AttributeError, OSError) as e:
+            self.logger.error(f"Error loading user stats: {e}")
+            self.users = {}
+            self.guild_members = {}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flush loop and write anything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get(self, user_id: int) -> Optional[UserStats]:
+        return self.users.get(user_id)
+
+    def record(self, user_id: int, guild_id: Optional[int], affinity: int = 0, **counters: int):
+        """Bump a user's counters in memory and put them on the guild's board"""
+        stats = self.users.get(user_id)
+        if stats is None:
+            stats = self.users[user_id] = UserStats()
+        if guild_id is not None:
+            self.guild_members.setdefault(guild_id, set()).add(user_id)
+        for field, amount in counters.items():
+            setattr(stats, field, getattr(stats, field) + amount)
+        if affinity:
+            stats.affinity += affinity
+        self._dirty = True
+
+    def rank(self, guild_id: Optional[int], metric: str, user_id: int) -> Optional[int]:
+        """User's 1-based rank in the guild as of the last snapshot"""
+        return self.ranks.get((guild_id, metric), {}).get(user_id)
+
+    def leaderboard(self, guild_id: Optional[int], metric: str) -> List[Tuple[int, int]]:
+        """Top (user ID, value) entries in the guild as of the last snapshot"""
+        return self.leaderboards.get((guild_id, metric), [])
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write every user's stats in one batch and refresh the snapshots"""
+        if not self._dirty:
+            return
+        self._dirty = False
+        data = {
+            "users": {str(user_id): stats.to_dict() for user_id, stats in self.users.items()},
+            "guilds": {str(guild_id): sorted(user_ids) for guild_id, user_ids in self.guild_members.items()}
+        }
+        self._rebuild_snapshots()
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            self._dirty = True  # Try again on the next flush
+            self.logger.error(f"Error saving user stats: {e}")
+
+    def _write(self, data: dict):
+        # Write to temporary file first, then rename for atomic operation
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.path)
+
+    def _rebuild_snapshots(self):
+        leaderboards = {}
+        ranks = {}
+        for guild_id, user_ids in self.guild_members.items():
+            members = [(user_id, self.users[user_id]) for user_id in user_ids if user_id in self.users]
+            for metric in self.LEADERBOARD_METRICS:
+                ordered = sorted(
+                    ((user_id, getattr(stats, metric)) for user_id, stats in members if getattr(stats, metric)),
+                    key=lambda entry: entry[1],
+                    reverse=True
+                )
+                leaderboards[guild_id, metric] = ordered[:self.leaderboard_size]
+                ranks[guild_id, metric] = {user_id: position for position, (user_id, _) in enumerate(ordered, 1)}
+        self.leaderboards = leaderboards
+        self.ranks = ranks
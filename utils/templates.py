@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, Optional, Set, Tuple
+
+Templates = Dict[str, Tuple[str, ...]]
+
+# Used when the file is missing a key, so nothing ever sends an empty message
+FALLBACK_TEMPLATE = "Hmph. I don't have anything to say to that~ 🙄"
+
+
+class TemplateRegistry:
+    """Tika's response text, loaded once from JSON and formatted lazily
+
+    The file holds a "default" table of template lists plus optional
+    per-guild overrides under "guilds". Only the template that gets picked
+    is ever formatted, and edits to the file are picked up without a restart.
+    """
+
+    def __init__(self, path: str = 'data/templates.json', reload_interval: float = 30):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.logger = logging.getLogger(__name__)
+        self.defaults: Templates = {}
+        self.guild_overrides: Dict[int, Templates] = {}
+        self._mtime = 0.0
+        self._next_check = 0.0
+        self._missing: Set[str] = set()  # Keys already logged as missing since the last load
+        self.load()
+
+    def load(self) -> bool:
+        """(Re)load every template from disk, keeping the old set on errors"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            defaults = self._compile(data.get("default", {}))
+            overrides = {
+                int(guild_id): self._compile(templates)
+                for guild_id, templates in data.get("guilds", {}).items()
+            }
+        except (OSError, json.JSONDecodeError, ValueError, AttributeError) as e:
+            self.logger.error(f"Error loading templates: {e}")
+            return False
+
+        self.defaults = defaults
+        self.guild_overrides = overrides
+        self._mtime = mtime
+        self._missing.clear()
+        return True
+
+    def _compile(self, raw: dict) -> Templates:
+        return {
+            sys.intern(key): tuple(sys.intern(template) for template in templates)
+            for key, templates in raw.items()
+            if templates
+        }
+
+    def maybe_reload(self):
+        """Reload when the file changed, checking the mtime at most every reload_interval"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            if os.path.getmtime(self.path) != self._mtime:
+                self.load()
+        except OSError:
+            pass
+
+    def choices(self, key: str, guild_id: Optional[int] = None) -> Tuple[str, ...]:
+        """Raw templates for a key, preferring the guild's override"""
+        self.maybe_reload()
+        if guild_id is not None:
+            override = self.guild_overrides.get(guild_id)
+            if override and key in override:
+                return override[key]
+        return self.defaults.get(key, ())
+
+    def pick(self, key: str, guild_id: Optional[int] = None, **fields) -> str:
+        """Pick one template at random and format only that one"""
+        templates = self.choices(key, guild_id)
+        if not templates:
+            if key not in self._missing:
+                self._missing.add(key)
+                self.logger.error(f"No templates found for '{key}', using the fallback line")
+            templates = (FALLBACK_TEMPLATE,)
+
+        template = random.choice(templates)
+        if not fields:
+            return template
+        try:
+            return template.format(**fields)
+        except (KeyError, IndexError, ValueError) as e:
+            self.logger.error(f"Bad template for '{key}': {e}")
+            return template
@@ -0,0 +1,174 @@
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# Trace of the event currently being handled, None when it wasn't sampled
+_current: "contextvars.ContextVar[Optional[_Trace]]" = contextvars.ContextVar('tika_trace', default=None)
+_ids = itertools.count(1)
+
+
+class _NoopSpan:
+    """Shared do-nothing span handed out whenever tracing is off or not sampled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ('trace_id', 'spans', 'stack')
+
+    def __init__(self):
+        self.trace_id = f"{os.getpid():x}-{next(_ids):x}"
+        self.spans: List[dict] = []
+        self.stack: List[int] = []
+
+
+class Span:
+    """One timed step of a sampled trace"""
+    __slots__ = ('tracer', 'trace', 'record', 'start', 'root', 'token')
+
+    def __init__(self, tracer: "Tracer", trace: _Trace, name: str, attrs: dict, root: bool):
+        self.tracer = tracer
+        self.trace = trace
+        self.root = root
+        self.token = None
+        span_id = len(trace.spans)
+        self.record = {
+            "trace": trace.trace_id,
+            "span": span_id,
+            "parent": trace.stack[-1] if trace.stack else None,
+            "name": name,
+            **attrs
+        }
+        trace.spans.append(self.record)
+
+    def __enter__(self):
+        if self.root:
+            self.token = _current.set(self.trace)
+        self.trace.stack.append(self.record["span"])
+        self.record["ts"] = round(time.time(), 3)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record["ms"] = round((time.perf_counter() - self.start) * 1000, 3)
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        self.trace.stack.pop()
+        if self.root:
+            _current.reset(self.token)
+            self.tracer._export(self.trace)
+        return False
+
+    def set(self, **attrs):
+        """Attach attributes found while the span runs"""
+        self.record.update(attrs)
+
+
+class Tracer:
+    """Sampled span tracing for the message pipeline, commands and purges
+
+    trace() starts a root span for an event, sampled at `sample_rate`;
+    span() adds a child to whatever trace is active in the current task.
+    Both return a shared no-op object when tracing is off or the event
+    wasn't sampled, so disabled tracing costs a float compare or a
+    context variable read. Finished traces are written one span per line
+    to a rotating JSONL file.
+    """
+
+    def __init__(
+        self,
+        path: str = 'logs/spans.jsonl',
+        sample_rate: float = 0.0,
+        max_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 5
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.logger = logging.getLogger(__name__)
+        self._writer: Optional[logging.Logger] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def trace(self, name: str, **attrs):
+        """Root span for one event, or the no-op span if it isn't sampled"""
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return NOOP_SPAN
+        if _current.get() is not None:
+            # Already inside a trace (e.g. a command that handles a message); nest instead
+            return self.span(name, **attrs)
+        return Span(self, _Trace(), name, attrs, root=True)
+
+    def span(self, name: str, **attrs):
+        """Child span of the active trace, or the no-op span"""
+        trace = _current.get()
+        if trace is None:
+            return NOOP_SPAN
+        return Span(self, trace, name, attrs, root=False)
+
+    def record(self, name: str, duration: float, **attrs):
+        """Write a finished single-span trace, for work timed elsewhere"""
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return
+        trace = _Trace()
+        trace.spans.append({
+            "trace": trace.trace_id,
+            "span": 0,
+            "parent": None,
+            "name": name,
+            "ts": round(time.time() - duration, 3),
+            "ms": round(duration * 1000, 3),
+            **attrs
+        })
+        self._export(trace)
+
+    def _export(self, trace: _Trace):
+        try:
+            writer = self._get_writer()
+            for record in trace.spans:
+                writer.info(json.dumps(record, ensure_ascii=False, default=str))
+        except Exception as e:
+            self.logger.error(f"Error exporting spans: {e}")
+
+    def _get_writer(self) -> logging.Logger:
+        # A dedicated logger gets us size-based rotation for free
+        if self._writer is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            writer = logging.getLogger('tika.spans')
+            writer.setLevel(logging.INFO)
+            writer.propagate = False
+            writer.addHandler(handler)
+            self._writer = writer
+        return self._writer
+
+    def close(self):
+        if self._writer is not None:
+            for handler in list(self._writer.handlers):
+                handler.close()
+                self._writer.removeHandler(handler)
+            self._writer = None
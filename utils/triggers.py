@@ -0,0 +1,319 @@
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from utils.saferegex import SafeRegexError, TriggerAutomaton, pattern_cost
+
+# Bumped on every rebuild, including reloads after eviction, to key cached verdicts
+_trigger_versions = itertools.count(1)
+
+_WORD_BOUNDARY = re.compile(r'\b')
+
+
+def trigger_key(text: str, regex: bool) -> str:
+    """Key a trigger is stored under; patterns keep their case since \\d and \\D differ"""
+    return text.strip() if regex else text.lower().strip()
+
+
+class TriggerRecord:
+    """One /nga trigger, slotted with interned strings and an epoch timestamp
+
+    from_json()/to_json() are the only places that know the on-disk dict
+    format, which is unchanged: ISO created_at and an alternatives list.
+    """
+    __slots__ = ('main_word', 'alternatives', 'reply', 'created_by', 'created_at', 'regex')
+
+    def __init__(
+        self,
+        main_word: str,
+        reply: str,
+        alternatives: Tuple[str, ...] = (),
+        created_by: int = 0,
+        created_at: float = 0.0,
+        regex: bool = False
+    ):
+        self.main_word = sys.intern(main_word)
+        self.alternatives = tuple(sys.intern(alternative) for alternative in alternatives)
+        self.reply = sys.intern(reply)  # The same GIF URLs get reused a lot
+        self.created_by = created_by
+        self.created_at = created_at
+        self.regex = regex
+
+    def add_alternative(self, alternative: str):
+        self.alternatives += (sys.intern(alternative),)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "TriggerRecord":
+        created_at = data.get("created_at")
+        return cls(
+            data["main_word"],
+            data["reply"],
+            data.get("alternatives", ()),
+            int(data.get("created_by") or 0),
+            datetime.fromisoformat(created_at).timestamp() if created_at else 0.0,
+            bool(data.get("regex"))
+        )
+
+    def to_json(self) -> dict:
+        data = {
+            "main_word": self.main_word,
+            "alternatives": list(self.alternatives),
+            "reply": self.reply
+        }
+        if self.created_by:
+            data["created_by"] = self.created_by
+        if self.created_at:
+            data["created_at"] = datetime.fromtimestamp(self.created_at, timezone.utc).isoformat()
+        if self.regex:
+            data["regex"] = True
+        return data
+
+
+class GuildTriggers:
+    """One guild's /nga triggers plus the matcher compiled from them
+
+    Literal-only guilds use one `re` alternation. Once a guild has regex
+    triggers, its literals and patterns are compiled together into a
+    TriggerAutomaton so a message is still scanned in a single pass.
+    """
+    __slots__ = ('triggers', 'pattern', 'lookup', 'size', 'automaton', 'records', 'regex_cost', 'version')
+
+    def __init__(self, triggers: Optional[Dict[str, TriggerRecord]] = None):
+        self.triggers: Dict[str, TriggerRecord] = triggers or {}
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompile the matcher; call after changing triggers"""
+        # Every main word and alternative maps to the order its trigger was defined in
+        lookup: Dict[str, int] = {}
+        patterns = []
+        regex_cost = 0
+        records = list(self.triggers.values())
+        for order, (key, record) in enumerate(self.triggers.items()):
+            words = record.alternatives
+            if record.regex:
+                try:
+                    regex_cost += pattern_cost(record.main_word)
+                    patterns.append((record.main_word, order))
+                except SafeRegexError:
+                    pass  # Hand-edited file; the command validates new patterns
+            else:
+                words = (key, *words)
+            for word in words:
+                if word not in lookup:
+                    lookup[word] = order
+
+        self.version = next(_trigger_versions)
+        self.lookup = lookup
+        self.records: List[TriggerRecord] = records
+        self.regex_cost = regex_cost
+        self.size = len(lookup) + regex_cost
+        self.automaton = None
+        if patterns:
+            self.automaton = TriggerAutomaton(lookup, patterns)
+            self.pattern = None
+        elif lookup:
+            # Longest first, inside a lookahead so overlapping words are all seen
+            alternation = '|'.join(re.escape(word) for word in sorted(lookup, key=len, reverse=True))
+            self.pattern = re.compile(rf'(?=\b({alternation})\b)')
+            self.lookup = self._fold_prefixes(lookup)
+        else:
+            self.pattern = None
+
+    @staticmethod
+    def _fold_prefixes(lookup: Dict[str, int]) -> Dict[str, int]:
+        """Give each word the best order among it and the trigger words it starts with
+
+        The pattern only reports the longest word at each position. Any
+        shorter word that also matched there is a prefix of it ending on a
+        word boundary inside it, so that can be worked out ahead of time.
+        """
+        folded = dict(lookup)
+        for word, order in lookup.items():
+            for boundary in _WORD_BOUNDARY.finditer(word, 1):
+                prefix_order = lookup.get(word[:boundary.start()])
+                if prefix_order is not None and prefix_order < folded[word]:
+                    folded[word] = prefix_order
+        return folded
+
+    def match(self, content: str) -> Optional[TriggerRecord]:
+        """The first-defined trigger found in lowercased content"""
+        order = self.match_order(content)
+        return self.records[order] if order is not None else None
+
+    def match_order(self, content: str) -> Optional[int]:
+        """Definition order of the first-defined trigger found, an index into records"""
+        if self.automaton is not None:
+            return self.automaton.match(content)
+        if self.pattern is None:
+            return None
+
+        lookup = self.lookup
+        best = None
+        for hit in self.pattern.finditer(content):
+            order = lookup[hit.group(1)]
+            if best is None or order < best:
+                best = order
+                if best == 0:
+                    break
+        return best
+
+    @classmethod
+    def from_json(cls, data: dict) -> "GuildTriggers":
+        return cls({sys.intern(key): TriggerRecord.from_json(value) for key, value in data.items()})
+
+    def to_json(self) -> dict:
+        return {key: record.to_json() for key, record in self.triggers.items()}
+
+
+class TriggerStore:
+    """Loads each guild's triggers on first use and evicts idle guilds
+
+    Triggers are stored one JSON file per guild. Resident guilds are kept
+    in LRU order and evicted once the total number of resident trigger
+    words passes max_resident_words. Guilds without any triggers are
+    remembered in a bounded negative cache so they never hit the disk twice.
+    """
+
+    def __init__(
+        self,
+        directory: str = 'data/nga',
+        legacy_file: str = 'data/nga_replies.json',
+        max_resident_words: int = 50_000,
+        max_negative_entries: int = 100_000
+    ):
+        self.directory = Path(directory)
+        self.legacy_file = Path(legacy_file)
+        self.max_resident_words = max_resident_words
+        self.max_negative_entries = max_negative_entries
+        self.logger = logging.getLogger(__name__)
+        self.resident_words = 0
+        self._resident: "OrderedDict[int, GuildTriggers]" = OrderedDict()
+        self._empty: "OrderedDict[int, None]" = OrderedDict()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._migrate_legacy_file()
+
+    def _migrate_legacy_file(self):
+        """Split the old all-guilds JSON file into per-guild files"""
+        if not self.legacy_file.exists():
+            return
+        try:
+            with open(self.legacy_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for guild_id, triggers in data.items():
+                if triggers and not self._path(int(guild_id)).exists():
+                    self._write(int(guild_id), triggers)
+            self.legacy_file.replace(self.legacy_file.with_suffix('.json.migrated'))
+            self.logger.info(f"Migrated triggers for {len(data)} guilds to {self.directory}")
+        except Exception as e:
+            self.logger.error(f"Error migrating legacy triggers: {e}")
+
+    def _path(self, guild_id: int) -> Path:
+        return self.directory / f"{guild_id}.json"
+
+    def get(self, guild_id: int) -> Optional[GuildTriggers]:
+        """The guild's triggers, loading them if needed; None if it has none"""
+        guild = self._resident.get(guild_id)
+        if guild is not None:
+            self._resident.move_to_end(guild_id)
+            return guild
+        if guild_id in self._empty:
+            self._empty.move_to_end(guild_id)
+            return None
+
+        triggers = self._read(guild_id)
+        try:
+            guild = GuildTriggers.from_json(triggers) if triggers else None
+        except (KeyError, TypeError, ValueError) as e:
+            self.logger.error(f"Bad trigger data for guild {guild_id}: {e}")
+            guild = None
+        if guild is None:
+            self._remember_empty(guild_id)
+            return None
+        return self._add(guild_id, guild)
+
+    def ensure(self, guild_id: int) -> GuildTriggers:
+        """The guild's triggers, creating an empty set for a guild that has none"""
+        guild = self.get(guild_id)
+        if guild is None:
+            self._empty.pop(guild_id, None)
+            guild = self._add(guild_id, GuildTriggers())
+        return guild
+
+    def save(self, guild_id: int):
+        """Recompile and persist a guild's triggers after they changed"""
+        guild = self._resident.get(guild_id)
+        if guild is None:
+            return
+
+        self.resident_words -= guild.size
+        guild.rebuild()
+        self.resident_words += guild.size
+
+        try:
+            if guild.triggers:
+                self._write(guild_id, guild.to_json())
+            else:
+                self._path(guild_id).unlink(missing_ok=True)
+                self._drop(guild_id)
+                self._remember_empty(guild_id)
+        except Exception as e:
+            self.logger.error(f"Error saving triggers: {e}")
+        self._evict()
+
+    def resident_guilds(self) -> List[int]:
+        """Resident guild IDs, least recently used first"""
+        return list(self._resident)
+
+    def invalidate(self, guild_id: int):
+        """Forget a guild so its file is read again on next use"""
+        self._drop(guild_id)
+        self._empty.pop(guild_id, None)
+
+    def _read(self, guild_id: int) -> dict:
+        try:
+            with open(self._path(guild_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.error(f"Error loading triggers for guild {guild_id}: {e}")
+            return {}
+
+    def _write(self, guild_id: int, triggers: dict):
+        # Write to temporary file first, then rename for atomic operation
+        path = self._path(guild_id)
+        temp_file = path.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(triggers, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, path)
+
+    def _add(self, guild_id: int, guild: GuildTriggers) -> GuildTriggers:
+        self._resident[guild_id] = guild
+        self.resident_words += guild.size
+        self._evict()
+        return guild
+
+    def _drop(self, guild_id: int):
+        guild = self._resident.pop(guild_id, None)
+        if guild is not None:
+            self.resident_words -= guild.size
+
+    def _evict(self):
+        """Drop least recently used guilds until the word budget fits, keeping the newest"""
+        while self.resident_words > self.max_resident_words and len(self._resident) > 1:
+            _, guild = self._resident.popitem(last=False)
+            self.resident_words -= guild.size
+
+    def _remember_empty(self, guild_id: int):
+        self._empty[guild_id] = None
+        if len(self._empty) > self.max_negative_entries:
+            self._empty.popitem(last=False)
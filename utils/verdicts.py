@@ -0,0 +1,38 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+# Returned by get() on a miss, since None is a valid cached verdict
+MISS = object()
+
+
+class VerdictCache:
+    """Bounded LRU of match verdicts keyed by (kind, guild, matcher version, content hash)
+
+    Matchers get a new version whenever they're rebuilt, so entries for
+    old trigger sets or blocklists are never hit again and simply age out.
+    Blocklists and trigger sets count versions separately, so the kind
+    keeps their verdicts apart.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        verdict = self._entries.get(key, MISS)
+        if verdict is MISS:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return verdict
+
+    def put(self, key: Hashable, verdict: Any):
+        self._entries[key] = verdict
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
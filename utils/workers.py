@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, List, NamedTuple, Optional, Tuple
+
+from utils.blocklist import BlockedWordStore
+from utils.keywords import KeywordRegistry
+from utils.triggers import TriggerRecord, TriggerStore
+
+
+class MessageEvent(NamedTuple):
+    """The parts of a message the workers need, small enough to pickle cheaply"""
+    message_id: int
+    channel_id: int
+    guild_id: Optional[int]
+    author_id: int
+    content: str  # Lowercased
+
+
+class MessageVerdict(NamedTuple):
+    """What a worker decided about one message; the gateway does the REST calls"""
+    message_id: int
+    blocked: bool
+    trigger: Optional[TriggerRecord]
+    categories: Tuple[str, ...]  # Reaction keyword categories found
+
+
+def _load_blocked_words(path: str) -> BlockedWordStore:
+    store = BlockedWordStore()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            store.load(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, ValueError, AttributeError) as e:
+        logging.getLogger(__name__).error(f"Worker couldn't load blocked words: {e}")
+    return store
+
+
+def _judge(event: MessageEvent, blocked_words: BlockedWordStore, triggers: TriggerStore,
+           keywords: KeywordRegistry) -> Optional[MessageVerdict]:
+    """Run the Moderation and Personality matching for one message"""
+    guild_id = event.guild_id
+    content = event.content
+
+    blocked = False
+    trigger = None
+    if guild_id is not None:
+        if blocked_words.has_blocks(event.author_id):
+            blocked = any(
+                matcher.search(content)
+                for matcher in blocked_words.matchers_for(guild_id, event.author_id)
+            )
+        guild_triggers = triggers.get(guild_id)
+        stripped = content.strip()
+        if guild_triggers is not None and stripped:
+            trigger = guild_triggers.match(stripped)
+
+    matcher = keywords.matcher_for(guild_id)
+    categories = matcher.names(matcher.match(content))
+
+    if not (blocked or trigger or categories):
+        return None
+    return MessageVerdict(event.message_id, blocked, trigger, categories)
+
+
+def _worker_main(inbox, outbox, blocked_words_file: str, max_resident_words: int):
+    """Worker process loop: judge events until a None arrives"""
+    blocked_words = _load_blocked_words(blocked_words_file)
+    triggers = TriggerStore(max_resident_words=max_resident_words)
+    keywords = KeywordRegistry()
+
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        if isinstance(item, MessageEvent):
+            outbox.put(_judge(item, blocked_words, triggers, keywords) or item.message_id)
+        elif item[0] == 'reload_blocked':
+            blocked_words = _load_blocked_words(blocked_words_file)
+        elif item[0] == 'reload_triggers':
+            triggers.invalidate(item[1])
+
+
+class WorkerPool:
+    """Fans message matching out to worker processes, sharded by guild
+
+    The gateway process only normalizes messages into MessageEvents and
+    performs the REST calls for the verdicts that come back. Each guild
+    always lands on the same worker, so its triggers and blocklists are
+    only resident in one process. When a worker's queue is full or the
+    worker died, submit() returns False and the caller handles the
+    message inline instead. Reload notices that don't fit in a full queue
+    wait in a per-worker backlog that is retried from the event loop, and
+    that worker's messages are handled inline until the backlog is empty.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        on_verdict: Callable[[Any, MessageVerdict], None],
+        blocked_words_file: str = 'data/blocked_words.json',
+        max_resident_words: int = 50_000,
+        queue_size: int = 1000,
+        max_pending: int = 10_000,
+        control_retry_interval: float = 0.5
+    ):
+        self.workers = workers
+        self.on_verdict = on_verdict
+        self.blocked_words_file = blocked_words_file
+        self.max_resident_words = max_resident_words
+        self.queue_size = queue_size
+        self.max_pending = max_pending
+        self.control_retry_interval = control_retry_interval
+        self.logger = logging.getLogger(__name__)
+        self._context = multiprocessing.get_context('spawn')
+        self._inboxes: List[Any] = []
+        self._processes: List[Any] = []
+        self._outbox = None
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: "OrderedDict[int, Any]" = OrderedDict()  # Message ID -> message awaiting a verdict
+        self._controls: List[Deque[tuple]] = []  # Per worker, control messages waiting for queue room
+        self._control_retry: List[Optional[asyncio.TimerHandle]] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        """Spawn the workers and the thread that relays their verdicts to the event loop"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._outbox = self._context.Queue()
+        for index in range(self.workers):
+            inbox = self._context.Queue(self.queue_size)
+            process = self._context.Process(
+                target=_worker_main,
+                args=(inbox, self._outbox, self.blocked_words_file, self.max_resident_words // self.workers),
+                name=f'tika-worker-{index}',
+                daemon=True
+            )
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+            self._controls.append(deque())
+            self._control_retry.append(None)
+
+        self._reader = threading.Thread(target=self._read_verdicts, name='tika-verdicts', daemon=True)
+        self._reader.start()
+        self.logger.info(f"Started {self.workers} message workers")
+
+    async def stop(self):
+        """Stop the workers; the joins run on a thread so the event loop keeps going"""
+        if not self.running:
+            return
+        for handle in self._control_retry:
+            if handle is not None:
+                handle.cancel()
+        for inbox in self._inboxes:
+            try:
+                inbox.put_nowait(None)
+            except queue.Full:
+                pass
+        await asyncio.to_thread(self._join)
+        self._inboxes = []
+        self._processes = []
+        self._controls = []
+        self._control_retry = []
+        self._pending.clear()
+
+    def _join(self):
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._outbox.put(None)
+        self._reader.join(timeout=5)
+
+    def _shard(self, guild_id: Optional[int]) -> int:
+        return (guild_id or 0) % self.workers
+
+    def submit(self, message, event: MessageEvent) -> bool:
+        """Queue a message for its guild's worker; False means handle it inline"""
+        shard = self._shard(event.guild_id)
+        if self._controls[shard] or not self._processes[shard].is_alive():
+            return False  # A reload hasn't reached the worker yet, so its data may be stale
+        try:
+            self._inboxes[shard].put_nowait(event)
+        except queue.Full:
+            return False
+
+        self._pending[event.message_id] = message
+        if len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+        return True
+
+    def reload_blocked_words(self):
+        """Tell every worker the blocked words file changed"""
+        self._broadcast(('reload_blocked',))
+
+    def reload_triggers(self, guild_id: int):
+        """Tell the guild's worker its trigger file changed"""
+        if self.running:
+            self._send(self._shard(guild_id), ('reload_triggers', guild_id))
+
+    def _broadcast(self, control: tuple):
+        for shard in range(len(self._inboxes)):
+            self._send(shard, control)
+
+    def _send(self, shard: int, control: tuple):
+        # Control messages must not be dropped, but the event loop can't wait for room either
+        backlog = self._controls[shard]
+        if control not in backlog:
+            backlog.append(control)
+        if self._control_retry[shard] is None:
+            self._flush_controls(shard)
+
+    def _flush_controls(self, shard: int):
+        self._control_retry[shard] = None
+        backlog = self._controls[shard]
+        while backlog:
+            try:
+                self._inboxes[shard].put_nowait(backlog[0])
+            except queue.Full:
+                if not self._processes[shard].is_alive():
+                    self.logger.error(f"Worker {shard} died; dropped {len(backlog)} control messages")
+                    backlog.clear()
+                    return
+                self._control_retry[shard] = self._loop.call_later(
+                    self.control_retry_interval, self._flush_controls, shard
+                )
+                return
+            backlog.popleft()
+
+    def _read_verdicts(self):
+        while True:
+            result = self._outbox.get()
+            if result is None:
+                break
+            self._loop.call_soon_threadsafe(self._deliver, result)
+
+    def _deliver(self, result):
+        # Workers send back just the message ID when nothing matched
+        if isinstance(result, MessageVerdict):
+            message = self._pending.pop(result.message_id, None)
+            if message is not None:
+                self.on_verdict(message, result)
+        else:
+            self._pending.pop(result, None)